@@ -37,8 +37,6 @@ for t in temps:
     print('Wait for 5 min')
     print('Start sweep')
     time.sleep(300)
-    smu.initiate()
-    smu.wait_to_continue()
-    time.sleep(nplc / 50 * sweep_points)
-    data = smu.fetch_array()
-    np.savetxt(os.path.join(dirname, '%.3e.dat' % t), data)
+    data = smu.setup.run_sweep(('voltage', 'current'))
+    np.savetxt(os.path.join(dirname, '%.3e.dat' % t),
+               np.column_stack([data['voltage'], data['current']]))
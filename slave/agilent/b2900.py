@@ -1,7 +1,10 @@
 # -*- coding: utf-8 -*-
 import re
+import time
 from collections.abc import Iterable
 
+import numpy as np
+
 import slave.iec60488 as iec
 from slave.driver import Command, Driver
 from slave.transport import SimulatedTransport, Transport
@@ -214,7 +217,7 @@ class Sense(Driver):
     def disable_all_functions(self):
         self._write(':SENS%s:FUNC:OFF:ALL' % self._channel)
 
-    def get_data(self, offset=None, size=None):
+    def get_data(self, offset=None, size=None, dtype=None):
         """Returns the array data which contains all of the current measurement data, voltage
         measurement data, resistance measurement data, source output setting data, status
         data, or time data specified by the :FORMat:ELEMents:SENSe command. The data
@@ -229,6 +232,9 @@ class Sense(Driver):
 
             Note: if offset is None, size is ignored.
 
+        :param dtype: The numpy dtype of the data, see :meth:`.Format.dtype`.
+            If given, the data is returned as numpy array.
+
         Note: If trigger count > 1, it returns all the data measured."""
         if offset is None:
             opts = ''
@@ -238,7 +244,10 @@ class Sense(Driver):
             else:
                 opts = '{0}'.format(int(offset))
 
-        return self._query((':SENS{c}:DATA? {o}'.format(c=self._channel, o=opts), Stream(Float)))
+        command = ':SENS{c}:DATA? {o}'.format(c=self._channel, o=opts)
+        if dtype is not None:
+            return self._query_array(command, dtype)
+        return self._query((command, Stream(Float)))
 
     def get_data_latest(self):
         """Returns the latest current measurement data, voltage measurement data, resistance
@@ -563,11 +572,39 @@ class SubSource(Driver):
 
 
 class Format(Driver):
+    """The Format Command Subsystem.
+
+    :ivar sense_elements: The data elements returned by the data queries.
+    :ivar data: The data format, either 'ascii' or a tuple of *(<type>,
+        <length>)*, e.g. ('real', 32). Binary formats are returned as
+        IEEE 488.2 definite length blocks.
+    :ivar byte_order: The byte order of binary data, either 'normal' (big
+        endian) or 'swapped' (little endian).
+    """
     _functions = _sense_functions
 
     def __init__(self, transport, protocol):
         super().__init__(transport, protocol)
         self.sense_elements = Command(':FORM:ELEM:SENS?', ':FORM:ELEM:SENS', Stream(Mapping(self._functions)))
+        self.data = Command(
+            ':FORM:DATA?',
+            ':FORM:DATA',
+            Stream(Mapping({'ascii': 'ASC', 'real': 'REAL'}), Integer)
+        )
+        self.byte_order = Command(':FORM:BORD?', ':FORM:BORD', Mapping({'normal': 'NORM', 'swapped': 'SWAP'}))
+
+    def dtype(self):
+        """Returns the numpy dtype matching the configured data format.
+
+        The dtype is used by the array queries, e.g. :meth:`.fetch_array`. It
+        requires two queries, therefore it should be determined once and
+        reused.
+        """
+        data = self.data
+        if data == 'ascii':
+            return np.dtype(float)
+        type_, length = data
+        return iec.float_dtype(length, self.byte_order)
 
 
 # -----------------------------------------------------------------------------
@@ -642,7 +679,9 @@ class Output(Driver):
 class Trace(Driver):
     """
     :ivar free: the available size (available) and the total size (total) of the trace buffer.
-    :ivar points: the size of the trace buffer"""
+    :ivar points: the size of the trace buffer
+    :ivar feed: the data stored in the trace buffer, 'sense', 'math' or 'limit'.
+    :ivar feed_control: 'next' to store the data of the next measurements, or 'never'."""
     def __init__(self, transport, protocol, channel=1):
         super().__init__(transport, protocol)
         self._channel = channel
@@ -650,18 +689,31 @@ class Trace(Driver):
         self.free = _command(m, ':TRAC{c}:FREE?', ':TRAC{c}:FREE', [Integer, Integer])
         self.points = _command(m, ':TRAC{c}:POIN?', 'TRAC{c}:POIN', Integer(1, 100000))
         self.actual_points = _command(m, ':TRAC{c}:POIN:ACT?', type_=Integer)
+        self.feed = _command(m, ':TRAC{c}:FEED?', ':TRAC{c}:FEED',
+                             Mapping({'sense': 'SENS', 'math': 'MATH', 'limit': 'LIM'}))
+        self.feed_control = _command(m, ':TRAC{c}:FEED:CONT?', ':TRAC{c}:FEED:CONT',
+                                     Mapping({'next': 'NEXT', 'never': 'NEV'}))
 
     def clear(self):
         self._write(':TRAC{c}:CLE'.format(c=self._channel))
 
-    def get_data(self, offset=None, size=None):
+    def get_data(self, offset=None, size=None, dtype=None):
+        """Returns the trace buffer data.
+
+        :param offset: The index of the first data point.
+        :param size: The number of data points. Ignored if offset is `None`.
+        :param dtype: An optional numpy dtype. It is required, if the trace
+            data is transferred in the 'real' format.
+        """
         command = ':TRAC{c}:DATA?'.format(c=self._channel)
         if offset is not None:
             if size:
                 command += ' {0},{1}'.format(offset, size)
             else:
                 command += ' {0}'.format(offset)
-        self._query((command, Stream(Float)))
+        if dtype is not None:
+            return self._query_array(command, dtype)
+        return self._query((command, Stream(Float)))
 
 
 # -----------------------------------------------------------------------------
@@ -754,6 +806,71 @@ class Setup(object):
         sub.sweep_stop = stop
         sub.points = points
 
+    def run_sweep(self, elements=None, chunk_size=1000, poll_interval=0.1, timeout=None,
+                  dtype=None, channel=1):
+        """Runs a hardware timed sweep and returns the measured data.
+
+        The measurements are stored in the trace buffer. Instead of estimating
+        the duration of the sweep, the operation complete bit of the event
+        status register is polled. The data is transferred in chunks while the
+        sweep is running, e.g.::
+
+            smu.setup.sweep_source('volt', -0.1, 0.1, 2001)
+            data = smu.setup.run_sweep(('voltage', 'current'))
+            resistance = data['voltage'] / data['current']
+
+        :param elements: An optional sequence of sense elements, e.g.
+            `('voltage', 'current')`. By default, the configured elements are
+            used, see :attr:`.Format.sense_elements`.
+        :param chunk_size: The minimal number of points per transfer.
+        :param poll_interval: The time between the status queries in seconds.
+        :param timeout: An optional timeout in seconds. If it expires, the
+            sweep is aborted.
+        :param dtype: The numpy dtype of binary data formats, see
+            :meth:`.Format.dtype`.
+        :param channel: SMU channel, 1, or 2.
+        :returns: A dict with a numpy array for each sense element.
+        :raises TimeoutError: if the sweep did not finish in time.
+        """
+        smu = self._smu
+        if elements is None:
+            elements = list(smu.format.sense_elements)
+        else:
+            elements = list(elements)
+            smu.format.sense_elements = elements
+        trace = smu.traces[channel - 1]
+        trace.feed_control = 'never'
+        trace.clear()
+        trace.points = smu.triggerings[channel - 1].acquire.count
+        trace.feed = 'sense'
+        trace.feed_control = 'next'
+
+        # Reading the event status register clears it.
+        smu.event_status
+        smu.initiate((channel,))
+        smu.complete_operation()
+        deadline = None if timeout is None else time.time() + timeout
+        chunks, received = [], 0
+        while True:
+            # The operation is complete, when the trigger state is idle.
+            done = smu.event_status['operation complete']
+            available = trace.actual_points
+            while available - received >= (1 if done else chunk_size):
+                size = min(available - received, chunk_size)
+                # A single value is returned unpacked.
+                chunk = trace.get_data(received, size, dtype=dtype)
+                chunks.append(np.atleast_1d(np.asarray(chunk, dtype=float)))
+                received += size
+            if done:
+                break
+            if deadline is not None and time.time() > deadline:
+                smu.abort((channel,))
+                raise TimeoutError('Sweep did not finish in time.')
+            time.sleep(poll_interval)
+        data = np.concatenate(chunks) if chunks else np.empty(0)
+        data = data.reshape(-1, len(elements))
+        return {name: data[:, i] for i, name in enumerate(elements)}
+
     def sense(self, function, auto_range=None, range_=None, nplc=None, compliance=None, channel=1,
               four_wire=None, integration_time=None):
         """Sets up voltage or current sense parameters.
@@ -860,16 +977,27 @@ class B2900(iec.IEC60488, iec.Trigger, iec.StoredSetting):
         self._write(":SYST:BEEP:STAT ON")
         self._write(":SYST:BEEP %s,%s" % (freq, duration))
 
-    def fetch_array(self, channels=(1,)):
+    def fetch_array(self, channels=(1,), dtype=None):
         """Returns the array data which contains all of the data specified by the :FORMat:ELEMents:SENSe command.
 
         .. NOTE:: The data is not cleared until the initiate(), measure(), or read() command is executed.
 
+        E.g. to transfer the data in binary format::
+
+            smu.format.data = 'real', 64
+            smu.format.byte_order = 'swapped'
+            dtype = smu.format.dtype()
+            data = smu.fetch_array(dtype=dtype)
+
         :param channels: list of channels to get data from
+        :param dtype: The dtype returned by :meth:`.Format.dtype`. If it is
+            omitted, the data is parsed as ascii list.
         :return: list of all the data
         """
-        return self._query(('FETC:ARR? (@{ch})'.format(ch=self._parse_channels(channels)),
-                            Stream(Float)))
+        command = 'FETC:ARR? (@{ch})'.format(ch=self._parse_channels(channels))
+        if dtype is not None:
+            return self._query_array(command, dtype)
+        return self._query((command, Stream(Float)))
 
     def fetch(self, channels=(1,)):
         """Returns the latest measurement data specified by the :FORMat:ELEMents:SENSe command.
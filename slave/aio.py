@@ -0,0 +1,393 @@
+#  -*- coding: utf-8 -*-
+#
+# Slave, (c) 2012-2015, see AUTHORS.  Licensed under the GNU GPL.
+"""The :mod:`slave.aio` module implements an asyncio based variant of the
+transport, protocol and command layers.
+
+.. note:: This module requires python 3.5 or newer.
+
+The blocking transports lock the connection for the duration of a complete
+query, therefore concurrent communication with several instruments requires
+a thread per instrument. The classes and functions of this module allow a
+single event loop to drive many instruments with overlapping io, e.g.::
+
+    import asyncio
+
+    from slave.aio import AsyncDriver, AsyncSocket
+    from slave.signal_recovery import SR7230
+
+    async def main():
+        lockins = [
+            AsyncDriver(SR7230(AsyncSocket(address=(host, 50000))))
+            for host in ('192.168.178.1', '192.168.178.2')
+        ]
+        # Both lock-ins are queried concurrently.
+        data = await asyncio.gather(*(lia.x for lia in lockins))
+
+    asyncio.get_event_loop().run_until_complete(main())
+
+The existing driver classes are reused, only the transport is replaced by an
+:class:`AsyncTransport`. The :class:`AsyncDriver` wrapper turns command
+attribute access into coroutines. Driver methods, which communicate with the
+instrument directly, are not supported.
+
+"""
+import asyncio
+import functools
+import logging
+import time
+
+from slave.driver import Command, Driver
+from slave.protocol import IEC60488, SignalRecovery
+from slave.transport import (BufferOverflow, SimulatedTransport, Timeout,
+                             TransportError, _Buffer)
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+
+class AsyncTransport(object):
+    """The asynchronous counterpart of :class:`slave.transport.Transport`.
+
+    All read and write methods are coroutines. Transports are intended to be
+    used as asynchronous context managers. Entering the `async with` block
+    locks the transport, leaving it unlocks it.
+
+    Subclasses must implement the `__read__` and `__write__` coroutines.
+
+    :param max_bytes: The maximum number of bytes requested by a single
+        `__read__` call.
+    :param timeout: The default time limit of a read operation in seconds.
+        `None` disables the limit.
+    :param max_size: The default maximum response size in bytes. `None`
+        disables the limit.
+
+    """
+    def __init__(self, max_bytes=1024, timeout=None, max_size=None):
+        self._buffer = _Buffer()
+        self._max_bytes = max_bytes
+        self._timeout = timeout
+        self._max_size = max_size
+        # Created lazily, on python < 3.10 a lock binds to the event loop
+        # current at construction time.
+        self.lock = None
+
+    async def read_bytes(self, num_bytes, timeout=None):
+        """Reads at most `num_bytes`."""
+        deadline = self._deadline(timeout)
+        while not self._buffer:
+            await self._fill(num_bytes, deadline)
+        return self._buffer.read(num_bytes)
+
+    async def read_exactly(self, num_bytes, timeout=None):
+        """Reads exactly `num_bytes`."""
+        if self._max_size is not None and num_bytes > self._max_size:
+            raise BufferOverflow('Requested {0} bytes, maximum response size '
+                                 'is {1}.'.format(num_bytes, self._max_size))
+        deadline = self._deadline(timeout)
+        while len(self._buffer) < num_bytes:
+            await self._fill(num_bytes - len(self._buffer), deadline)
+        return self._buffer.read(num_bytes)
+
+    async def read_until(self, delimiter, timeout=None, max_size=None):
+        """Reads until the delimiter is found."""
+        deadline = self._deadline(timeout)
+        max_size = self._max_size if max_size is None else max_size
+        index = self._buffer.find(delimiter)
+        while index == -1:
+            if max_size is not None and len(self._buffer) > max_size:
+                raise BufferOverflow(
+                    'Response exceeds {0} bytes.'.format(max_size),
+                    data=self._buffer.read(len(self._buffer))
+                )
+            await self._fill(self._max_bytes, deadline)
+            index = self._buffer.find(delimiter)
+        data = self._buffer.read(index)
+        self._buffer.read(len(delimiter))
+        return data
+
+    async def write(self, data):
+        await self.__write__(data)
+
+    def _deadline(self, timeout):
+        timeout = self._timeout if timeout is None else timeout
+        return None if timeout is None else time.time() + timeout
+
+    async def _fill(self, num_bytes, deadline):
+        """Reads at most `num_bytes` into the buffer.
+
+        In contrast to the blocking transport, a pending `__read__` call is
+        cancelled when the deadline is exceeded.
+
+        """
+        try:
+            if deadline is None:
+                data = await self.__read__(num_bytes)
+            else:
+                data = await asyncio.wait_for(
+                    self.__read__(num_bytes), max(deadline - time.time(), 0)
+                )
+        except asyncio.TimeoutError:
+            raise Timeout('Read deadline exceeded.',
+                          data=self._buffer.read(len(self._buffer)))
+        except Timeout as e:
+            e.data = self._buffer.read(len(self._buffer))
+            raise
+        self._buffer.extend(data)
+
+    async def __aenter__(self):
+        if self.lock is None:
+            self.lock = asyncio.Lock()
+        await self.lock.acquire()
+
+    async def __aexit__(self, type, value, traceback):
+        self.lock.release()
+
+    async def __read__(self, num_bytes):
+        raise NotImplementedError()
+
+    async def __write__(self, data):
+        raise NotImplementedError()
+
+
+class AsyncSocket(AsyncTransport):
+    """An asyncio stream based socket transport.
+
+    :param address: The socket address, a tuple of host string and port.
+    :param alwaysopen: If `False`, the connection is opened on entering and
+        closed on leaving the `async with` block. Otherwise it is opened once
+        and kept open until :meth:`.close` is called.
+
+    The connection is opened lazily on first use, because it requires a
+    running event loop.
+
+    """
+    class Error(TransportError):
+        pass
+
+    class Timeout(Timeout, Error):
+        pass
+
+    def __init__(self, address, alwaysopen=True, *args, **kw):
+        super(AsyncSocket, self).__init__(*args, **kw)
+        self.address = address
+        self.alwaysopen = alwaysopen
+        self._reader = self._writer = None
+
+    async def open(self):
+        if self._writer:
+            raise ValueError('Socket is already open.')
+        try:
+            self._reader, self._writer = await asyncio.open_connection(*self.address)
+        except OSError as e:
+            raise AsyncSocket.Error(e)
+
+    async def close(self):
+        if not self._writer:
+            raise ValueError("Can't close socket. Not opened yet.")
+        writer, self._reader, self._writer = self._writer, None, None
+        writer.close()
+
+    async def __read__(self, num_bytes):
+        try:
+            data = await self._reader.read(num_bytes)
+        except OSError as e:
+            raise AsyncSocket.Error(e)
+        if not data:
+            raise AsyncSocket.Error('Connection closed by peer.')
+        return data
+
+    async def __write__(self, data):
+        try:
+            self._writer.write(bytes(data))
+            await self._writer.drain()
+        except OSError as e:
+            raise AsyncSocket.Error(e)
+
+    async def __aenter__(self):
+        await super(AsyncSocket, self).__aenter__()
+        if self._writer is None:
+            try:
+                await self.open()
+            except Exception:
+                self.lock.release()
+                raise
+
+    async def __aexit__(self, type, value, tb):
+        try:
+            if not self.alwaysopen and self._writer is not None:
+                await self.close()
+        finally:
+            await super(AsyncSocket, self).__aexit__(type, value, tb)
+
+
+def _retry(errors):
+    """The asynchronous counterpart of :func:`slave.protocol._retry`.
+
+    In contrast to the blocking version, the device is not cleared.
+
+    """
+    def wrapper(fn):
+        @functools.wraps(fn)
+        async def wrapped(self, transport, *args, **kw):
+            for i in range(1, 3):
+                try:
+                    return await fn(self, transport, *args, **kw)
+                except errors as e:
+                    logger.exception('Exception occured on %d. try. Msg: %r Retrying.', i, e)
+            return await fn(self, transport, *args, **kw)
+        return wrapped
+    return wrapper
+
+
+class AsyncIEC60488(object):
+    """Asynchronous io for a :class:`slave.protocol.IEC60488` protocol.
+
+    The adapter reuses the message creation and response parsing of the
+    wrapped protocol and implements the io with coroutines.
+
+    :param protocol: The wrapped protocol instance.
+
+    """
+    _errors = (IEC60488.ParsingError, UnicodeDecodeError, UnicodeEncodeError, Timeout)
+
+    def __init__(self, protocol):
+        self.protocol = protocol
+
+    @property
+    def _resp_term(self):
+        return self.protocol.resp_term.encode(self.protocol.encoding)
+
+    @_retry(errors=_errors)
+    async def query(self, transport, header, *data):
+        message = self.protocol.create_message(header, *data)
+        logger.debug('IEC60488 query: %r', message)
+        async with transport:
+            await transport.write(message)
+            response = await transport.read_until(self._resp_term)
+        logger.debug('IEC60488 response: %r', response)
+        return self.protocol.parse_response(response)
+
+    @_retry(errors=_errors)
+    async def write(self, transport, header, *data):
+        message = self.protocol.create_message(header, *data)
+        logger.debug('IEC60488 write: %r', message)
+        async with transport:
+            await transport.write(message)
+
+
+class AsyncSignalRecovery(AsyncIEC60488):
+    """Asynchronous io for a :class:`slave.protocol.SignalRecovery` protocol."""
+    async def query(self, transport, header, *data):
+        message = self.protocol.create_message(header, *data)
+        logger.debug('SignalRecovery query: %r', message)
+        async with transport:
+            await transport.write(message)
+            response = await transport.read_until(self._resp_term)
+            logger.debug('SignalRecovery response: %r', response)
+            status_byte, overload_byte = await transport.read_exactly(2)
+        self.protocol.call_byte_handler(status_byte, overload_byte)
+        return self.protocol.parse_response(response)
+
+    async def query_bytes(self, transport, num_bytes, header, *data):
+        """Queries for binary data.
+
+        See :meth:`slave.protocol.SignalRecovery.query_bytes`.
+
+        """
+        message = self.protocol.create_message(header, *data)
+        logger.debug('SignalRecovery query bytes: %r', message)
+        async with transport:
+            await transport.write(message)
+            response = await transport.read_exactly(num_bytes)
+            # The data is separated from the status bytes by a \0 character.
+            _, status_byte, overload_byte = await transport.read_exactly(3)
+        self.protocol.call_byte_handler(status_byte, overload_byte)
+        return response
+
+    async def write(self, transport, header, *data):
+        message = self.protocol.create_message(header, *data)
+        logger.debug('SignalRecovery write: %r', message)
+        async with transport:
+            await transport.write(message)
+            await transport.read_until(self._resp_term)
+            status_byte, overload_byte = await transport.read_exactly(2)
+        self.protocol.call_byte_handler(status_byte, overload_byte)
+
+
+#: Maps protocol classes to their asynchronous adapter. The most specific
+#: entry in the method resolution order of a protocol is used.
+ADAPTERS = {
+    IEC60488: AsyncIEC60488,
+    SignalRecovery: AsyncSignalRecovery,
+}
+
+
+def async_protocol(protocol):
+    """Returns the asynchronous adapter of a protocol instance.
+
+    :raises TypeError: if no adapter is registered for the protocol.
+
+    """
+    for cls in type(protocol).__mro__:
+        if cls in ADAPTERS:
+            return ADAPTERS[cls](protocol)
+    raise TypeError('Unsupported protocol {0!r}'.format(protocol))
+
+
+async def query(cmd, transport, protocol, *data):
+    """The asynchronous counterpart of :meth:`slave.driver.Command.query`."""
+    protocol, header, data = cmd._query_unit(protocol, data)
+    if isinstance(transport, SimulatedTransport):
+        response = cmd.simulate_query(data)
+    else:
+        response = await async_protocol(protocol).query(transport, header, *data)
+    return cmd._load_response(response)
+
+
+async def write(cmd, transport, protocol, *data):
+    """The asynchronous counterpart of :meth:`slave.driver.Command.write`."""
+    protocol, header, data = cmd._write_unit(protocol, data)
+    if isinstance(transport, SimulatedTransport):
+        cmd.simulate_write(data)
+    else:
+        await async_protocol(protocol).write(transport, header, *data)
+
+
+class AsyncDriver(object):
+    """Wraps a driver and redirects command access to coroutines.
+
+    Reading a command attribute returns an awaitable query, nested drivers
+    are wrapped as well. All other attributes are returned unchanged. E.g.::
+
+        lockin = AsyncDriver(SR7230(AsyncSocket(address=('192.168.178.1', 50000))))
+        x = await lockin.x
+        await lockin.set('sensitivity', '1 mV')
+        length = await lockin.fast_buffer.length
+
+    :param driver: A :class:`~slave.driver.Driver` instance using an
+        :class:`AsyncTransport`.
+
+    """
+    def __init__(self, driver):
+        self._driver = driver
+
+    def __getattr__(self, name):
+        driver = self._driver
+        attr = object.__getattribute__(driver, name)
+        if isinstance(attr, Command):
+            return query(attr, driver._transport, driver._protocol)
+        elif isinstance(attr, Driver):
+            return AsyncDriver(attr)
+        return attr
+
+    async def set(self, name, value):
+        """Writes the value to the command attribute `name`."""
+        driver = self._driver
+        cmd = object.__getattribute__(driver, name)
+        if not isinstance(cmd, Command):
+            raise TypeError('{0!r} is not a command.'.format(name))
+        if isinstance(value, (list, tuple)):
+            await write(cmd, driver._transport, driver._protocol, *value)
+        else:
+            await write(cmd, driver._transport, driver._protocol, value)
@@ -28,7 +28,11 @@ from __future__ import (absolute_import, division,
 # breaks multiple inheritance due to it's metaclass.
 from future.builtins import map, zip, dict, int, list, range, str
 import collections
+import copy
 import itertools as it
+import time
+
+import numpy as np
 
 from slave.transport import SimulatedTransport
 import slave.protocol
@@ -68,8 +72,30 @@ def _apply(function, types, values):
 def _dump(types, values):
     return _apply(lambda t, v: t.dump(v), types, values)
 
+def _dumper(types):
+    """Returns a function equivalent to `functools.partial(_dump, types)`.
+
+    The dump methods of a type sequence are looked up only once.
+
+    """
+    if not isinstance(types, collections.Sequence):
+        return lambda values: _dump(types, values)
+    dumps = [t.dump for t in types]
+    def dump(values):
+        if len(dumps) > len(values):
+            raise ValueError('Too few values.')
+        elif len(dumps) < len(values):
+            raise ValueError('Too many values.')
+        return [fn(v) for fn, v in zip(dumps, values)]
+    return dump
+
 def _load(types, values):
-    return _apply(lambda t, v: t.load(v), types, values)
+    try:
+        # Container types, e.g. `Stream`, might provide a bulk loading hook.
+        load_all = types.load_all
+    except AttributeError:
+        return _apply(lambda t, v: t.load(v), types, values)
+    return load_all(values)
 
 
 class Command(object):
@@ -108,9 +134,12 @@ class Command(object):
         :class:`slave.protocol.Protocol` interface) is given,
         :meth:`~.Command.query` and :meth:`~.Command.write` methods ignore it's
         protocol argument and use it instead.
+    :param ttl: The time to live of cached responses in seconds. If it is not
+        `None`, a :class:`~.Driver` caches the query response of the command
+        attribute. See :meth:`.Driver.enable_cache`.
 
     """
-    def __init__(self, query=None, write=None, type_=None, protocol=None):
+    def __init__(self, query=None, write=None, type_=None, protocol=None, ttl=None):
         default = _typelist(type_)
         def write_message(header, data_type=default):
             return _Message(str(header), _typelist(data_type), None)
@@ -125,8 +154,11 @@ class Command(object):
             return x and (fn(x) if isinstance(x, (str, bytes)) else fn(*x))
 
         self.protocol = protocol
+        self.ttl = ttl
         self._query = assign(query, query_message)
         self._write = assign(write, write_message)
+        self._dump_query = self._query and self._query.data_type and _dumper(self._query.data_type)
+        self._dump_write = self._write and self._write.data_type and _dumper(self._write.data_type)
 
     def write(self, transport, protocol, *data):
         """Generates and sends a command message unit.
@@ -139,19 +171,11 @@ class Command(object):
         :raises AttributeError: if the command is not writable.
 
         """
-        if not self._write:
-            raise AttributeError('Command is not writeable')
-        if self.protocol:
-            protocol = self.protocol
-        if self._write.data_type:
-            data = _dump(self._write.data_type, data)
-        else:
-            # TODO We silently ignore possible data
-            data = ()
+        protocol, header, data = self._write_unit(protocol, data)
         if isinstance(transport, SimulatedTransport):
             self.simulate_write(data)
         else:
-            protocol.write(transport, self._write.header, *data)
+            protocol.write(transport, header, *data)
 
     def query(self, transport, protocol, *data):
         """Generates and sends a query message unit.
@@ -164,22 +188,46 @@ class Command(object):
 
         :raises AttributeError: if the command is not queryable.
 
+        """
+        protocol, header, data = self._query_unit(protocol, data)
+        if isinstance(transport, SimulatedTransport):
+            response = self.simulate_query(data)
+        else:
+            response = protocol.query(transport, header, *data)
+        return self._load_response(response)
+
+    def _write_unit(self, protocol, data):
+        """Returns the protocol, header and serialized data of a command
+        message unit.
+        """
+        if not self._write:
+            raise AttributeError('Command is not writeable')
+        if self._dump_write:
+            data = self._dump_write(data)
+        else:
+            # TODO We silently ignore possible data
+            data = ()
+        return self.protocol or protocol, self._write.header, data
+
+    def _query_unit(self, protocol, data):
+        """Returns the protocol, header and serialized data of a query message
+        unit.
         """
         if not self._query:
             raise AttributeError('Command is not queryable')
-        if self.protocol:
-            protocol = self.protocol
-        if self._query.data_type:
-            data = _dump(self._query.data_type, data)
+        if self._dump_query:
+            data = self._dump_query(data)
         else:
             # TODO We silently ignore possible data
             data = ()
-        if isinstance(transport, SimulatedTransport):
-            response = self.simulate_query(data)
-        else:
-            response = protocol.query(transport, self._query.header, *data)
-        response = _load(self._query.response_type, response)
+        return self.protocol or protocol, self._query.header, data
 
+    def _load_response(self, response):
+        """Loads the parsed response of a query."""
+        response = _load(self._query.response_type, response)
+        if isinstance(response, np.ndarray):
+            # Array streams are returned as is, even with a single item.
+            return response
         # Return single value if parsed_data is 1-tuple.
         return response[0] if len(response) == 1 else response
 
@@ -222,6 +270,16 @@ class Driver(object):
     the :class:`Command.query`, write access to the :class:`Command.write`
     member function.
 
+    Responses of commands with a time to live are cached, e.g.::
+
+        lockin.enable_cache(60, 'time_constant')
+        lockin.time_constant  # Queries the instrument.
+        lockin.time_constant  # Returns the cached response.
+
+    Writing the command attribute invalidates the cached response. Changes
+    not made through the attribute, e.g. by the front panel, are not detected
+    until the response expires.
+
     :param transport: The transport object.
     :param protocol: The protocol object. If no protocol is given, a
         :class:`IEC60488` protocol is used as default.
@@ -230,10 +288,51 @@ class Driver(object):
     def __init__(self, transport, protocol=None, *args, **kw):
         self._transport = transport
         self._protocol = protocol or slave.protocol.IEC60488()
+        self._cache = {}
+        self._cache_stats = {'hits': 0, 'misses': 0}
         # super must be the last call, otherwise mixin classes relying on the
         # existance of `_protocol` and `_transport` will fail.
         super(Driver, self).__init__(*args, **kw)
 
+    def batch(self):
+        """Returns a :class:`~.Batch` context, sending the collected command
+        and query message units as a single program message.
+        """
+        return Batch(self, self._transport, self._protocol)
+
+    def enable_cache(self, ttl, *names):
+        """Sets the time to live of cached command responses.
+
+        :param ttl: The time to live in seconds, `float('inf')` caches the
+            response until it is invalidated. `None` disables caching.
+        :param names: The attribute names of the commands.
+
+        """
+        for name in names:
+            cmd = object.__getattribute__(self, name)
+            if not isinstance(cmd, Command):
+                raise TypeError('{0!r} is not a command.'.format(name))
+            cmd.ttl = ttl
+            self._cache.pop(name, None)
+
+    def invalidate(self, *names):
+        """Removes the cached responses of the named commands.
+
+        If no names are given, the complete cache is cleared.
+
+        """
+        if names:
+            for name in names:
+                self._cache.pop(name, None)
+        else:
+            self._cache.clear()
+
+    def cache_stats(self):
+        """Returns a dict with the number of cache 'hits' and 'misses' and the
+        number of cached responses, 'size'.
+        """
+        return dict(self._cache_stats, size=len(self._cache))
+
     def _write(self, cmd, *datas):
         """Helper function to simplify writing."""
         cmd = Command(write=cmd)
@@ -244,15 +343,44 @@ class Driver(object):
         cmd = Command(query=cmd)
         return cmd.query(self._transport, self._protocol, *datas)
 
+    def _query_array(self, header, dtype, *datas):
+        """Helper function to query numeric data as numpy array.
+
+        See :meth:`slave.protocol.IEC60488.query_array`.
+
+        """
+        if isinstance(self._transport, SimulatedTransport):
+            return np.random.random(10).astype(dtype)
+        return self._protocol.query_array(self._transport, dtype, header, *datas)
+
     def __getattribute__(self, name):
         """Redirects read access of command attributes to
         the :class:`~Command.query` function.
         """
         attr = object.__getattribute__(self, name)
         if isinstance(attr, Command):
-            return attr.query(self._transport, self._protocol)
+            if attr.ttl is None:
+                return attr.query(self._transport, self._protocol)
+            return self._cached_query(name, attr)
         return attr
 
+    def _cached_query(self, name, cmd):
+        now = time.time()
+        try:
+            timestamp, response = self._cache[name]
+        except KeyError:
+            pass
+        else:
+            if now - timestamp < cmd.ttl:
+                self._cache_stats['hits'] += 1
+                # Mutable responses, e.g. of a Stream, are copied to protect
+                # the cached response from modifications by the caller.
+                return copy.deepcopy(response)
+        self._cache_stats['misses'] += 1
+        response = cmd.query(self._transport, self._protocol)
+        self._cache[name] = now, response
+        return copy.deepcopy(response)
+
     def __setattr__(self, name, value):
         """Redirects write access of command attributes to the
         :class:`~Command.write` function and injects transport, and command
@@ -265,6 +393,7 @@ class Driver(object):
             object.__setattr__(self, name, value)
         else:
             if isinstance(attr, Command):
+                self._cache.pop(name, None)
                 # Redirect write access
                 if (isinstance(value, collections.Sequence) and
                     not isinstance(value, (str, bytes))):
@@ -275,6 +404,129 @@ class Driver(object):
                 object.__setattr__(self, name, value)
 
 
+class Future(object):
+    """The pending result of a query collected by a :class:`~.Batch`."""
+    def __init__(self):
+        self._done = False
+        self._result = None
+
+    def done(self):
+        """Returns `True` if the result is available."""
+        return self._done
+
+    def result(self):
+        """Returns the result of the query.
+
+        :raises RuntimeError: if the batch was not executed yet.
+
+        """
+        if not self._done:
+            raise RuntimeError('Batch was not executed yet.')
+        return self._result
+
+    def set_result(self, result):
+        self._result = result
+        self._done = True
+
+
+class Batch(object):
+    """Collects command and query message units and sends them at once.
+
+    Instead of a write and read cycle for each query, the collected message
+    units are joined into a single program message. The combined response is
+    split and loaded by each command, e.g.::
+
+        with lockin.batch() as batch:
+            x = batch.query('x')
+            y = batch.query('y')
+            batch.write('sensitivity', '1 mV')
+        print(x.result(), y.result())
+        print(batch.results)  # Results of all queries in order.
+
+    Leaving the `with` block executes the batch, unless an exception was
+    raised. Consecutive message units using the same protocol are sent via
+    its :meth:`~.Protocol.batch` method. Protocols not supporting program
+    messages with multiple units fall back to sequential execution.
+
+    :param driver: The driver used to look up commands by name.
+    :param transport: The transport object.
+    :param protocol: The default protocol object.
+
+    """
+    def __init__(self, driver, transport, protocol):
+        self._driver = driver
+        self._transport = transport
+        self._protocol = protocol
+        self._units = []
+        #: The results of all queries in order, available after execution.
+        self.results = None
+
+    def _command(self, cmd):
+        if isinstance(cmd, Command):
+            return cmd
+        cmd = object.__getattribute__(self._driver, cmd)
+        if not isinstance(cmd, Command):
+            raise TypeError('{0!r} is not a command.'.format(cmd))
+        return cmd
+
+    def query(self, cmd, *data):
+        """Adds a query message unit.
+
+        :param cmd: A :class:`~.Command` or the attribute name of a command.
+        :param data: The program data.
+        :returns: A :class:`~.Future` holding the loaded response once the
+            batch is executed.
+
+        """
+        cmd = self._command(cmd)
+        protocol, header, data = cmd._query_unit(self._protocol, data)
+        future = Future()
+        self._units.append((cmd, protocol, True, header, data, future))
+        return future
+
+    def write(self, cmd, *data):
+        """Adds a command message unit.
+
+        :param cmd: A :class:`~.Command` or the attribute name of a command.
+        :param data: The program data.
+
+        """
+        if not isinstance(cmd, Command):
+            self._driver.invalidate(cmd)
+        cmd = self._command(cmd)
+        protocol, header, data = cmd._write_unit(self._protocol, data)
+        self._units.append((cmd, protocol, False, header, data, None))
+
+    def execute(self):
+        """Sends all collected message units and returns the query results."""
+        units, self._units = self._units, []
+        if isinstance(self._transport, SimulatedTransport):
+            for cmd, _, query, _, data, future in units:
+                if query:
+                    future.set_result(cmd._load_response(cmd.simulate_query(data)))
+                else:
+                    cmd.simulate_write(data)
+        else:
+            for protocol, group in it.groupby(units, key=lambda x: x[1]):
+                group = list(group)
+                responses = iter(protocol.batch(
+                    self._transport,
+                    [(query, header, data) for _, _, query, header, data, _ in group]
+                ))
+                for cmd, _, query, _, _, future in group:
+                    if query:
+                        future.set_result(cmd._load_response(next(responses)))
+        self.results = [x[-1].result() for x in units if x[2]]
+        return self.results
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        if type is None:
+            self.execute()
+
+
 class CommandSequence(slave.misc.ForwardSequence):
     """A sequence forwarding item access to the query and write methods."""
     def __init__(self, transport, protocol, iterable):
@@ -165,8 +165,12 @@ from __future__ import (absolute_import, division,
 # We're not using a star import here, because python-future 0.13's `newobject`
 # breaks multiple inheritance due to it's metaclass.
 from future.builtins import map, zip, dict, int, list, range, str
+import time
+
+import numpy as np
 
 from slave.driver import Command, Driver
+import slave.transport
 from slave.types import Boolean, Integer, Register, String
 
 
@@ -195,6 +199,18 @@ EVENT_STATUS_BYTE = {
 PARALLEL_POLL_REGISTER = dict((i, str(i)) for i in range(8, 16))
 
 
+def float_dtype(length, byte_order):
+    """Returns the numpy dtype of binary IEEE 754 floating point data.
+
+    :param length: The length of a value in bits, either 32 or 64.
+    :param byte_order: The byte order configured with `:FORM:BORD`, either
+        'normal' (big endian) or 'swapped' (little endian).
+
+    """
+    order = '<' if byte_order == 'swapped' else '>'
+    return np.dtype('{0}f{1}'.format(order, length // 8))
+
+
 def _construct_register(reg, default_reg):
     """Constructs a register dict."""
     if reg:
@@ -258,6 +274,7 @@ class IEC60488(Driver):
         self.event_status = Command(('*ESR?', Register(esb)))
         self.event_status_enable = Command('*ESE?', '*ESE', Register(esb))
         self.status = Command(('*STB?', Register(stb)))
+        self.status_enable = Command('*SRE?', '*SRE', Register(stb))
         self.operation_complete = Command(('*OPC?', Boolean))
         self.identification = Command(('*IDN?',
                                        [String, String, String, String]))
@@ -270,6 +287,79 @@ class IEC60488(Driver):
         """Sets the operation complete bit high of the event status byte."""
         self._write('*OPC')
 
+    def await_event(self, event='operation complete', timeout=None, poll_interval=0.1):
+        """Waits until an event of the standard event status register occurs.
+
+        The event is enabled in the event status enable register and the
+        event summary bit in the service request enable register. If the
+        transport supports service requests, e.g. the :class:`~.LinuxGpib`
+        transport, the call blocks until the device requests service.
+        Otherwise, the event status register is polled every
+        `poll_interval` seconds. E.g.::
+
+            smu.initiate()
+            smu.await_event('operation complete', timeout=60)
+
+        If the event is 'operation complete', the `*OPC` command is sent to
+        set the bit once all pending operations are finished.
+
+        The previous contents of the event status enable and service
+        request enable registers are restored afterwards.
+
+        .. note::
+
+           Reading the event status register clears it. The event status
+           register is therefore read before the event is armed.
+
+        :param event: The name of the event status register bit.
+        :param timeout: An optional timeout in seconds. If `None`, the call
+            blocks until the event occurs.
+        :param poll_interval: The interval in seconds the event status
+            register is polled, if the transport does not support service
+            requests.
+        :returns: `True` if the event occured, `False` if the timeout
+            expired.
+
+        """
+        if event not in self._esb.values():
+            raise ValueError('Unknown event: {0!r}'.format(event))
+        deadline = None if timeout is None else time.time() + timeout
+        # The enable registers are restored when done.
+        event_status_enable = self.event_status_enable
+        status_enable = self.status_enable
+        self.event_status  # Clears the event status register.
+        try:
+            self.event_status_enable = {event: True}
+            self.status_enable = {self._stb[5]: True}
+            if event == 'operation complete':
+                self.complete_operation()
+            return self._await_event(event, deadline, poll_interval)
+        finally:
+            self.event_status_enable = event_status_enable
+            self.status_enable = status_enable
+
+    def _await_event(self, event, deadline, poll_interval):
+        wait_for_srq = getattr(self._transport, 'wait_for_srq', None)
+        while True:
+            if wait_for_srq:
+                remaining = None if deadline is None else max(0, deadline - time.time())
+                try:
+                    status_byte = wait_for_srq(remaining)
+                except slave.transport.Timeout:
+                    if deadline is None:
+                        # The transport timeout expired, keep waiting.
+                        continue
+                    return False
+                # Ignore service requests of other status bits.
+                if status_byte & (1 << 5) and self.event_status[event]:
+                    return True
+            else:
+                if self.event_status[event]:
+                    return True
+                if deadline is not None and time.time() > deadline:
+                    return False
+                time.sleep(poll_interval)
+
     def reset(self):
         """Performs a device reset."""
         self._write('*RST')
@@ -1,5 +1,7 @@
 # -*- coding: utf-8 -*-
 """Keithley Model 2400 Source-Measure Unit (WIP)"""
+import numpy as np
+
 import slave.iec60488 as iec
 from slave.driver import Command, Driver
 from slave.transport import Transport
@@ -160,7 +162,7 @@ class Sense(Driver):
     def disable_all_functions(self):
         self._write(':SENS%s:FUNC:OFF:ALL' % self._channel)
 
-    def get_data(self, offset=None, size=None):
+    def get_data(self, offset=None, size=None, dtype=None):
         """Returns the array data which contains all of the current measurement data, voltage
         measurement data, resistance measurement data, source output setting data, status
         data, or time data specified by the :FORMat:ELEMents:SENSe command. The data
@@ -175,6 +177,9 @@ class Sense(Driver):
 
             Note: if offset is None, size is ignored.
 
+        :param dtype: The numpy dtype of the data, see :meth:`.Format.dtype`.
+            If given, the data is returned as numpy array.
+
         Note: If trigger count > 1, it returns all the data measured."""
         if offset is None:
             opts = ''
@@ -184,7 +189,10 @@ class Sense(Driver):
             else:
                 opts = '{0}'.format(int(offset))
 
-        return self._query((':SENS{c}:DATA? {o}'.format(c=self._channel, o=opts), Stream(Float)))
+        command = ':SENS{c}:DATA? {o}'.format(c=self._channel, o=opts)
+        if dtype is not None:
+            return self._query_array(command, dtype)
+        return self._query((command, Stream(Float)))
 
     def get_data_latest(self):
         """Returns the latest current measurement data, voltage measurement data, resistance
@@ -488,11 +496,39 @@ class SubSource(Driver):
 
 
 class Format(Driver):
+    """The Format Command Subsystem.
+
+    :ivar sense_elements: The data elements returned by the data queries.
+    :ivar data: The data format, either 'ascii' or a tuple of *(<type>,
+        <length>)*, e.g. ('real', 32). Binary formats are returned as
+        IEEE 488.2 definite length blocks.
+    :ivar byte_order: The byte order of binary data, either 'normal' (big
+        endian) or 'swapped' (little endian).
+    """
     _functions = _sense_functions
 
     def __init__(self, transport, protocol):
         super().__init__(transport, protocol)
         self.sense_elements = Command(':FORM:ELEM:SENS?', ':FORM:ELEM:SENS', Stream(Mapping(self._functions)))
+        self.data = Command(
+            ':FORM:DATA?',
+            ':FORM:DATA',
+            Stream(Mapping({'ascii': 'ASC', 'real': 'REAL', 'sreal': 'SRE'}), Integer)
+        )
+        self.byte_order = Command(':FORM:BORD?', ':FORM:BORD', Mapping({'normal': 'NORM', 'swapped': 'SWAP'}))
+
+    def dtype(self):
+        """Returns the numpy dtype matching the configured data format.
+
+        The dtype is used by the array queries, e.g. :meth:`.Sense.get_data`. It
+        requires two queries, therefore it should be determined once and
+        reused.
+        """
+        data = self.data
+        if data == 'ascii':
+            return np.dtype(float)
+        length = 32 if data == 'sreal' else data[1]
+        return iec.float_dtype(length, self.byte_order)
 
 
 # -----------------------------------------------------------------------------
@@ -541,7 +577,9 @@ class Output(Driver):
 class Trace(Driver):
     """
     :ivar free: the available size (available) and the total size (total) of the trace buffer.
-    :ivar points: the size of the trace buffer"""
+    :ivar points: the size of the trace buffer
+    :ivar feed: the data stored in the trace buffer, 'sense', 'calculate1' or 'calculate2'.
+    :ivar feed_control: 'next' to store the data of the next measurements, or 'never'."""
     def __init__(self, transport, protocol, channel=1):
         super().__init__(transport, protocol)
         self._channel = channel
@@ -549,18 +587,31 @@ class Trace(Driver):
         self.free = _command(m, ':TRAC{c}:FREE?', ':TRAC{c}:FREE', [Integer, Integer])
         self.points = _command(m, ':TRAC{c}:POIN?', 'TRAC{c}:POIN', Integer(1, 100000))
         self.actual_points = _command(m, ':TRAC{c}:POIN:ACT?', type_=Integer)
+        self.feed = _command(m, ':TRAC{c}:FEED?', ':TRAC{c}:FEED',
+                             Mapping({'sense': 'SENS', 'calculate1': 'CALC1', 'calculate2': 'CALC2'}))
+        self.feed_control = _command(m, ':TRAC{c}:FEED:CONT?', ':TRAC{c}:FEED:CONT',
+                                     Mapping({'next': 'NEXT', 'never': 'NEV'}))
 
     def clear(self):
         self._write(':TRAC{c}:CLE'.format(c=self._channel))
 
-    def get_data(self, offset=None, size=None):
+    def get_data(self, offset=None, size=None, dtype=None):
+        """Returns the trace buffer data.
+
+        :param offset: The index of the first data point.
+        :param size: The number of data points. Ignored if offset is `None`.
+        :param dtype: An optional numpy dtype. It is required, if the trace
+            data is transferred in the 'real' or 'sreal' format.
+        """
         command = ':TRAC{c}:DATA?'.format(c=self._channel)
         if offset is not None:
             if size:
                 command += ' {0},{1}'.format(offset, size)
             else:
                 command += ' {0}'.format(offset)
-        self._query((command, Stream(Float)))
+        if dtype is not None:
+            return self._query_array(command, dtype)
+        return self._query((command, Stream(Float)))
 
 
 # -----------------------------------------------------------------------------
@@ -645,6 +696,53 @@ class Setup(object):
         sub.sweep_start = start
         sub.sweep_stop = stop
 
+    def run_sweep(self, elements=None, poll_interval=0.1, timeout=None, dtype=None, channel=1):
+        """Runs a hardware timed sweep and returns the measured data.
+
+        The measurements are stored in the trace buffer. Instead of estimating
+        the duration of the sweep, it waits for the operation complete event,
+        see :meth:`.IEC60488.await_event`. The buffer is transferred once the
+        sweep is finished, e.g.::
+
+            smu.setup.sweep_source('volt', -0.1, 0.1, 2001)
+            data = smu.setup.run_sweep(('voltage', 'current'))
+            resistance = data['voltage'] / data['current']
+
+        :param elements: An optional sequence of sense elements, e.g.
+            `('voltage', 'current')`. By default, the configured elements are
+            used, see :attr:`.Format.sense_elements`.
+        :param poll_interval: The time between the status queries in seconds,
+            if the transport does not support service requests.
+        :param timeout: An optional timeout in seconds. If it expires, the
+            sweep is aborted.
+        :param dtype: The numpy dtype of binary data formats, see
+            :meth:`.Format.dtype`.
+        :param channel: SMU channel, 1. (not used)
+        :returns: A dict with a numpy array for each sense element.
+        :raises TimeoutError: if the sweep did not finish in time.
+        """
+        smu = self._smu
+        if elements is None:
+            elements = list(smu.format.sense_elements)
+        else:
+            elements = list(elements)
+            smu.format.sense_elements = elements
+        trace = smu.traces[channel - 1]
+        trace.feed_control = 'never'
+        trace.clear()
+        trace.points = smu.triggerings[channel - 1].count
+        trace.feed = 'sense'
+        trace.feed_control = 'next'
+
+        smu.initiate()
+        if not smu.await_event('operation complete', timeout, poll_interval):
+            smu.abort()
+            raise TimeoutError('Sweep did not finish in time.')
+        # The K2400 transfers the complete buffer only.
+        data = np.asarray(trace.get_data(dtype=dtype), dtype=float)
+        data = data.reshape(-1, len(elements))
+        return {name: data[:, i] for i, name in enumerate(elements)}
+
     def sense(self, function, auto_range=None, range_=None, nplc=None, compliance=None, channel=1,
               four_wire=None, integration_time=None):
         """Sets up voltage or current sense parameters.
@@ -12,7 +12,8 @@ from slave.iec60488 import (IEC60488, Trigger, ObjectIdentification,
 from slave.types import (Boolean, Enum, Float, Integer, Mapping, String, Set,
     Stream, Register)
 from slave.keithley.k2182 import K2182
-from slave.protocol import IEC60488 as IEC60488Protocol, Timeout, logger, _retry
+from slave.protocol import (IEC60488 as IEC60488Protocol, Protocol, Timeout,
+    logger, _retry)
 
     
 class MediatorProtocol(IEC60488Protocol):
@@ -62,6 +63,10 @@ class MediatorProtocol(IEC60488Protocol):
         logger.debug('IEC60488 write: %r', message)
         with transport:
             transport.write(message)
+
+    def batch(self, transport, units):
+        # Mediated messages can not be joined, send them one by one.
+        return Protocol.batch(self, transport, units)
     
 
 class K6221(IEC60488, Trigger, ObjectIdentification):
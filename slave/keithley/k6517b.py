@@ -1,3 +1,5 @@
+import numpy as np
+
 from slave.driver import Command, Driver
 from slave.types import Boolean, Float, Integer, Mapping, Stream, String
 import slave.iec60488 as iec
@@ -295,6 +297,19 @@ class Format(Driver):
             Mapping({'normal': 'NORM', 'swapped': 'SWAP'})
         )
 
+    def dtype(self):
+        """Returns the numpy dtype matching the configured data format.
+
+        It is used by the array queries, e.g. :meth:`.Trace.get_data`.
+        """
+        data = self.data
+        if data == 'ascii':
+            return np.dtype(float)
+        elif data in ('sreal', 'dreal'):
+            # The sreal and dreal formats always use the swapped byte order.
+            return np.dtype('<f4' if data == 'sreal' else '<f8')
+        return iec.float_dtype(32 if data == 'real32' else 64, self.byte_order)
+
 
 class Output(Driver):
     def __init__(self, transport, protocol):
@@ -958,7 +973,15 @@ class Trace(Driver):
     def get_bytes(self):
         return self._query(':TRAC:FREE?')
 
-    def get_data(self):
+    def get_data(self, dtype=None):
+        """Returns the buffer data.
+
+        :param dtype: The numpy dtype of the buffer readings, as returned by
+            :meth:`.Format.dtype`. If it is omitted, the readings are parsed
+            as ascii data.
+        """
+        if dtype is not None:
+            return self._query_array(':TRAC:DATA?', dtype)
         return self._query((':TRAC:DATA?', Stream(Float)))
 
     def get_latest_data(self):
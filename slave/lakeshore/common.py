@@ -0,0 +1,144 @@
+#  -*- coding: utf-8 -*-
+#
+# Slave, (c) 2015, see AUTHORS.  Licensed under the GNU GPL.
+"""Helpers shared by the Lakeshore temperature controller drivers."""
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+from future.builtins import *
+
+import numpy as np
+
+from slave.driver import Command, Driver
+from slave.types import Float, Integer
+import slave.misc
+
+
+__all__ = ['BaseCurve']
+
+
+class BaseCurve(Driver):
+    """The base class of the Lakeshore curves, implementing the point access.
+
+    The curve models a sequence of points, tuples of
+    *(<units value>, <temp value>)*. Slices are transfered in bulk,
+    :attr:`.batch_size` points are packed into a single program message. The
+    :meth:`.read` and :meth:`.write` methods use numpy arrays of shape
+    *(n, 2)* instead.
+
+    A local copy of the read and written points is kept and only points
+    differing from it are written. The device stores the points with six
+    significant digits, written points are rounded accordingly. If the curve
+    was modified otherwise, e.g. on the front panel, call :meth:`.invalidate`
+    to discard the local copy.
+
+    :param transport: A transport object.
+    :param protocol: A protocol object.
+    :param idx: The curve index.
+    :param length: The curve buffer length.
+    :param writeable: Specifies if the points are writeable.
+
+    :ivar batch_size: The maximum number of points per program message.
+
+    """
+    def __init__(self, transport, protocol, idx, length, writeable=True):
+        super(BaseCurve, self).__init__(transport, protocol)
+        self.idx = int(idx)
+        self.__length = int(length)
+        self._writeable = writeable
+        self.batch_size = 8
+        # The number of significant digits of the stored points.
+        self._digits = 6
+        # The local copy of the points, unknown points are `nan`.
+        self._points = np.full((self.__length, 2), np.nan)
+
+    def __len__(self):
+        """The length of the curve buffer **not** the number of points."""
+        return self.__length
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return self._read_points(range(*item.indices(len(self)))).tolist()
+        item = slave.misc.index(item, len(self))
+        return self._read_points([item])[0].tolist()
+
+    def __setitem__(self, item, value):
+        if not self._writeable:
+            raise AttributeError('Curve is not writeable.')
+        if isinstance(item, slice):
+            indices = range(*item.indices(len(self)))
+            self._write_points(indices[:len(value)], value)
+        else:
+            item = slave.misc.index(item, len(self))
+            self._write_points([item], [value])
+
+    def read(self, start=0, stop=None):
+        """Reads the points in bulk.
+
+        :param start: The index of the first point.
+        :param stop: The index of the last point (exclusive). If `None`, all
+            points up to the buffer length are read.
+        :returns: A numpy array with a row of *(<units value>, <temp value>)*
+            for each point.
+
+        """
+        return self._read_points(range(*slice(start, stop).indices(len(self))))
+
+    def write(self, points, start=0):
+        """Writes the points in bulk.
+
+        Only points differing from the local copy are written.
+
+        :param points: A sequence of *(<units value>, <temp value>)* pairs or
+            an equivalent numpy array. Points exceeding the buffer length are
+            stripped.
+        :param start: The index of the first point.
+
+        """
+        self[start:] = points
+
+    def invalidate(self, *names):
+        """Discards the local copy of the points and the cached responses.
+
+        See :meth:`.Driver.invalidate`.
+
+        """
+        super(BaseCurve, self).invalidate(*names)
+        if not names:
+            self._points[:] = np.nan
+
+    def _read_points(self, indices):
+        # Since indices in the device start at 1, it must be added.
+        cmd = Command((
+            'CRVPT?', [Float, Float], [Integer(min=1), Integer(min=1, max=200)]
+        ))
+        indices = list(indices)
+        for i in range(0, len(indices), self.batch_size):
+            chunk = indices[i:i + self.batch_size]
+            with self.batch() as batch:
+                for item in chunk:
+                    batch.query(cmd, self.idx, item + 1)
+            self._points[chunk] = batch.results
+        return self._points[indices]
+
+    def _write_points(self, indices, points):
+        cmd = Command(write=(
+            'CRVPT', [Integer(min=1), Integer(min=1, max=200), Float, Float]
+        ))
+        indices = np.asarray(indices, dtype=int)
+        points = np.asarray(points, dtype=float).reshape(-1, 2)[:len(indices)]
+        points = _round(points, self._digits)
+        # Unknown points are `nan` and therefore always written.
+        changed = np.any(self._points[indices] != points, axis=1)
+        indices, points = indices[changed], points[changed]
+        for i in range(0, len(indices), self.batch_size):
+            chunk = indices[i:i + self.batch_size]
+            with self.batch() as batch:
+                for item, (unit, temp) in zip(chunk, points[i:i + self.batch_size]):
+                    batch.write(cmd, self.idx, int(item) + 1, unit, temp)
+            self._points[chunk] = points[i:i + self.batch_size]
+
+
+def _round(values, digits):
+    """Rounds the values to the number of significant digits."""
+    rounded = [float('{0:.{1}g}'.format(x, digits)) for x in values.flat]
+    return np.array(rounded, dtype=float).reshape(values.shape)
@@ -44,13 +44,15 @@ from __future__ import (absolute_import, division,
 from future.builtins import *
 import collections
 
+import numpy as np
+
 from slave.driver import Command, Driver
 from slave.iec60488 import IEC60488
+from slave.lakeshore.common import BaseCurve
 from slave.types import Boolean, Enum, Float, Integer, Register, Set, String
-import slave.misc
 
 
-class Curve(Driver):
+class Curve(BaseCurve):
     """Represents a LS340 curve.
 
     :param transport: A transport object.
@@ -111,19 +113,19 @@ class Curve(Driver):
         # This will copy all points in the sequence, but points exceeding the
         # buffer length are stripped.
 
+    The points are transfered in bulk and a local copy of the read points is
+    kept, see :class:`~slave.lakeshore.common.BaseCurve`.
+
     .. warning ::
 
         In contrast to the LS340 device, point indices start at 0 **not** 1.
 
     """
     def __init__(self, transport, protocol, idx, writeable, length=None):
-        super(Curve, self).__init__(transport, protocol)
-        self.idx = idx = int(idx)
-        self.__length = length or 200
         # curves 1-20 are internal and not writeable.
-        self._writeable = writeable
-        self.header = Command('CRVHDR? {0}'.format(idx),
-                              'CRVHDR {0},'.format(idx) if writeable else None,
+        super(Curve, self).__init__(transport, protocol, idx, length or 200, writeable)
+        self.header = Command('CRVHDR? {0}'.format(self.idx),
+                              'CRVHDR {0},'.format(self.idx) if writeable else None,
                               [String(max=15),
                                String(max=10),
                                Enum('mV/K', 'V/K', 'Ohm/K',
@@ -131,35 +133,6 @@ class Curve(Driver):
                                Float(min=0.),
                                Enum('negative', 'positive', start=1)])
 
-    def __len__(self):
-        """The length of the curve buffer **not** the number of points."""
-        return self.__length
-
-    def __getitem__(self, item):
-        if isinstance(item, slice):
-            indices = item.indices(len(self))
-            return [self[i] for i in range(*indices)]
-        # Simple index
-        item = slave.misc.index(item, len(self))
-        response_t = [Float, Float]
-        data_t = [Integer(min=1), Integer(min=1, max=200)]
-        # Since indices in LS304 start at 1, it must be added.
-        return self._query(('CRVPT?', response_t, data_t), self.idx, item + 1)
-
-    def __setitem__(self, item, value):
-        if not self._writeable:
-            raise AttributeError('Curve is not writeable.')
-        if isinstance(item, slice):
-            indices = item.indices(min(len(self), len(value)))
-            for i in range(*indices):
-                self[i] = value[i]
-        else:
-            item = slave.misc.index(item, len(self))
-            unit, temp = value
-            data_t = [Integer(min=1), Integer(min=1, max=200), Float, Float]
-            # Since indices in LS304 start at 1, it must be added.
-            self._write(('CRVPT', data_t), self.idx, item + 1, unit, temp)
-
     def delete(self):
         """Deletes the current curve.
 
@@ -169,6 +142,7 @@ class Curve(Driver):
         """
         if self._writeable:
             self._write(('CRVDEL', Integer), self.idx)
+            self._points[:] = np.nan
         else:
             raise RuntimeError('Can not delete read-only curves.')
 
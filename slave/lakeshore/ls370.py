@@ -6,13 +6,15 @@ from __future__ import (absolute_import, division,
 from future.builtins import *
 import collections
 
+import numpy as np
+
 from slave.driver import Command, Driver, CommandSequence
 from slave.iec60488 import IEC60488
+from slave.lakeshore.common import BaseCurve
 from slave.types import Boolean, Enum, Float, Integer, Register, Set, String
-import slave.misc
 
 
-class Curve(Driver):
+class Curve(BaseCurve):
     """A LS370 curve.
 
     :param transport: A transport object.
@@ -51,6 +53,9 @@ class Curve(Driver):
         # Set the fifth data point to 0.10191 sensor units and 470.000 K.
         curve[5] = 0.10191, 470.000
 
+    The points are transfered in bulk and a local copy of the read points is
+    kept, see :class:`~slave.lakeshore.common.BaseCurve`.
+
     .. note::
 
         Be aware that the builtin :func:`len()` function returns the buffer
@@ -62,11 +67,12 @@ class Curve(Driver):
 
     """
     def __init__(self, transport, protocol, idx, length):
-        super(Curve, self).__init__(transport, protocol)
-        self.idx = idx = int(idx)
+        if length <= 0:
+            raise ValueError('length must be a positive integer > 0')
+        super(Curve, self).__init__(transport, protocol, idx, length)
         self.header = Command(
-            'CRVHDR? {0}'.format(idx),
-            'CRVHDR {0},'.format(idx),
+            'CRVHDR? {0}'.format(self.idx),
+            'CRVHDR {0},'.format(self.idx),
             [
                 String(max=15),
                 String(max=10),
@@ -74,42 +80,11 @@ class Curve(Driver):
                 Float(min=0.),Enum('negative', 'positive', start=1)
             ]
         )
-        if length > 0:
-            self.__length = int(length)
-        else:
-            raise ValueError('length must be a positive integer > 0')
-
-    def __len__(self):
-        """The length of the curve buffer **not** the number of points."""
-        return self.__length
-
-    def __getitem__(self, item):
-        if isinstance(item, slice):
-            indices = item.indices(len(self))
-            return [self[i] for i in range(*indices)]
-        # Simple index
-        item = slave.misc.index(item, len(self))
-        # construct command
-        response_t = [Float, Float]
-        data_t = [Integer(min=1), Integer(min=1, max=200)]
-        # Since indices in LS304 start at 1, it must be added.
-        return self._query(('CRVPT?', response_t, data_t), self.idx, item + 1)
-
-    def __setitem__(self, item, value):
-        if isinstance(item, slice):
-            indices = item.indices(min(len(self), len(value)))
-            for i in range(*indices):
-                self[i] = value[i]
-        else:
-            item = slave.misc.index(item, len(self))
-            unit, temp = value
-            data_t = [Integer(min=1), Integer(min=1, max=200), Float, Float]
-            # Since indices in LS304 start at 1, it must be added.
-            self._write(('CRVPT', data_t), self.idx, item + 1, unit, temp)
 
     def delete(self):
         """Deletes this curve."""
         self._write(('CRVDEL', Integer), self.idx)
+        self._points[:] = np.nan
 
 
 class Display(Driver):
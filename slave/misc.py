@@ -6,13 +6,20 @@ from __future__ import (absolute_import, division,
 from future.builtins import *
 import future.utils
 
+import bisect
 import csv
 import collections
 import threading
 import logging
 import os.path
 import io
+import queue
 import functools
+import math
+import sys
+import time
+
+import numpy as np
 
 
 SI_PREFIX = {
@@ -124,15 +131,29 @@ class AutoRange(object):
     as the largest range, where the mean is smaller than `scale * range`. If
     the mean is larger than any range, the largest range is returned.
 
+    The mean is updated in constant time and the range is looked up with a
+    binary search. To avoid switching back and forth between two ranges,
+    a `hysteresis` can be given. A larger range is chosen as soon as the mean
+    exceeds the current range, but a smaller range only if the mean is
+    smaller than `(1 - hysteresis) * scale * range`.
+
+    Several buffered samples are processed at once by :meth:`.range_array`,
+    e.g.::
+
+        auto = AutoRange(ranges)
+        sens = auto.range_array(np.hypot(x, y))
+
     :param range: A sequence of sensitivity ranges.
     :param names: An optional sequence of names corresponding to the ranges. If
         given, :meth:`AutoRange.range` returns the name instead of the range.
     :param scale: An optional parameter scaling the ranges.
     :param buffer_len: Defines the buffer length used to calculate the mean
-        value in :meth:`~.AutoRange.range`.
+        value in :meth:`~.AutoRange.range`. If `None`, the mean of all values
+        is used.
+    :param hysteresis: The relative hysteresis of range decreases.
 
     """
-    def __init__(self, ranges, names=None, scale=1., buffer_len=10):
+    def __init__(self, ranges, names=None, scale=1., buffer_len=10, hysteresis=0.):
         if names:
             if len(ranges) != len(names):
                 raise ValueError('Unequal length of names and ranges.')
@@ -140,23 +161,257 @@ class AutoRange(object):
         else:
             self._mapping = None
         self.ranges = sorted(ranges)
+        self._hysteresis = 0.
         self.scale = scale
+        self.hysteresis = hysteresis
         self._buffer = collections.deque(maxlen=buffer_len)
+        self._sum = 0.
+        self._updates = 0
+        self._index = None
+
+    @property
+    def scale(self):
+        return self._scale
+
+    @scale.setter
+    def scale(self, value):
+        self._scale = value
+        self._upper = [value * r for r in self.ranges]
+        self._lower = [(1 - self._hysteresis) * x for x in self._upper]
+
+    @property
+    def hysteresis(self):
+        return self._hysteresis
+
+    @hysteresis.setter
+    def hysteresis(self, value):
+        if not 0 <= value < 1:
+            raise ValueError('Hysteresis must be in the interval [0, 1).')
+        self._hysteresis = value
+        self._lower = [(1 - value) * x for x in self._upper]
 
     def range(self, value):
         """Estimates an appropriate sensitivity range."""
-        self._buffer.append(abs(value))
-        mean = sum(self._buffer) / len(self._buffer)
-        estimate = next(
-            (r for r in self.ranges if mean < self.scale * r),
-            self.ranges[-1]
-        )
+        value = abs(value)
+        buffer = self._buffer
+        if len(buffer) == buffer.maxlen:
+            self._sum -= buffer[0]
+        buffer.append(value)
+        self._sum += value
+        # Recalculate the sum periodically, to avoid accumulating rounding
+        # errors. The period grows with the buffer, keeping the cost constant
+        # on average.
+        self._updates += 1
+        if self._updates >= len(buffer):
+            self._sum = math.fsum(buffer)
+            self._updates = 0
+        return self._estimate(self._sum / len(buffer))
+
+    def range_array(self, values):
+        """Estimates an appropriate sensitivity range from an array of values.
+
+        The values are appended to the buffer at once, followed by a single
+        estimate.
+
+        """
+        values = np.abs(np.asarray(values, dtype=float)).ravel()
+        if not len(values):
+            raise ValueError('Empty array.')
+        if self._buffer.maxlen is not None:
+            values = values[-self._buffer.maxlen:]
+        self._buffer.extend(values.tolist())
+        self._sum = math.fsum(self._buffer)
+        self._updates = 0
+        return self._estimate(self._sum / len(self._buffer))
+
+    @staticmethod
+    def range_all(autoranges, samples):
+        """Estimates the ranges of several instruments at once.
+
+        :param autoranges: A sequence of :class:`~.AutoRange` instances.
+        :param samples: A two dimensional array with a row of buffered
+            samples for each autorange.
+        :returns: A list of estimated ranges.
+
+        """
+        samples = np.asarray(samples, dtype=float)
+        if samples.ndim != 2 or len(samples) != len(autoranges):
+            raise ValueError('Expected a row of samples for each autorange.')
+        return [auto.range_array(row) for auto, row in zip(autoranges, samples)]
+
+    def reset(self):
+        """Clears the buffered values and the current range."""
+        self._buffer.clear()
+        self._sum = 0.
+        self._updates = 0
+        self._index = None
+
+    def _estimate(self, mean):
+        index = bisect.bisect_right(self._upper, mean)
+        if self._index is not None and index < self._index:
+            # Decrease the range only if the mean is below the hysteresis.
+            index = min(self._index, bisect.bisect_right(self._lower, mean))
+        index = self._index = min(index, len(self.ranges) - 1)
+        estimate = self.ranges[index]
         if self._mapping:
             return self._mapping[estimate]
         else:
             return estimate
 
 
+def transport_key(fn):
+    """Returns the transport used by the callable `fn`.
+
+    The transport is looked up in the following order:
+
+     * the `transport` attribute of the callable,
+     * the transport of the driver, if `fn` is a bound driver method,
+     * the transport of the driver referenced by `fn`, if `fn` is a function
+       referencing the drivers of a single transport via its closure, its
+       default arguments or global names, e.g. `lambda: ppms.temperature`.
+
+    If no transport is found, the callable itself is returned.
+
+    """
+    try:
+        return fn.transport
+    except AttributeError:
+        pass
+    try:
+        return fn.__self__._transport
+    except AttributeError:
+        pass
+    transports = []
+    for obj in _referenced_objects(fn):
+        transport = getattr(obj, '_transport', None)
+        if transport is not None and not any(transport is t for t in transports):
+            transports.append(transport)
+    return transports[0] if len(transports) == 1 else fn
+
+
+def _referenced_objects(fn):
+    """Yields the objects referenced by the function `fn`."""
+    for cell in getattr(fn, '__closure__', None) or ():
+        try:
+            yield cell.cell_contents
+        except ValueError:
+            # Empty cell
+            pass
+    for value in getattr(fn, '__defaults__', None) or ():
+        yield value
+    code, namespace = getattr(fn, '__code__', None), getattr(fn, '__globals__', {})
+    for name in getattr(code, 'co_names', ()):
+        if name in namespace:
+            yield namespace[name]
+
+
+def bind_transport(fn, transport):
+    """Marks the callable `fn` as communicating via `transport`.
+
+    E.g.::
+
+        measurables = [
+            bind_transport(lambda: ppms.temperature, ppms._transport),
+            bind_transport(lambda: ppms.field, ppms._transport),
+        ]
+
+    """
+    fn.transport = transport
+    return fn
+
+
+class Scheduler(object):
+    """Evaluates callables concurrently.
+
+    The callables are grouped by the key returned by the `key` function, by
+    default the transport they use. The groups are evaluated in parallel,
+    each in its own thread, while the callables of a group are evaluated
+    sequentially in the given order. The duration of a call is therefore the
+    maximum instead of the sum of the group durations.
+
+    Callables sharing a transport are serialized by its lock in any case.
+    Grouping them avoids blocked threads and keeps their order.
+
+    The groups are evaluated by a pool of persistent worker threads, which is
+    grown on demand. The first group is evaluated by the calling thread.
+
+    :param key: A function returning the grouping key of a callable. The key
+        must be hashable. Default: :func:`.transport_key`.
+
+    """
+    def __init__(self, key=transport_key):
+        self._key = key
+        self._tasks = queue.Queue()
+        self._workers = []
+        self._lock = threading.Lock()
+
+    def __call__(self, callables):
+        """Evaluates the callables and returns their results in order.
+
+        If a callable raises an exception, it is reraised after all groups
+        have finished.
+
+        """
+        groups = collections.OrderedDict()
+        for i, fn in enumerate(callables):
+            groups.setdefault(self._key(fn), []).append((i, fn))
+        groups = list(groups.values())
+
+        results = [None] * sum(len(g) for g in groups)
+        errors = []
+
+        def evaluate(group):
+            try:
+                for i, fn in group:
+                    results[i] = fn()
+            except Exception:
+                errors.append(sys.exc_info())
+
+        done = queue.Queue()
+        self._start_workers(len(groups) - 1)
+        for group in groups[1:]:
+            self._tasks.put((evaluate, group, done))
+        if groups:
+            evaluate(groups[0])
+        for _ in groups[1:]:
+            done.get()
+        if errors:
+            future.utils.reraise(*errors[0])
+        return results
+
+    def close(self):
+        """Stops the worker threads."""
+        with self._lock:
+            for _ in self._workers:
+                self._tasks.put(None)
+            for worker in self._workers:
+                worker.join()
+            self._workers = []
+
+    def _start_workers(self, count):
+        with self._lock:
+            while len(self._workers) < count:
+                worker = threading.Thread(target=self._work)
+                worker.daemon = True
+                worker.start()
+                self._workers.append(worker)
+
+    def _work(self):
+        while True:
+            task = self._tasks.get()
+            if task is None:
+                return
+            evaluate, group, done = task
+            try:
+                evaluate(group)
+            finally:
+                done.put(None)
+
+
+def _sequential(callables):
+    return [fn() for fn in callables]
+
+
 class Measurement(object):
     """Small measurement helper class.
 
@@ -181,18 +436,43 @@ class Measurement(object):
     :param measurables: A sequence of callables.
     :param names: An optional sequence of names, used to create the csv header.
         The number of names and measurables must be equal.
+    :param scheduler: An optional callable, receiving a list of callables and
+        returning their results, e.g. a :class:`.Scheduler` instance to
+        evaluate the measurables concurrently. By default, the measurables
+        are evaluated sequentially. If the scheduler has a `close` method, it
+        is called when the measurement is closed.
+
+    To group the measurables of a scheduler by transport, mark them with
+    :func:`.bind_transport`, e.g.::
+
+        measurables = [
+            bind_transport(lambda: ppms.temperature, ppms._transport),
+            bind_transport(lambda: ppms.field, ppms._transport),
+            bind_transport(lambda: lia.x, lia._transport),
+        ]
+        with Measurement('data.csv', measurables, scheduler=Scheduler()) as m:
+            m()
+    :param writer: An optional writer factory, called with the path and names,
+        e.g. a :class:`~slave.writer.NpyWriter`. The returned object must
+        implement the `writerow` and `close` methods. By default, each row is
+        written directly to a csv file.
 
     """
-    def __init__(self, path, measurables, names=None):
+    def __init__(self, path, measurables, names=None, scheduler=None, writer=None):
         self._path = path
         self._measurables = measurables
         self._names = names
+        self._scheduler = scheduler or _sequential
+        self._writer_factory = writer
         self._file = None
         self._writer = None
         self.open()
 
     def open(self):
-        if not self._file:
+        if self._writer_factory:
+            if not self._writer:
+                self._writer = self._writer_factory(self._path, self._names)
+        elif not self._file:
             if future.utils.PY3:
                 self._file = open(self._path, 'w', newline='')
             else:
@@ -202,12 +482,23 @@ class Measurement(object):
                 self._writer.writerow(self._names)
 
     def close(self):
-        if self._file:
-            self._file.close()
+        try:
+            if self._file:
+                self._file.close()
+            elif self._writer:
+                self._writer.close()
+        finally:
             self._writer = None
+            # Stops the worker threads of a Scheduler.
+            close = getattr(self._scheduler, 'close', None)
+            if close:
+                close()
 
     def __call__(self):
-        self._writer.writerow([str(x()) for x in self._measurables])
+        row = self._scheduler(self._measurables)
+        if not self._writer_factory:
+            row = [str(x) for x in row]
+        self._writer.writerow(row)
 
     def __enter__(self):
         return self
@@ -229,8 +520,8 @@ class LockInMeasurement(Measurement):
         ppms.set_temperature(2, 10)
 
         env_params = [
-            lambda: ppms.temperature,
-            lambda: ppms.field,
+            bind_transport(lambda: ppms.temperature, ppms._transport),
+            bind_transport(lambda: ppms.field, ppms._transport),
         ]
         names = ['x1', 'y1', 'x2', 'y2', 'temperature', 'field']
 
@@ -241,15 +532,23 @@ class LockInMeasurement(Measurement):
     :param lockins: A sequence of lockin drivers. A lockin driver must have a
         readable `x` and `y` attribute to get the data. Additionally a readable
         `SENSITIVITY` attribute and a read and writeable `sensitivity`
-        attribute are mandatory.
+        attribute are mandatory. The sensitivity is read in every row, unless
+        its response is cached, see :meth:`.Driver.enable_cache`.
     :param measurables: An optional sequence of functions.
     :param names: A sequence of names used to generate the csv file header.
     :param bool autorange: Enables/disables auto ranging.
+    :param scheduler: An optional scheduler, see :class:`.Measurement`. The
+        lock-in readings are grouped with the transport of the lock-in driver.
+    :param writer: An optional writer factory, see :class:`.Measurement`.
 
     """
-    def __init__(self, path, lockins, measurables=None, names=None, autorange=True):
-        super(LockInMeasurement, self).__init__(path, measurables or [], names=names)
+    def __init__(self, path, lockins, measurables=None, names=None, autorange=True, scheduler=None, writer=None):
+        super(LockInMeasurement, self).__init__(path, measurables or [], names=names, scheduler=scheduler, writer=writer)
         self._lockins = lockins
+        self._readings = [
+            bind_transport(lambda lia=lia: (lia.x, lia.y), getattr(lia, '_transport', lia))
+            for lia in lockins
+        ]
         self._autorange = []
         if autorange:
             for lia in lockins:
@@ -260,8 +559,8 @@ class LockInMeasurement(Measurement):
                 self._autorange.append(AutoRange(ranges, names))
 
     def __call__(self):
-        lockin_xy = [(lia.x, lia.y) for lia in self._lockins]
-        optional_data = [m() for m in self._measurables]
+        data = self._scheduler(self._readings + list(self._measurables))
+        lockin_xy, optional_data = data[:len(self._lockins)], data[len(self._lockins):]
         # If autoranging is enabled,
         if self._autorange:
             for lia, auto, (x, y) in zip(self._lockins, self._autorange, lockin_xy):
@@ -274,6 +573,85 @@ class LockInMeasurement(Measurement):
         self._writer.writerow(data)
 
 
+class Sweep(object):
+    """Calls a measurement repeatedly until a sweep is finished.
+
+    The measurement and the stop condition run on independent timers. The
+    measurement is called at the target `rate`, with a pause of `delay`
+    seconds after each call or as fast as possible, while `done` is polled
+    every `poll_interval` seconds. The sweep therefore stops within one poll
+    interval (plus the duration of a measurement) of the condition becoming
+    true, independent of the measurement rate. E.g.::
+
+        sweep = Sweep(measure, lambda: ppms.system_status['magnet'] == 'driven, stable')
+        sweep.run()
+        print('Measured {0} points at {1} Hz'.format(sweep.count, sweep.sample_rate))
+
+    :param measure: A callable performing a single measurement or `None`.
+    :param done: A callable returning `True` when the sweep is finished. It
+        is polled before the first measurement.
+    :param rate: The target measurement rate in Hz. If `None`, measurements
+        are taken as fast as possible.
+    :param poll_interval: The time between calls to `done` in seconds.
+    :param delay: The pause after each measurement in seconds. It can not be
+        combined with a `rate`.
+    :param clock: A callable returning the current time in seconds.
+        Default: :func:`time.time`.
+    :param sleep: A callable suspending the execution for the given number of
+        seconds. Default: :func:`time.sleep`.
+
+    :ivar count: The number of measurements of the last run.
+    :ivar elapsed: The duration of the last run in seconds.
+
+    """
+    def __init__(self, measure, done, rate=None, poll_interval=1., delay=None,
+                 clock=time.time, sleep=time.sleep):
+        if not (measure is None or hasattr(measure, '__call__')):
+            raise TypeError('measure parameter not callable.')
+        if rate and delay is not None:
+            raise ValueError('rate and delay are mutually exclusive.')
+        self.measure = measure
+        self.done = done
+        self.rate = rate
+        self.poll_interval = poll_interval
+        self.delay = delay
+        self._clock = clock
+        self._sleep = sleep
+        self.count = 0
+        self.elapsed = 0.
+
+    @property
+    def sample_rate(self):
+        """The achieved measurement rate of the last run in Hz."""
+        return self.count / self.elapsed if self.elapsed else 0.
+
+    def run(self):
+        """Runs the sweep and returns itself."""
+        period = 1. / self.rate if self.rate else 0.
+        start = next_poll = next_measurement = self._clock()
+        self.count = 0
+        while True:
+            now = self._clock()
+            if now >= next_poll:
+                if self.done():
+                    break
+                next_poll = now + self.poll_interval
+            if self.measure is None:
+                next_measurement = next_poll
+            elif now >= next_measurement:
+                self.measure()
+                self.count += 1
+                if self.delay is not None:
+                    next_measurement = self._clock() + self.delay
+                else:
+                    # Keep the cadence, unless the measurement falls behind.
+                    next_measurement = max(next_measurement + period, now)
+                continue
+            self._sleep(max(min(next_poll, next_measurement) - self._clock(), 0))
+        self.elapsed = self._clock() - start
+        return self
+
+
 def wrap_exception(exc, new_exc):
     """Catches exceptions `exc` and raises `new_exc(exc)` instead.
 
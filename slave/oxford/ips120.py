@@ -7,6 +7,7 @@ from future.builtins import *
 import time
 
 from slave.driver import Driver, Command
+from slave.misc import Sweep
 from slave.types import String, Float, Enum
 from slave.protocol import OxfordIsobus
 
@@ -174,7 +175,7 @@ class IPS120(Driver):
         while self.status['mode'] != 'at rest':
             time.sleep(1)
         
-    def scan_field(self, measure, target, rate, delay=1):
+    def scan_field(self, measure, target, rate, delay=1, poll_interval=1):
         """Performs a field scan.
 
         Measures until the target field is reached.
@@ -184,6 +185,10 @@ class IPS120(Driver):
         :param field: The target field in Tesla.
         :param rate: The field rate in tesla per minute.
         :param delay: The time delay between each call to measure in seconds.
+            If it is `0`, measure is called as fast as possible.
+        :param poll_interval: The time between status checks in seconds.
+        :returns: The finished :class:`~slave.misc.Sweep`, e.g. to get the
+            achieved sample rate.
 
         :raises TypeError: if measure parameter is not callable.
 
@@ -194,9 +199,12 @@ class IPS120(Driver):
         self.field.target = target
         self.field.sweep_rate = rate
         self.activity = 'to setpoint'
-        while self.status['mode'] != 'at rest':
-            measure()
-            time.sleep(delay)
+        return Sweep(
+            measure,
+            lambda: self.status['mode'] == 'at rest',
+            poll_interval=poll_interval,
+            delay=delay
+        ).run()
 
 
 class Current(Driver):
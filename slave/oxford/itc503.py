@@ -5,7 +5,10 @@ from __future__ import (absolute_import, division,
                         print_function, unicode_literals)
 from future.builtins import *
 
+import numpy as np
+
 from slave.driver import Command, Driver
+from slave.misc import Sweep
 from slave.types import Boolean, Enum, Float, Integer, Register, String
 from slave.protocol import OxfordIsobus
 
@@ -79,8 +82,10 @@ class ITC503(Driver):
         self.gas_flow = Command('R7', 'G', Float(min=0, max=99.9))
         self.heater = Command('R5', 'O', Float(min=0, max=99.9))
 
-        self.sweep_table = SweepTable(self._transport, self._protocol)
-        self.pid_table = PIDTable(self._transport, self._protocol)
+        # Both tables are accessed through the same x and y pointers.
+        pointer = [None, None]
+        self.sweep_table = SweepTable(self._transport, self._protocol, pointer)
+        self.pid_table = PIDTable(self._transport, self._protocol, pointer)
 
         self.target_temperature = Command('R0', 'T', Float)
 
@@ -162,7 +167,7 @@ class ITC503(Driver):
             'auto_pid': bool(int(auto_pid)),
         }
 
-    def scan_temperature(self, measure, temperature, rate, delay=1):
+    def scan_temperature(self, measure, temperature, rate, delay=1, poll_interval=1):
         """Performs a temperature scan.
 
         Measures until the target temperature is reached.
@@ -172,6 +177,10 @@ class ITC503(Driver):
         :param temperature: The target temperature in kelvin.
         :param rate: The sweep rate in kelvin per minute.
         :param delay: The time delay between each call to measure in seconds.
+            If it is `0`, measure is called as fast as possible.
+        :param poll_interval: The time between setpoint updates in seconds.
+        :returns: The finished :class:`~slave.misc.Sweep`, e.g. to get the
+            achieved sample rate.
 
         """
         # set target temperature to current control temperature
@@ -179,23 +188,22 @@ class ITC503(Driver):
         # we use a positive sign for the sweep rate if we sweep up and negative
         # if we sweep down.
         rate = abs(rate) if temperature - Tset > 0 else -abs(rate)
-        
-        t_last = time.time()
-        time.sleep(delay)
-        while True:
-            measure()
-            
-            # Update setpoint
+        # The time and setpoint of the last update.
+        last = [time.time(), Tset]
+
+        def update_setpoint():
             t_now = time.time()
-            dt = t_now - t_last
-            dT =  dt * rate / 60.
-            t_last = t_now
-            if abs(temperature - Tset) < abs(dT):
+            dT = (t_now - last[0]) * rate / 60.
+            last[0] = t_now
+            if abs(temperature - last[1]) < abs(dT):
                 self.target_temperature = temperature
-                break
-            else:
-                self.target_temperature = Tset = Tset + dT
-            time.sleep(delay)
+                return True
+            last[1] += dT
+            self.target_temperature = last[1]
+            return False
+        return Sweep(
+            measure, update_setpoint, poll_interval=poll_interval, delay=delay
+        ).run()
         
     def scan_temperature_old(self, measure, temperature, rate, delay=1):
         """Performs a temperature scan.
@@ -279,76 +287,113 @@ class Table(Driver):
     Inheriting classes need to implement a `_item` command used
     to read and write the table.
 
+    The table keeps track of the x and y pointers and skips redundant pointer
+    writes. Additionally, a local copy of the table is kept and only cells
+    differing from it are written. If the table is modified otherwise, call
+    :meth:`.invalidate` to discard the local copy.
+
+    :param pointer: The pointer state, a list of the current x and y pointers.
+        Tables accessed through the same pointers must share it.
+
     """
-    def __init__(self, transport, protocol, shape):
+    def __init__(self, transport, protocol, shape, pointer=None):
         super(Table, self).__init__(transport, protocol)
         self._shape = shape
+        # The current one based x and y pointers, `None` if unknown.
+        self._pointer = [None, None] if pointer is None else pointer
+        # The local copy of the table, unknown cells are `nan`.
+        self._table = np.full(shape, np.nan)
 
     @property
     def shape(self):
         return self._shape
 
-    def _read_item(self, x, y):
-        # recursively build a list of items if x is a slice
-        if isinstance(x, slice):
-            return [self._read_item(xi, y) for xi in range(*x.indices(self.shape[0]))]
-        if isinstance(y, slice):
-            return [self._read_item(x, yi) for yi in range(*y.indices(self.shape[1]))]
-        # The ITC uses one based indexing, therefore we increase x and y
-        # by one
-        x, y = x % self.shape[0] + 1, y % self.shape[1] + 1
-        # Direct pointer to table entry.
-        self._write(('x', Integer), x)
-        self._write(('y', Integer), y)
-        return self._item
-
-    def _write_item(self, x, y, value):
-        # recursively walk through a list of items if x is a slice
-        if isinstance(x, slice):
-            # TODO assign complete table
-            for xi in range(*x.indices(self.shape[0])):
-                self._write_item(xi, y, value)
-        elif isinstance(y, slice):
-            # Check if sizes match
-            y_values = range(*y.indices(self.shape[1]))
-            try:
-                if len(y_values) == len(value):
-                    for yi, vi in zip(y_values, value):
-                        self._write_item(x, yi, vi)
-                else:
-                    raise ValueError('Size missmatch: {} != {}'.format(len(y_values), len(value)))
-            except TypeError:
-                for yi in y_values:
-                    self._write_item(x, yi, value)
-        else:
-            # The ITC uses one based indexing, therefore we increase x and y
-            # by one
-            x, y = x % self.shape[0] + 1, y % self.shape[1] + 1
-            # Direct pointer to table entry.
-            self._write(('x', Integer), x)
-            self._write(('y', Integer), y)
-            self._item = value
+    def read(self):
+        """Reads the complete table and returns it as numpy array."""
+        return self._read_cells(range(self.shape[0]), range(self.shape[1]))
 
-    def __len__(self):
-        return self.shape[0]
+    def write(self, values):
+        """Writes the complete table.
 
-    def __getitem__(self, item):
+        :param values: The table values, an array-like object broadcastable
+            to the table shape.
+
+        """
+        self[:, :] = values
+
+    def invalidate(self, *names):
+        """Discards the local copy of the table, the pointer state and the
+        cached responses.
+
+        See :meth:`.Driver.invalidate`.
+
+        """
+        super(Table, self).invalidate(*names)
+        if not names:
+            # The pointer state might be shared, it is reset in place.
+            self._pointer[:] = [None, None]
+            self._table[:] = np.nan
+
+    def _point(self, x, y):
+        """Sets the x and y pointers to the zero based table entry."""
+        # The ITC uses one based indexing, therefore we increase x and y
+        # by one
+        for i, (header, value) in enumerate([('x', x + 1), ('y', y + 1)]):
+            if self._pointer[i] != value:
+                # The pointer is unknown, if the write fails.
+                self._pointer[i] = None
+                self._write((header, Integer), value)
+                self._pointer[i] = value
+
+    def _read_cells(self, xs, ys):
+        xs, ys = list(xs), list(ys)
+        for x in xs:
+            for y in ys:
+                self._point(x, y)
+                self._table[x, y] = self._item
+        return self._table[np.ix_(xs, ys)]
+
+    def _write_cells(self, xs, ys, values):
+        for x, row in zip(xs, values):
+            for y, value in zip(ys, row):
+                # Unknown cells are `nan` and therefore always written.
+                if self._table[x, y] != value:
+                    self._point(x, y)
+                    self._table[x, y] = np.nan
+                    self._item = value
+                    self._table[x, y] = value
+
+    def _indices(self, item):
+        """Returns the row and column indices and the shape of the selection."""
         if isinstance(item, tuple):
             # Both rows and columns are given
             x, y = item
         else:
             # Only rows are given
             x, y = item, slice(0, self.shape[1])
-        return self._read_item(x, y)
+        indices, shape = [], []
+        for i, length in zip((x, y), self.shape):
+            if isinstance(i, slice):
+                indices.append(list(range(*i.indices(length))))
+                shape.append(len(indices[-1]))
+            else:
+                indices.append([i % length])
+        return indices[0], indices[1], tuple(shape)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, item):
+        xs, ys, shape = self._indices(item)
+        return self._read_cells(xs, ys).reshape(shape).tolist()
 
     def __setitem__(self, item, value):
-        if isinstance(item, tuple):
-            # Both rows and columns are given
-            x, y = item
-        else:
-            # Only rows are given
-            x, y = item, slice(0, self.shape[1])
-        return self._write_item(x, y, value)
+        xs, ys, shape = self._indices(item)
+        try:
+            values = np.broadcast_to(np.asarray(value, dtype=float), shape)
+        except ValueError:
+            raise ValueError('Size missmatch: {} != {}'.format(np.shape(value), shape))
+        self._write_cells(xs, ys, values.reshape(len(xs), len(ys)))
 
 
 class SweepTable(Table):
@@ -370,8 +415,8 @@ class SweepTable(Table):
         row = itc.sweep_table[::2]
 
     """
-    def __init__(self, transport, protocol):
-        super(SweepTable, self).__init__(transport, protocol, shape=(16, 3))
+    def __init__(self, transport, protocol, pointer=None):
+        super(SweepTable, self).__init__(transport, protocol, shape=(16, 3), pointer=pointer)
         self._item = Command('r', 's', Float)
 
     def clear(self):
@@ -381,6 +426,8 @@ class SweepTable(Table):
         except OxfordIsobus.InvalidRequestError:
             # Wipe command was not recognized. Try manual wiping
             self[:] = 0
+        else:
+            self._table[:] = 0
             
             
 class PIDTable(Table):
@@ -403,8 +450,8 @@ class PIDTable(Table):
         row = itc.pid_table[::2]
 
     """
-    def __init__(self, transport, protocol):
-        super(PIDTable, self).__init__(transport, protocol, shape=(32, 4))
+    def __init__(self, transport, protocol, pointer=None):
+        super(PIDTable, self).__init__(transport, protocol, shape=(32, 4), pointer=pointer)
         self._item = Command('q', 'p', Float)
 
     def clear(self):
@@ -413,4 +460,6 @@ class PIDTable(Table):
             self._write('w')
         except OxfordIsobus.InvalidRequestError:
             # Wipe command was not recognized. Try manual wiping
-            self[:] = 0
\ No newline at end of file
+            self[:] = 0
+        else:
+            self._table[:] = 0
\ No newline at end of file
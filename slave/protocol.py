@@ -27,12 +27,43 @@ import logging
 import functools
 import time
 
-from slave.transport import Timeout
+import numpy as np
+
+from slave.transport import ConnectionLost, Timeout
 
 logger = logging.getLogger(__name__)
 logger.addHandler(logging.NullHandler())
 
 
+class _Template(object):
+    """A precompiled message.
+
+    The message framing and header are encoded once, only the data is encoded
+    when the message is created.
+
+    :param head: The message string preceding the header separator.
+    :param data_head: The message string preceding the data.
+    :param data_sep: The data separator string.
+    :param term: The message terminator string.
+    :param encoding: The message encoding.
+
+    """
+    __slots__ = ('empty', 'head', 'data_sep', 'term', 'encoding')
+
+    def __init__(self, head, data_head, data_sep, term, encoding):
+        self.empty = ''.join((head, term)).encode(encoding)
+        self.head = data_head.encode(encoding)
+        self.data_sep = data_sep
+        self.term = term.encode(encoding)
+        self.encoding = encoding
+
+    def __call__(self, data):
+        if not data:
+            return self.empty
+        data = self.data_sep.join(data).encode(self.encoding)
+        return b''.join((self.head, data, self.term))
+
+
 class Protocol(object):
     """Abstract protocol base class."""
     class Error(Exception):
@@ -41,14 +72,66 @@ class Protocol(object):
     class ParsingError(Error):
         """Raised when a parsing error occurs."""
 
+    #: The attributes defining the message framing. Setting one of them
+    #: discards the compiled message templates.
+    _FRAMING = ()
+    #: The maximum number of compiled message templates.
+    _MAX_TEMPLATES = 1024
+
+    def __setattr__(self, name, value):
+        super(Protocol, self).__setattr__(name, value)
+        if name in self._FRAMING:
+            self.__dict__['_templates'] = {}
+
+    def _template(self, header):
+        """Returns the compiled message template of the header."""
+        templates = self.__dict__.setdefault('_templates', {})
+        try:
+            return templates[header]
+        except KeyError:
+            if len(templates) >= self._MAX_TEMPLATES:
+                templates.clear()
+            template = templates[header] = self._compile(header)
+            return template
+
+    def _compile(self, header):
+        """Compiles the message template of the header, see :class:`_Template`."""
+        raise NotImplementedError()
+
     def query(self, transport, *args, **kw):
         raise NotImplementedError()
 
     def write(self, transport, *args, **kw):
         raise NotImplementedError()
 
+    def batch(self, transport, units):
+        """Sends several message units and returns the query responses.
+
+        :param transport: A transport object.
+        :param units: A sequence of `(query, header, data)` tuples, where
+            `query` is a boolean flag marking query message units.
+        :returns: A list with the parsed response of each query unit.
+
+        The default implementation sends each message unit separately.
+
+        """
+        responses = []
+        for query, header, data in units:
+            if query:
+                responses.append(self.query(transport, header, *data))
+            else:
+                self.write(transport, header, *data)
+        return responses
+
 
 def _retry(errors, logger):
+    """Retries a failed message twice, clearing the device before the last try.
+
+    If the connection was lost, the transport reconnects before retrying.
+
+    """
+    errors = tuple(errors) + (ConnectionLost,)
+
     def wrapper(fn):
         @functools.wraps(fn)
         def wrapped(self, transport, *args, **kw):
@@ -56,10 +139,14 @@ def _retry(errors, logger):
                 return fn(self, transport, *args, **kw)
             except errors as e:
                 logger.exception('Exception occured on 1. try. Msg: %r Retrying.', e)
+                if isinstance(e, ConnectionLost):
+                    transport.reconnect()
             try:
                 return fn(self, transport, *args, **kw)
             except errors as e:
                 logger.exception('Exception occured on 2. try. Msg: %r Clearing device and retrying.', e)
+                if isinstance(e, ConnectionLost):
+                    transport.reconnect()
                 self.clear(transport)
             # Try one more time
             return fn(self, transport, *args, **kw)
@@ -86,14 +173,21 @@ class IEC60488(Protocol):
     :param stb_callback: For each read and write operation, a status byte is
         received. If a callback function is given, it will be called with the
         status byte.
+    :param msg_unit_sep: A string separating consecutive message units of a
+        program message, see :meth:`.batch`.
+    :param resp_unit_sep: The expected separator of consecutive response
+        message units.
 
 
     """
     class ParsingError(Protocol.ParsingError):
         pass
 
+    _FRAMING = ('msg_prefix', 'msg_header_sep', 'msg_data_sep', 'msg_term', 'encoding')
+
     def __init__(self, msg_prefix='', msg_header_sep=' ', msg_data_sep=',', msg_term='\n',
-                 resp_prefix='', resp_header_sep='', resp_data_sep=',', resp_term='\n', encoding='ascii'):
+                 resp_prefix='', resp_header_sep='', resp_data_sep=',', resp_term='\n', encoding='ascii',
+                 msg_unit_sep=';', resp_unit_sep=';'):
         self.msg_prefix = msg_prefix
         self.msg_header_sep = msg_header_sep
         self.msg_data_sep = msg_data_sep
@@ -105,14 +199,40 @@ class IEC60488(Protocol):
         self.resp_term = resp_term
 
         self.encoding = encoding
+        self.msg_unit_sep = msg_unit_sep
+        self.resp_unit_sep = resp_unit_sep
 
-    def create_message(self, header, *data):
+    def create_message_unit(self, header, *data):
+        """Creates a message unit string without the message terminator."""
         if not data:
-            msg = ''.join((self.msg_prefix, header, self.msg_term))
-        else:
-            data = self.msg_data_sep.join(data)
-            msg = ''.join((self.msg_prefix, header, self.msg_header_sep, data, self.msg_term))
-        return msg.encode(self.encoding)
+            return ''.join((self.msg_prefix, header))
+        data = self.msg_data_sep.join(data)
+        return ''.join((self.msg_prefix, header, self.msg_header_sep, data))
+
+    def create_message(self, header, *data):
+        try:
+            template = self._templates[header]
+        except (AttributeError, KeyError):
+            template = self._template(header)
+        return template(data)
+
+    def _compile(self, header):
+        return _Template(
+            ''.join((self.msg_prefix, header)),
+            ''.join((self.msg_prefix, header, self.msg_header_sep)),
+            self.msg_data_sep, self.msg_term, self.encoding
+        )
+
+    def create_program_message(self, units):
+        """Joins several message units into a single program message.
+
+        :param units: A sequence of `(header, data)` tuples.
+
+        """
+        msg = self.msg_unit_sep.join(
+            self.create_message_unit(header, *data) for header, data in units
+        )
+        return ''.join((msg, self.msg_term)).encode(self.encoding)
 
     def parse_response(self, response, header=None):
         """Parses the response message.
@@ -146,6 +266,21 @@ class IEC60488(Protocol):
             response = response[len(header):]
         return response.split(self.resp_data_sep)
 
+    def parse_response_units(self, response, count):
+        """Splits a response message into `count` response message units and
+        parses each one.
+
+        :raises ParsingError: if the number of response message units does not
+            match.
+
+        """
+        units = response.split(self.resp_unit_sep.encode(self.encoding))
+        if len(units) != count:
+            raise IEC60488.ParsingError(
+                'Expected {0} response message units, got {1}'.format(count, len(units))
+            )
+        return [self.parse_response(unit) for unit in units]
+
     @_retry(errors=(ParsingError, UnicodeDecodeError, UnicodeEncodeError, Timeout), logger=logger)
     def query(self, transport, header, *data):
         message = self.create_message(header, *data)
@@ -164,6 +299,136 @@ class IEC60488(Protocol):
         with transport:
             transport.write(message)
 
+    @_retry(errors=(ParsingError, UnicodeDecodeError, UnicodeEncodeError, Timeout), logger=logger)
+    def query_bytes(self, transport, num_bytes, header, *data):
+        """Queries for binary data.
+
+        The response must consist of exactly `num_bytes` of raw data without
+        a response terminator, e.g. terminated by the gpib EOI line only.
+
+        :param transport: A transport object.
+        :param num_bytes: The exact number of data bytes expected.
+        :param header: The message header.
+        :param data: Optional data.
+        :returns: The raw unparsed data bytearray.
+
+        """
+        message = self.create_message(header, *data)
+        logger.debug('IEC60488 query bytes: %r', message)
+        with transport:
+            transport.write(message)
+            response = transport.read_exactly(num_bytes)
+        logger.debug('IEC60488 response: %d bytes', len(response))
+        return response
+
+    @_retry(errors=(ParsingError, UnicodeDecodeError, UnicodeEncodeError, Timeout), logger=logger)
+    def query_array(self, transport, dtype, header, *data):
+        """Queries numeric data and returns it as numpy array.
+
+        The response may be either an ascii response or an IEEE 488.2
+        arbitrary block. A definite length block, `#<n><length><bytes>`, is
+        read with exactly `length` bytes and decoded with `np.frombuffer`
+        without any further parsing. An indefinite length block, `#0<bytes>`,
+        is terminated by the end of the transfer only, which is not visible
+        to the transport, and raises a :class:`.ParsingError`. Configure the
+        device to send definite length blocks instead. An ascii response is
+        split at the data separator and converted to the dtype.
+
+        :param transport: A transport object.
+        :param dtype: The numpy dtype of the data, including the byte order,
+            e.g. `'>f8'` for big endian 64 bit floats. It must match the
+            data format configured on the device.
+        :param header: The message header.
+        :param data: Optional data.
+        :returns: A one dimensional numpy array.
+
+        """
+        message = self.create_message(header, *data)
+        resp_term = self.resp_term.encode(self.encoding)
+        logger.debug('IEC60488 query array: %r', message)
+        with transport:
+            transport.write(message)
+            prefix = transport.read_exactly(1)
+            if prefix == b'#':
+                try:
+                    digits = int(bytes(transport.read_exactly(1)))
+                    if digits:
+                        length = int(bytes(transport.read_exactly(digits)))
+                except ValueError as e:
+                    raise IEC60488.ParsingError('Invalid block header: {0}'.format(e))
+                if not digits:
+                    # The binary data may contain the response terminator.
+                    transport.discard()
+                    raise IEC60488.ParsingError('Indefinite length blocks are not supported.')
+                block = transport.read_exactly(length)
+                transport.read_until(resp_term)
+            elif prefix == resp_term[:1]:
+                # An empty response, consisting of the terminator only.
+                response = prefix + transport.read_exactly(len(resp_term) - 1)
+                if response != resp_term:
+                    raise IEC60488.ParsingError('Invalid response: {0!r}'.format(response))
+                block = None
+            else:
+                response = prefix + transport.read_until(resp_term)
+                block = None
+        if block is not None:
+            logger.debug('IEC60488 block response: %d bytes', len(block))
+            try:
+                return np.frombuffer(block, dtype=dtype)
+            except ValueError as e:
+                raise IEC60488.ParsingError(e)
+        logger.debug('IEC60488 response: %r', response)
+        if not response.strip():
+            return np.empty(0, dtype=dtype)
+        try:
+            return np.array(self.parse_response(response), dtype=float).astype(dtype)
+        except ValueError as e:
+            raise IEC60488.ParsingError(e)
+
+    def batch(self, transport, units):
+        """Sends several message units as a single program message.
+
+        The message units are joined with the `msg_unit_sep`. If the program
+        message contains queries, the response message is split with the
+        `resp_unit_sep` and each response message unit is parsed separately.
+
+        A program message consisting of queries only is retried on failure.
+        Program messages containing write units are not retried, because
+        resending them would repeat the writes.
+
+        .. note:: Response data containing the `resp_unit_sep` can not be split
+            correctly.
+
+        :param transport: A transport object.
+        :param units: A sequence of `(query, header, data)` tuples, where
+            `query` is a boolean flag marking query message units.
+        :returns: A list with the parsed response of each query unit.
+
+        """
+        units = list(units)
+        if not units:
+            return []
+        if all(query for query, _, _ in units):
+            return self._batch_queries(transport, units)
+        return self._batch(transport, units)
+
+    def _batch(self, transport, units):
+        count = sum(1 for query, _, _ in units if query)
+        message = self.create_program_message((h, d) for _, h, d in units)
+        logger.debug('IEC60488 batch: %r', message)
+        with transport:
+            transport.write(message)
+            if count:
+                response = transport.read_until(self.resp_term.encode(self.encoding))
+        if not count:
+            return []
+        logger.debug('IEC60488 response: %r', response)
+        return self.parse_response_units(response, count)
+
+    _batch_queries = _retry(
+        errors=(ParsingError, UnicodeDecodeError, UnicodeEncodeError, Timeout), logger=logger
+    )(_batch)
+
     def trigger(self, transport):
         """Triggers the transport."""
         logger.debug('IEC60488 trigger')
@@ -286,6 +551,11 @@ class SignalRecovery(IEC60488):
         # returns raw unparsed bytes.
         return response
 
+    def batch(self, transport, units):
+        # Each message unit generates a separate response, terminated by the
+        # status bytes. Therefore the units are sent one by one.
+        return Protocol.batch(self, transport, units)
+
     def write(self, transport, header, *data):
         message = self.create_message(header, *data)
         logger.debug('SignalRecovery write: %r', message)
@@ -349,6 +619,8 @@ class OxfordIsobus(Protocol):
         """Raised when a parsing error occurs."""
 
 
+    _FRAMING = ('address', 'echo', 'msg_term', 'encoding')
+
     def __init__(self, address=None, echo=True, msg_term='\r',
                  resp_term='\r', encoding='ascii'):
         self.address = address
@@ -358,15 +630,21 @@ class OxfordIsobus(Protocol):
         self.encoding = encoding
 
     def create_message(self, header, *data):
+        try:
+            template = self._templates[header]
+        except (AttributeError, KeyError):
+            template = self._template(header)
+        return template(data)
+
+    def _compile(self, header):
         msg = []
         if not self.echo:
             msg.append('$')
         if self.address:
             msg.append('@{}'.format(self.address))
         msg.append(header)
-        msg.extend(data)
-        msg.append(self.msg_term)
-        return ''.join(msg).encode(self.encoding)
+        head = ''.join(msg)
+        return _Template(head, head, '', self.msg_term, self.encoding)
 
     def parse_response(self, response, header):
         response = response.decode(self.encoding)
@@ -6,9 +6,11 @@ from __future__ import (absolute_import, division,
 from future.builtins import *
 
 import datetime
+import functools
 import time
 
 from slave.driver import Command, CommandSequence, Driver
+from slave.misc import Sweep, bind_transport
 from slave.types import Enum, Float, Integer, Register, String
 from slave.iec60488 import IEC60488
 import slave.protocol
@@ -126,6 +128,32 @@ STATUS_LINK = {
     29: 'User Mapped Item',
 }
 
+#: The data items of the `GETDAT?` query, ordered by their bit in the mask.
+GETDAT_FIELDS = [
+    'status', 'temperature', 'field', 'sample_position',
+    'bridge1_resistance', 'bridge1_current',
+    'bridge2_resistance', 'bridge2_current',
+    'bridge3_resistance', 'bridge3_current',
+    'bridge4_resistance', 'bridge4_current',
+    'signal_input1', 'signal_input2', 'digital_input',
+    'driver1_current', 'driver1_power', 'driver2_current', 'driver2_power',
+    'sample_space_pressure',
+] + ['user{}'.format(i) for i in range(1, 11)]
+
+
+def _decode_status(status):
+    """Splits the system status code into the subsystem states."""
+    return {
+        # bit 0-3 represent the temperature controller status
+        'temperature': STATUS_TEMPERATURE[status & 0xf],
+        # bit 4-7 represent the magnet status
+        'magnet': STATUS_MAGNET[(status >> 4) & 0xf],
+        # bit 8-11 represent the chamber status
+        'chamber': STATUS_CHAMBER[(status >> 8) & 0xf],
+        # bit 12-15 represent the sample position status
+        'sample_position': STATUS_SAMPLE_POSITION[(status >> 12) & 0xf],
+    }
+
 
 class PPMS(IEC60488):
     """A Quantum Design Model 6000 PPMS.
@@ -415,31 +443,79 @@ class PPMS(IEC60488):
     @property
     def field(self):
         """The field at sample position."""
-        # omit dataflag and timestamp
-        return self._query(('GETDAT? 4', (Integer, Float, Float)))[2]
+        return self.snapshot(['field'])['field']
 
     @property
     def system_status(self):
         """The system status codes."""
-        flag, timestamp, status = self._query(('GETDAT? 1', (Integer, Float, Integer)))
-        return {
-            # convert unix timestamp to datetime object
-            'timestamp': datetime.datetime.fromtimestamp(timestamp),
-            # bit 0-3 represent the temperature controller status
-            'temperature': STATUS_TEMPERATURE[status & 0xf],
-            # bit 4-7 represent the magnet status
-            'magnet': STATUS_MAGNET[(status >> 4) & 0xf],
-            # bit 8-11 represent the chamber status
-            'chamber': STATUS_CHAMBER[(status >> 8) & 0xf],
-            # bit 12-15 represent the sample position status
-            'sample_position': STATUS_SAMPLE_POSITION[(status >> 12) & 0xf],
-        }
+        snapshot = self.snapshot(['status'])
+        return dict(snapshot['status'], timestamp=snapshot['timestamp'])
 
     @property
     def temperature(self):
         "The current temperature at the sample position."
-        # omit dataflag and timestamp
-        return self._query(('GETDAT? 2', (Integer, Float, Float)))[2]
+        return self.snapshot(['temperature'])['temperature']
+
+    def snapshot(self, fields=('temperature', 'field', 'status')):
+        """Reads several data items with a single query.
+
+        All items are sampled at the same time, e.g.::
+
+            data = ppms.snapshot(['temperature', 'field'])
+            print(data['timestamp'], data['temperature'], data['field'])
+
+        :param fields: A sequence of data items. See :data:`~.GETDAT_FIELDS`
+            for valid items.
+        :returns: A dict mapping each item to its value and 'timestamp' to the
+            sampling time, a :class:`datetime.datetime` object. The 'status'
+            item is split into the subsystem states, see
+            :attr:`.system_status`.
+
+        """
+        try:
+            bits = sorted(set(GETDAT_FIELDS.index(field) for field in fields))
+        except ValueError:
+            raise ValueError('Invalid fields: {!r}'.format(fields))
+        mask = sum(1 << bit for bit in bits)
+        response_t = [Integer, Float] + [Integer if bit == 0 else Float for bit in bits]
+        # The response starts with the data flag and timestamp, followed by
+        # the data items ordered by their bit.
+        response = self._query(('GETDAT? {}'.format(mask), response_t))
+        snapshot = {
+            # convert unix timestamp to datetime object
+            'timestamp': datetime.datetime.fromtimestamp(response[1]),
+        }
+        for bit, value in zip(bits, response[2:]):
+            snapshot[GETDAT_FIELDS[bit]] = _decode_status(value) if bit == 0 else value
+        return snapshot
+
+    def measurables(self, fields):
+        """Returns callables reading the data items of a shared snapshot.
+
+        The first callable queries a :meth:`.snapshot` of all items, the
+        others return the values of that snapshot. They must be called in
+        order, as the measurables of a :class:`~slave.misc.Measurement` are.
+        E.g.::
+
+            fields = ['temperature', 'field']
+            with Measurement('data.csv', ppms.measurables(fields), fields) as measure:
+                ppms.scan_temperature(measure, 300, 1)
+
+        :param fields: A sequence of data items. See :data:`~.GETDAT_FIELDS`
+            for valid items.
+
+        """
+        fields = list(fields)
+        snapshot = {}
+
+        def read(field):
+            if field == fields[0]:
+                snapshot.update(self.snapshot(fields))
+            return snapshot[field]
+        return [
+            bind_transport(functools.partial(read, field), self._transport)
+            for field in fields
+        ]
 
     def beep(self, duration, frequency):
         """Generates a beep.
@@ -526,7 +602,7 @@ class PPMS(IEC60488):
         cmd = 'MOVE', [Float, Integer]
         self._write(cmd, position, 2)
 
-    def scan_temperature(self, measure, temperature, rate, delay=1):
+    def scan_temperature(self, measure, temperature, rate, delay=1, poll_interval=1):
         """Performs a temperature scan.
 
         Measures until the target temperature is reached.
@@ -536,6 +612,10 @@ class PPMS(IEC60488):
         :param temperature: The target temperature in kelvin.
         :param rate: The sweep rate in kelvin per minute.
         :param delay: The time delay between each call to measure in seconds.
+            If it is `0`, measure is called as fast as possible.
+        :param poll_interval: The time between status checks in seconds.
+        :returns: The finished :class:`~slave.misc.Sweep`, e.g. to get the
+            achieved sample rate.
 
         """
         if not hasattr(measure, '__call__'):
@@ -543,15 +623,14 @@ class PPMS(IEC60488):
 
         self.set_temperature(temperature, rate, 'no overshoot', wait_for_stability=False)
         start = datetime.datetime.now()
-        while True:
+
+        def done():
             # The PPMS needs some time to update the status code, we therefore ignore it for 10s.
-            if (self.system_status['temperature'] == 'normal stability at target temperature' and
-                (datetime.datetime.now() - start > datetime.timedelta(seconds=10))):
-                break
-            measure()
-            time.sleep(delay)
+            return (datetime.datetime.now() - start > datetime.timedelta(seconds=10) and
+                    self.system_status['temperature'] == 'normal stability at target temperature')
+        return Sweep(measure, done, poll_interval=poll_interval, delay=delay).run()
 
-    def scan_field(self, measure, field, rate, mode='persistent', delay=1):
+    def scan_field(self, measure, field, rate, mode='persistent', delay=1, poll_interval=1):
         """Performs a field scan.
 
         Measures until the target field is reached.
@@ -566,6 +645,10 @@ class PPMS(IEC60488):
         :param mode: The state of the magnet at the end of the charging
             process, either 'persistent' or 'driven'.
         :param delay: The time delay between each call to measure in seconds.
+            If it is `0`, measure is called as fast as possible.
+        :param poll_interval: The time between status checks in seconds.
+        :returns: The finished :class:`~slave.misc.Sweep`, e.g. to get the
+            achieved sample rate.
 
         :raises TypeError: if measure parameter is not callable.
 
@@ -573,23 +656,18 @@ class PPMS(IEC60488):
         if not hasattr(measure, '__call__'):
             raise TypeError('measure parameter not callable.')
         self.set_field(field, rate, approach='linear', mode=mode, wait_for_stability=False)
+        switch_heat_time = 0
         if self.system_status['magnet'].startswith('persist'):
             # The persistent switch takes some time to open. While it's opening,
             # the status does not change.
-            switch_heat_time = datetime.timedelta(seconds=self.magnet_config[5])
-            start = datetime.datetime.now()
-            while True:
-                now = datetime.datetime.now()
-                if now - start > switch_heat_time:
-                    break
-                measure()
-                time.sleep(delay)
-        while True:
-            status = self.system_status['magnet']
-            if status in ('persistent, stable', 'driven, stable'):
-                break
-            measure()
-            time.sleep(delay)
+            switch_heat_time = self.magnet_config[5]
+        start = time.time()
+
+        def done():
+            if time.time() - start < switch_heat_time:
+                return False
+            return self.system_status['magnet'] in ('persistent, stable', 'driven, stable')
+        return Sweep(measure, done, poll_interval=poll_interval, delay=delay).run()
 
     def set_field(self, field, rate, approach='linear', mode='persistent',
                   wait_for_stability=True, delay=1):
@@ -616,11 +694,12 @@ class PPMS(IEC60488):
             # Wait until the persistent switch heats up.
             time.sleep(self.magnet_config[5])
 
-        while wait_for_stability:
-            status = self.system_status['magnet']
-            if status in ('persistent, stable', 'driven, stable'):
-                break
-            time.sleep(delay)
+        if wait_for_stability:
+            Sweep(
+                None,
+                lambda: self.system_status['magnet'] in ('persistent, stable', 'driven, stable'),
+                poll_interval=delay
+            ).run()
 
     def set_temperature(self, temperature, rate, mode='fast', wait_for_stability=True, delay=1):
         """Sets the temperature.
@@ -635,12 +714,13 @@ class PPMS(IEC60488):
         """
         self.target_temperature = temperature, rate, mode
         start = datetime.datetime.now()
-        while wait_for_stability:
+
+        def done():
             # The PPMS needs some time to update the status code, we therefore ignore it for 10s.
-            if (self.system_status['temperature'] == 'normal stability at target temperature' and
-                (datetime.datetime.now() - start > datetime.timedelta(seconds=10))):
-                break
-            time.sleep(delay)
+            return (datetime.datetime.now() - start > datetime.timedelta(seconds=10) and
+                    self.system_status['temperature'] == 'normal stability at target temperature')
+        if wait_for_stability:
+            Sweep(None, done, poll_interval=delay).run()
 
     def shutdown(self):
         """The temperature controller shutdown.
@@ -23,6 +23,14 @@ The following example shows how to use the fast curve buffer to acquire data.
 
     x, y = lockin.fast_buffer['x'], lockin.fast_buffer['y']
 
+Instead of waiting for the acquisition to complete, the points can be read
+while they are stored. With continuous data acquisition the buffer is used as
+circular buffer and long acquisitions are possible. ::
+
+    lockin.take_data_continuously(stop='halt')
+    for chunk in lockin.fast_buffer.stream(['x', 'y']):
+        print(chunk['x'], chunk['y'])
+
 The fast buffer can store just a limited amount of variables. The standard
 buffer is a lot more flexible. The following examples shows how to use it to
 store the sensitivity, x and y values.
@@ -30,7 +38,7 @@ store the sensitivity, x and y values.
 ::
 
     lockin.standard_buffer.enabled = True
-    lockin.standard_buffer.definition = 'X', 'Y', 'sensitivity'
+    lockin.standard_buffer.define = 'x', 'y', 'sensitivity'
     lockin.standard_buffer.storage_interval = 1000
     lockin.standard_buffer.length = 1000
     lockin.take_data()
@@ -44,16 +52,23 @@ store the sensitivity, x and y values.
     x = sr7230.standard_buffer['x']
     y = sr7230.standard_buffer['y']
 
+    # Alternatively, read all curves converted to physical units.
+    data = lockin.standard_buffer.read()
+    x, y = data['x'], data['y']
+
 """
 from __future__ import (absolute_import, division,
                         print_function, unicode_literals)
 from future.builtins import *
 import datetime
+import time
 
 import numpy as np
 
 from slave.driver import Command, Driver, CommandSequence
+from slave.misc import range_to_numeric
 from slave.protocol import SignalRecovery
+from slave.transport import SimulatedTransport
 from slave.types import (
     Boolean, Enum, Float, Integer, Register, Set, String, Mapping
 )
@@ -1179,7 +1194,59 @@ class DigitalPort(Driver):
         )
 
 
-class FastBuffer(Driver):
+class _CurveBuffer(Driver):
+    """The common base class of the curve buffers."""
+    def _status(self):
+        """Returns the acquisition state and the number of stored points."""
+        state, _, _, points = self._query(('M', [Integer, Integer, Integer, Integer]))
+        return state, points
+
+    def _stream(self, read, length, interval):
+        """A generator yielding the new points while the acquisition is running.
+
+        :param read: A callable, called as `read(offset, count)`, returning
+            `count` points starting at the buffer index `offset`.
+        :param length: The curve length. In the continuous acquisition modes,
+            the curve is a circular buffer.
+        :param interval: The polling interval in seconds.
+
+        """
+        position = 0
+        state, points = self._status()
+        while True:
+            if points > position:
+                _check_overrun(position, points, length)
+                chunks = [read(offset, count) for offset, count in _segments(position, points, length)]
+                # Points stored during the transfer might have overwritten the
+                # unread ones.
+                state, stored = self._status()
+                _check_overrun(position, stored, length)
+                yield np.concatenate(chunks)
+                position, points = points, stored
+            elif state not in (1, 2, 3, 4):
+                # The acquisition is neither running nor halted.
+                break
+            else:
+                time.sleep(interval)
+                state, points = self._status()
+
+    def _dcb(self, idx, count, offset=None):
+        """Transfers `count` points of a curve in binary format.
+
+        If `offset` is given, the points are transfered starting at this
+        buffer index, otherwise from the start of the curve.
+
+        """
+        if isinstance(self._transport, SimulatedTransport):
+            return np.random.randint(0, 10000, count).astype('>h').tobytes()
+        data = [str(idx)]
+        if offset is not None:
+            data += [str(offset), str(count)]
+        # The data is stored as two byte integers.
+        return self._protocol.query_bytes(self._transport, 2 * count, 'DCB', *data)
+
+
+class FastBuffer(_CurveBuffer):
     """Represents the fast curve buffer command group.
 
     The fast curve buffer is similar to the :class:`~.StandardBuffer`. It is
@@ -1207,17 +1274,60 @@ class FastBuffer(Driver):
         self.storage_interval = Command('STR', 'STR', Integer(min=1))
 
     def __getitem__(self, item):
+        return self._download(item, self.length)
+
+    def stream(self, keys=('x', 'y'), interval=0.01):
+        """A generator reading the curves while the acquisition is running.
+
+        The point counter is polled every `interval` seconds. New points are
+        downloaded and yielded as a structured array of the raw curve values,
+        with a field for each key, as soon as they are stored. Only the new
+        points are transfered. In combination with
+        :meth:`SR7230.take_data_continuously`, the buffer is used as a
+        circular buffer, allowing gap-free acquisitions of arbitrary length
+        with bounded memory, e.g.::
+
+            lockin.fast_buffer.enabled = True
+            lockin.fast_buffer.storage_interval = 8
+            lockin.fast_buffer.length = 100000
+            lockin.take_data_continuously(stop='halt')
+            for chunk in lockin.fast_buffer.stream():
+                process(chunk['x'], chunk['y'])
+
+        The generator stops when the acquisition is finished and all points
+        are yielded.
+
+        :param keys: A sequence of curve keys.
+        :param interval: The polling interval in seconds.
+        :raises RuntimeError: If the points were overwritten before they were
+            read, including points overwritten during the transfer. The
+            polling rate must be high enough to read the buffer before it is
+            filled.
+
+        """
+        for key in keys:
+            if key not in FastBuffer.KEYS:
+                raise KeyError('Invalid Curve key: {}'.format(key))
+        dtype = [(str(key), np.int16) for key in keys]
+
+        def read(offset, count):
+            chunk = np.empty(count, dtype=dtype)
+            for key in keys:
+                chunk[key] = self._download(key, count, offset)
+            return chunk
+        return self._stream(read, self.length, interval)
+
+    def _download(self, key, length, offset=None):
         try:
-            idx = str(FastBuffer.KEYS.index(item))
+            idx = FastBuffer.KEYS.index(key)
         except ValueError:
-            raise KeyError('Invalid Curve key: {}'.format(item))
-        # The data is stored as two byte integers.
-        nbytes = self.length * 2
-        data = self._protocol.query_bytes(self._transport, nbytes, 'DCB', idx)
-        return np.frombuffer(data, dtype='>h')
+            raise KeyError('Invalid Curve key: {}'.format(key))
+        if isinstance(self._transport, SimulatedTransport):
+            return np.random.randint(-30000, 30000, length).astype('>h')
+        return np.frombuffer(self._dcb(idx, length, offset), dtype='>h')
 
 
-class StandardBuffer(Driver):
+class StandardBuffer(_CurveBuffer):
     """Represents the standard buffer command group.
 
     :ivar length: The size of the standard curve buffer is 100000 points. These
@@ -1232,6 +1342,11 @@ class StandardBuffer(Driver):
     :ivar define: Selects which curves should be stored. See
         :attr:`~.StandardBuffer.KEYS` for allowed values.
 
+    Single curves are accessed by key, e.g. `buffer['x']`, and are returned in
+    the raw instrument units. To download several curves at once, converted
+    to physical units, use :meth:`.read`. :meth:`.stream` reads the curves
+    while the acquisition is still running.
+
     """
     KEYS = [
         'x', 'y', 'r', 'theta', 'sensitivity', 'noise', 'ratio', 'log ratio',
@@ -1239,6 +1354,22 @@ class StandardBuffer(Driver):
         'frequency', 'frequency',
         'x2', 'y2', 'r2', 'theta2', 'sensitivity2'
     ]
+    #: The curves stored in percent of the full scale sensitivity, mapped to
+    #: the sensitivity curve used for the conversion.
+    RELATIVE = {
+        'x': 'sensitivity', 'y': 'sensitivity', 'r': 'sensitivity',
+        'noise': 'sensitivity', 'x2': 'sensitivity2', 'y2': 'sensitivity2',
+        'r2': 'sensitivity2',
+    }
+    #: The scaling factors of the remaining curves. Phases are stored in
+    #: centidegrees, the adc and dac voltages in millivolts and ratios in
+    #: thousandths.
+    SCALE = {
+        'theta': 1e-2, 'theta2': 1e-2, 'ratio': 1e-3, 'log ratio': 1e-3,
+        'adc1': 1e-3, 'adc2': 1e-3, 'adc3': 1e-3, 'adc4': 1e-3,
+        'dac1': 1e-3, 'dac2': 1e-3,
+    }
+
     def __init__(self, transport, protocol):
         super(StandardBuffer, self).__init__(transport, protocol)
         self.enabled = Command('CMODE', 'CMODE', Enum(True, False))
@@ -1286,19 +1417,174 @@ class StandardBuffer(Driver):
     def __getitem__(self, item):
         if not item in self.define:
             raise KeyError(item)
-        idx = str(StandardBuffer.KEYS.index(item))
-        # The data is stored as two byte integers.
-        nbytes = self.length * 2
-
+        data = self._download([item], self.length)[item]
         if item == 'frequency':
-            f1 = self._protocol.query_bytes(self._transport, nbytes, 'DCB', '15')
-            f2 = self._protocol.query_bytes(self._transport, nbytes, 'DCB', '16')
-            f1 = np.frombuffer(data, dtype='>H')
-            f2 = np.frombuffer(data, dtype='>h')
-            return (f2.astype(float) * 65536 + f1.astype(float)) / 1e3
-        else:
-            data = self._protocol.query_bytes(self._transport, nbytes, 'DCB', idx)
-            return np.frombuffer(data, dtype='>h')
+            # Stored in mHz.
+            return data / 1e3
+        return data
+
+    def read(self, keys=None, length=None):
+        """Reads several curves at once.
+
+        The curve definition and length are queried only once. Curves stored
+        relative to the sensitivity are converted to volt or ampere, using the
+        sensitivity curve if it is defined and the current sensitivity
+        otherwise. Phases are converted to degree, adc and dac curves to volt
+        and the frequency to Hz.
+
+        :param keys: A sequence of curve keys. If `None`, all defined curves
+            are read.
+        :param length: The number of points to read. If `None`, the curve
+            length is used.
+        :returns: A numpy structured array with a field for each key.
+
+        """
+        defined = self.define
+        keys = defined if keys is None else list(keys)
+        for key in keys:
+            if key not in defined:
+                raise KeyError(key)
+        if length is None:
+            length = self.length
+        return self._read(keys, defined, length)
+
+    def read_all(self):
+        """Reads all defined curves, see :meth:`.read`."""
+        return self.read()
+
+    def stream(self, keys=None, interval=0.1):
+        """A generator reading the curves while the acquisition is running.
+
+        The number of stored points is polled every `interval` seconds. Each
+        time new points are available, only these points are downloaded and
+        yielded as a structured array, see :meth:`.read`. The generator stops
+        when the acquisition is finished and all points are yielded, e.g.::
+
+            lockin.take_data()
+            for chunk in lockin.standard_buffer.stream(['x', 'y']):
+                print(chunk['x'])
+
+        In combination with :meth:`SR7230.take_data_continuously`, the curves
+        are used as circular buffers.
+
+        :param keys: A sequence of curve keys. If `None`, all defined curves
+            are read.
+        :param interval: The polling interval in seconds.
+        :raises RuntimeError: If the points were overwritten before they were
+            read.
+
+        """
+        defined = self.define
+        keys = defined if keys is None else list(keys)
+        for key in keys:
+            if key not in defined:
+                raise KeyError(key)
+        read = lambda offset, count: self._read(keys, defined, count, offset)
+        return self._stream(read, self.length, interval)
+
+    def _read(self, keys, defined, length, offset=None):
+        """Downloads the curves and converts them to physical units.
+
+        If `offset` is given, `length` points starting at this buffer index
+        are downloaded.
+
+        """
+        required = set(keys)
+        for key in keys:
+            sensitivity = self.RELATIVE.get(key)
+            if sensitivity in defined:
+                required.add(sensitivity)
+        raw = self._download(required, length, offset)
+
+        full_scale = {}
+        data = np.empty(length, dtype=[(str(key), np.float64) for key in keys])
+        for key in keys:
+            if key in self.RELATIVE:
+                sensitivity = self.RELATIVE[key]
+                if sensitivity not in full_scale:
+                    if sensitivity in raw:
+                        full_scale[sensitivity] = _full_scale(raw[sensitivity])
+                    else:
+                        header = 'SEN.' if sensitivity == 'sensitivity' else 'SEN2.'
+                        full_scale[sensitivity] = self._query((header, Float))
+                data[key] = raw[key] * full_scale[sensitivity] / 1e4
+            elif key == 'frequency':
+                # Stored in mHz.
+                data[key] = raw[key] / 1e3
+            else:
+                data[key] = raw[key] * self.SCALE.get(key, 1)
+        return data
+
+    def _download(self, keys, length, offset=None):
+        """Downloads the raw curves.
+
+        :returns: A dict mapping the keys to numpy arrays.
+
+        """
+        curves = {}
+        for key in sorted(keys, key=StandardBuffer.KEYS.index):
+            if key == 'frequency':
+                # The frequency is split into the lower and upper 16 bits.
+                lower = np.frombuffer(self._dcb(15, length, offset), dtype='>H')
+                upper = np.frombuffer(self._dcb(16, length, offset), dtype='>h')
+                curves[key] = upper.astype(float) * 65536 + lower
+            else:
+                idx = StandardBuffer.KEYS.index(key)
+                curves[key] = np.frombuffer(self._dcb(idx, length, offset), dtype='>h')
+        return curves
+
+
+def _segments(start, stop, length):
+    """Splits the points `start` to `stop` of a circular buffer into
+    contiguous `(offset, count)` segments.
+    """
+    offset = start % length
+    count = min(stop - start, length - offset)
+    segments = [(offset, count)]
+    if stop - start > count:
+        segments.append((0, stop - start - count))
+    return segments
+
+
+def _check_overrun(position, points, length):
+    """Raises a RuntimeError if unread points of a circular buffer were
+    overwritten.
+    """
+    if points - position > length:
+        raise RuntimeError(
+            '{} points were overwritten.'.format(points - position - length)
+        )
+
+
+def _sensitivity_table(sensitivities, start):
+    """Creates a lookup table of the full scale sensitivities in SI units.
+
+    :param sensitivities: A sequence of sensitivity strings, e.g. '10 nV'.
+    :param start: The sensitivity index of the first item.
+
+    """
+    table = np.full(32, np.nan)
+    table[start:start + len(sensitivities)] = range_to_numeric(sensitivities)
+    return table
+
+
+_SENSITIVITY_TABLES = np.array([
+    _sensitivity_table(SR7230.SENSITIVITY_VOLTAGE, 3),
+    _sensitivity_table(SR7230.SENSITIVITY_CURRENT_HIGHBW, 3),
+    _sensitivity_table(SR7230.SENSITIVITY_CURRENT_LOWNOISE, 7),
+    np.full(32, np.nan),
+])
+
+
+def _full_scale(curve):
+    """Converts a raw sensitivity curve to the full scale sensitivity.
+
+    The bits 0-4 of each point contain the sensitivity index, the bits 5-6
+    the current mode.
+
+    """
+    curve = np.asarray(curve, dtype=int)
+    return _SENSITIVITY_TABLES[(curve >> 5) & 0x3, curve & 0x1f]
 
 
 class Demodulator(Driver):
@@ -0,0 +1,28 @@
+#  -*- coding: utf-8 -*-
+#
+# Slave, (c) 2015, see AUTHORS.  Licensed under the GNU GPL.
+"""Helpers shared by the Stanford Research Systems lock-in drivers."""
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+from future.builtins import *
+
+import numpy as np
+
+
+__all__ = ['decode_trace']
+
+
+def decode_trace(data, format):
+    """Decodes the binary trace data of the `TRCB?` and `TRCL?` queries.
+
+    :param data: The raw bytes.
+    :param format: Either 'ieee', little endian IEEE 754 floats, or 'non-ieee',
+        the SRS format consisting of a little endian 16 bit mantissa m and
+        exponent e, where `value = m * 2**(e - 124)`.
+    :returns: A numpy array.
+
+    """
+    if format == 'ieee':
+        return np.frombuffer(data, dtype='<f4')
+    raw = np.frombuffer(data, dtype='<i2').reshape(-1, 2)
+    return np.ldexp(raw[:, 0].astype(float), raw[:, 1] - 124)
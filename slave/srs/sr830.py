@@ -13,7 +13,11 @@ from __future__ import (absolute_import, division,
                         print_function, unicode_literals)
 from future.builtins import *
 
+import numpy as np
+
 from slave.driver import Command, Driver
+from slave.srs.common import decode_trace
+from slave.transport import SimulatedTransport
 from slave.types import Boolean, Enum, Float, Integer, Register, Set, String
 
 
@@ -247,6 +251,9 @@ class SR830(Driver):
         1, 3, 10, 30, 100, 300, 1e3, 3e3, 10e3, 30e3
     ]
 
+    #: The maximum number of points stored in a channel buffer.
+    BUFFER_SIZE = 16383
+
     def __init__(self, transport):
         """Constructs a SR830 instrument object.
 
@@ -466,7 +473,6 @@ class SR830(Driver):
           and 'CH2'. If none are given 'X' and 'Y' are used.
 
         """
-        # TODO: Do not use transport directly.
         params = {'X': 1, 'Y': 2, 'R': 3, 'Theta': 4, 'AuxIn1': 5, 'AuxIn2': 6,
                   'AuxIn3': 7, 'AuxIn4': 8, 'Ref': 9, 'CH1': 10, 'CH2': 11}
         if not args:
@@ -474,25 +480,66 @@ class SR830(Driver):
         if len(args) > 6:
             raise ValueError('Too many parameters (max: 6).')
         cmd = 'SNAP? ' + ','.join(map(lambda x: str(params[x]), args))
-        result = self.transport.ask(cmd)
-        return map(float, result.split(','))
+        return self._query((cmd, [Float] * len(args)))
 
     def clear(self):
         """Clears all status registers."""
         self._write('*CLS')
 
-    def trace(self, buffer, start, length=1):
+    def trace(self, buffer, start=0, length=1, format='ieee', chunk_size=1024):
         """Reads the points stored in the channel buffer.
 
         :param buffer: Selects the channel buffer (either 1 or 2).
         :param start: Selects the bin where the reading starts.
         :param length: The number of bins to read.
+        :param format: The binary transfer format, either 'ieee' or
+            'non-ieee'. See :meth:`.iter_trace`.
+        :param chunk_size: The maximum number of points transfered by a
+            single query.
+        :returns: A numpy array with the points.
+
+        """
+        chunks = list(self.iter_trace(buffer, start, length, format, chunk_size))
+        return np.concatenate(chunks) if chunks else np.empty(0)
+
+    def iter_trace(self, buffer, start=0, length=1, format='ieee', chunk_size=1024):
+        """Reads the points stored in the channel buffer chunk by chunk.
+
+        A generator yielding numpy arrays of at most `chunk_size` points. Each
+        chunk is transfered by a separate binary query, so the transport is
+        not locked while a chunk is processed. E.g.::
+
+            length = lockin.data_points
+            for chunk in lockin.iter_trace(1, length=length):
+                process(chunk)
+
+        :param buffer: Selects the channel buffer (either 1 or 2).
+        :param start: Selects the bin where the reading starts.
+        :param length: The number of bins to read.
+        :param format: The binary transfer format. With 'ieee', the points
+            are transfered as little endian IEEE 754 floats (`TRCB?`). With
+            'non-ieee', the points are transfered in the native SR830 format
+            (`TRCL?`), consisting of a little endian 16 bit mantissa and
+            exponent. This is faster, since the lock-in does not need to
+            convert the points.
+        :param chunk_size: The maximum number of points transfered by a
+            single query.
 
-        .. todo::
-           Use binary command TRCB to speed up data transmission.
         """
-        # TODO: Do not use transport directly.
-        query = 'TRCA? {0}, {1}, {2}'.format(buffer, start, length)
-        result = self.transport.ask(query)
-        # Result format: "1.0e-004,1.2e-004,". Strip trailing comma then split.
-        return (float(f) for f in result.strip(',').split(','))
+        if buffer not in (1, 2):
+            raise ValueError('Invalid buffer: {0}'.format(buffer))
+        if format not in ('ieee', 'non-ieee'):
+            raise ValueError('Invalid format: {0}'.format(format))
+        if not (0 <= start and start + length <= self.BUFFER_SIZE):
+            raise ValueError('Invalid bin range.')
+        header = 'TRCB?' if format == 'ieee' else 'TRCL?'
+        stop = start + length
+        for offset in range(start, stop, chunk_size):
+            count = min(chunk_size, stop - offset)
+            if isinstance(self._transport, SimulatedTransport):
+                yield np.random.random(count)
+                continue
+            data = self._protocol.query_bytes(
+                self._transport, 4 * count, header, str(buffer), str(offset), str(count)
+            )
+            yield decode_trace(data, format)
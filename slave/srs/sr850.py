@@ -5,9 +5,13 @@ from __future__ import (absolute_import, division,
                         print_function, unicode_literals)
 from future.builtins import *
 
+import numpy as np
+
 from slave.driver import Command, Driver, CommandSequence
 from slave.types import Boolean, Enum, Float, Integer, Register, String
 from slave.iec60488 import IEC60488, PowerOn
+from slave.srs.common import decode_trace
+from slave.transport import SimulatedTransport
 
 
 class SR850(IEC60488, PowerOn):
@@ -1116,22 +1120,36 @@ class Trace(Driver):
           'F**2'
         * *<store>* is a boolean defining if the trace is stored.
 
-        Traces support a subset of the slicing notation. To get the number of
-        points stored, use the builtin :meth:`len` method. E.g.::
+        Traces support the slicing notation and return numpy arrays. To get
+        the number of points stored, use the builtin :meth:`len` method.
+        E.g.::
 
             # get point at bin 17.
             print trace[17]
             # get point 17, 18 and 19
             print trace[17:20]
+            # get all points
+            print trace[:]
+
+        The points are transfered in binary format, slices are split into
+        chunks of at most :attr:`.chunk_size` points.
 
         If the upper bound exceeds the number of store points, an internal
         lock-in error is generated.
 
+    :ivar int chunk_size: The maximum number of points transfered by a single
+        query.
+    :ivar format: The binary transfer format, either 'ieee' (`TRCB?`) or
+        'non-ieee' (`TRCL?`). The latter is faster, because the lock-in does
+        not need to convert the points.
+
     """
     def __init__(self, transport, protocol, idx):
         super(Trace, self).__init__(transport, protocol)
         self.idx = idx = int(idx)
         self.value = Command(('OUTR? {0}'.format(idx), Float))
+        self.chunk_size = 4096
+        self.format = 'ieee'
 
         quantities = Enum(
             '1', 'x', 'y', 'r', 'theta', 'xn', 'yn', 'rn', 'Al1', 'Al2', 'Al3',
@@ -1146,22 +1164,63 @@ class Trace(Driver):
 
     def __len__(self):
         """The number of points stored in the trace."""
-        return self._write(('SPTS {0}'.format(self.idx), Integer))
+        return self._query(('SPTS? {0}'.format(self.idx), Integer))
 
     def __getitem__(self, item):
         if isinstance(item, slice):
-            start = item.start
-            length = item.stop - item.start
-        else:
-            start = item.start
-            length = 1
-        if length <= 0:
-            raise ValueError('stop - start > 0 violated.')
-        cmd = (
-            'TRCA? {0},{1},{2}'.format(self.idx, start, length),
-            (Float,) * length
-        )
-        return self._ask(cmd)
+            start, stop, step = item.start, item.stop, item.step or 1
+            # The number of points is only queried if required.
+            if step > 0 and (start is None or start >= 0) and (stop is not None and stop >= 0):
+                start = start or 0
+            else:
+                start, stop, step = item.indices(len(self))
+            if step < 0:
+                # Read the covered points in ascending order and reverse them.
+                if start <= stop:
+                    return np.empty(0)
+                return self.read(stop + 1, start - stop)[::step]
+            return self.read(start, max(stop - start, 0))[::step]
+        if item < 0:
+            item += len(self)
+        if item < 0:
+            raise IndexError()
+        return self.read(item, 1)[0]
+
+    def read(self, start=0, length=None):
+        """Reads the points of the trace.
+
+        :param start: The first bin.
+        :param length: The number of points. If `None`, all points from start
+            on are read.
+        :returns: A numpy array.
+
+        """
+        if length is None:
+            length = len(self) - start
+        chunks = list(self.iter_read(start, length))
+        return np.concatenate(chunks) if chunks else np.empty(0)
+
+    def iter_read(self, start=0, length=None):
+        """A generator yielding the points of the trace in chunks.
+
+        :param start: The first bin.
+        :param length: The number of points. If `None`, all points from start
+            on are read.
+
+        """
+        if length is None:
+            length = len(self) - start
+        header = 'TRCB?' if self.format == 'ieee' else 'TRCL?'
+        stop = start + length
+        for offset in range(start, stop, self.chunk_size):
+            count = min(self.chunk_size, stop - offset)
+            if isinstance(self._transport, SimulatedTransport):
+                yield np.random.random(count)
+                continue
+            data = self._protocol.query_bytes(
+                self._transport, 4 * count, header, str(self.idx), str(offset), str(count)
+            )
+            yield decode_trace(data, self.format)
 
 
 class Mark(Driver):
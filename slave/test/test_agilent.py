@@ -0,0 +1,77 @@
+#  -*- coding: utf-8 -*-
+#
+# Slave, (c) 2015, see AUTHORS.  Licensed under the GNU GPL.
+import collections
+
+import numpy as np
+
+from slave.agilent import B2900
+from slave.test.util import MockTransport
+from slave.transport import SimulatedTransport
+
+
+def test_B2900():
+    # Test if instantiation fails
+    B2900(SimulatedTransport())
+
+
+def test_B2900_run_sweep():
+    esr = collections.deque([b'0\n', b'0\n', b'1\n'])
+    points = collections.deque([b'2\n', b'4\n'])
+    responses = {
+        b'*IDN?\n': b'Agilent Technologies,B2901A,0,0\n',
+        b':SYST:LANG?\n': b'"DEF"\n',
+        b':TRIG1:ACQ:COUN?\n': b'4\n',
+        b':TRAC1:DATA? 0,2\n': b'1,10,2,20\n',
+        b':TRAC1:DATA? 2,2\n': b'3,30,4,40\n',
+    }
+
+    def respond(message):
+        if message == b'*ESR?\n':
+            return esr.popleft()
+        if message == b':TRAC1:POIN:ACT?\n':
+            return points.popleft()
+        return responses.get(message)
+
+    transport = MockTransport(respond=respond)
+    smu = B2900(transport)
+    data = smu.setup.run_sweep(('voltage', 'current'), chunk_size=2, poll_interval=0)
+    assert list(data['voltage']) == [1., 2., 3., 4.]
+    assert list(data['current']) == [10., 20., 30., 40.]
+    assert transport.messages[-9:] == [
+        b'*ESR?\n', b':INIT (@1)\n', b'*OPC\n',
+        b'*ESR?\n', b':TRAC1:POIN:ACT?\n', b':TRAC1:DATA? 0,2\n',
+        b'*ESR?\n', b':TRAC1:POIN:ACT?\n', b':TRAC1:DATA? 2,2\n',
+    ]
+
+
+def test_B2900_run_sweep_with_single_value_chunk():
+    esr = collections.deque([b'0\n', b'0\n', b'1\n'])
+    points = collections.deque([b'2\n', b'3\n'])
+    responses = {
+        b'*IDN?\n': b'Agilent Technologies,B2901A,0,0\n',
+        b':SYST:LANG?\n': b'"DEF"\n',
+        b':TRIG1:ACQ:COUN?\n': b'3\n',
+        b':TRAC1:DATA? 0,2\n': b'1,2\n',
+        # The last poll delivers a single value.
+        b':TRAC1:DATA? 2,1\n': b'3\n',
+    }
+
+    def respond(message):
+        if message == b'*ESR?\n':
+            return esr.popleft()
+        if message == b':TRAC1:POIN:ACT?\n':
+            return points.popleft()
+        return responses.get(message)
+
+    smu = B2900(MockTransport(respond=respond))
+    data = smu.setup.run_sweep(('voltage',), chunk_size=2, poll_interval=0)
+    assert list(data['voltage']) == [1., 2., 3.]
+
+
+def test_B2900_format_dtype():
+    transport = MockTransport([b'Agilent Technologies,B2901A,0,0\n', b'"DEF"\n'])
+    smu = B2900(transport)
+    transport.responses.extend([b'REAL,32\n', b'NORM\n', b'ASC\n'])
+    assert smu.format.dtype() == '>f4'
+    assert smu.format.dtype() == np.dtype(float)
@@ -0,0 +1,141 @@
+#  -*- coding: utf-8 -*-
+#
+# Slave, (c) 2015, see AUTHORS.  Licensed under the GNU GPL.
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+import sys
+
+import pytest
+
+if sys.version_info < (3, 5):
+    pytest.skip('slave.aio requires python 3.5', allow_module_level=True)
+
+import asyncio
+
+from slave.aio import (AsyncDriver, AsyncIEC60488, AsyncSignalRecovery,
+                       AsyncTransport, async_protocol)
+from slave.driver import Command, Driver
+from slave.protocol import IEC60488, OxfordIsobus, SignalRecovery
+from slave.test import util
+from slave.transport import Timeout
+from slave.types import Integer, String
+
+
+def run(awaitable, timeout=None):
+    """Runs the awaitable or the awaitable returned by a callable."""
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        if callable(awaitable):
+            awaitable = awaitable()
+        return loop.run_until_complete(asyncio.wait_for(awaitable, timeout))
+    finally:
+        asyncio.set_event_loop(None)
+        loop.close()
+
+
+class MockTransport(AsyncTransport):
+    """Wraps the synchronous :class:`~slave.test.util.MockTransport`, delaying
+    each read.
+    """
+    def __init__(self, responses=(), delay=0):
+        super(MockTransport, self).__init__()
+        self.mock = util.MockTransport(responses)
+        self.messages = self.mock.messages
+        self.delay = delay
+
+    def __read__(self, num_bytes):
+        return asyncio.sleep(self.delay, result=self.mock.__read__(num_bytes))
+
+    def __write__(self, data):
+        self.mock.__write__(data)
+        return asyncio.sleep(0)
+
+
+class RendezvousTransport(MockTransport):
+    """Blocks each read until `count` reads have started."""
+    async def __read__(self, num_bytes):
+        self.started.append(self)
+        if len(self.started) >= self.count:
+            self.event.set()
+        await self.event.wait()
+        return self.mock.__read__(num_bytes)
+
+
+class MockDriver(Driver):
+    def __init__(self, transport, protocol=None):
+        super(MockDriver, self).__init__(transport, protocol)
+        self.cmd = Command('QUERY?', 'WRITE', [Integer, String])
+
+
+class TestAsyncTransport(object):
+    def test_read_until(self):
+        transport = MockTransport([b'RES', b'PONSE\nTAIL'])
+        assert run(transport.read_until(b'\n')) == b'RESPONSE'
+        assert transport._buffer == b'TAIL'
+
+    def test_read_exactly(self):
+        transport = MockTransport([b'RES', b'PONSE'])
+        assert run(transport.read_exactly(4)) == b'RESP'
+
+    def test_read_until_with_timeout(self):
+        transport = MockTransport([b'PARTIAL', b'NEVER'], delay=0.1)
+        transport._buffer.extend(b'DATA')
+        with pytest.raises(Timeout) as excinfo:
+            run(transport.read_until(b'\n', timeout=0.01))
+        assert excinfo.value.data == b'DATA'
+
+
+class TestAsyncProtocol(object):
+    def test_async_protocol(self):
+        assert isinstance(async_protocol(IEC60488()), AsyncIEC60488)
+        assert isinstance(async_protocol(SignalRecovery()), AsyncSignalRecovery)
+        with pytest.raises(TypeError):
+            async_protocol(OxfordIsobus())
+
+    def test_query(self):
+        transport = MockTransport([b'1,2\n'])
+        protocol = async_protocol(IEC60488())
+        assert run(protocol.query(transport, 'HEADER')) == ['1', '2']
+        assert transport.messages == [b'HEADER\n']
+
+    def test_signal_recovery_query_bytes(self):
+        transport = MockTransport([b'\x01\x02\x00\x03\x04'])
+        protocol = async_protocol(SignalRecovery())
+        assert run(protocol.query_bytes(transport, 2, 'HEADER')) == b'\x01\x02'
+
+
+class TestAsyncDriver(object):
+    def test_query_and_write(self):
+        transport = MockTransport([b'1,A\n'])
+        driver = AsyncDriver(MockDriver(transport))
+        assert run(driver.cmd) == [1, 'A']
+        run(driver.set('cmd', (2, 'B')))
+        assert transport.messages == [b'QUERY?\n', b'WRITE 2,B\n']
+
+    def test_concurrent_queries(self):
+        transports = [RendezvousTransport([b'1,A\n']) for i in range(10)]
+        drivers = [AsyncDriver(MockDriver(t)) for t in transports]
+
+        async def main():
+            # The reads only complete once all of them are pending, which
+            # requires the queries to overlap.
+            started = []
+            event = asyncio.Event()
+            for transport in transports:
+                transport.started = started
+                transport.event = event
+                transport.count = len(transports)
+            return await asyncio.gather(*(d.cmd for d in drivers))
+
+        # The timeout is a safety net against a deadlock only.
+        responses = run(main, timeout=10)
+        assert responses == [[1, 'A']] * 10
+
+    def test_transport_created_outside_loop(self):
+        # The transport is built without a running or current event loop.
+        asyncio.set_event_loop(None)
+        transport = MockTransport([b'1,A\n'])
+        driver = AsyncDriver(MockDriver(transport))
+        assert transport.lock is None
+        assert run(driver.cmd) == [1, 'A']
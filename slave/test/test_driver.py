@@ -6,10 +6,11 @@ from __future__ import (absolute_import, division,
 from future.builtins import *
 import itertools as it
 
+import numpy as np
 import pytest
 
 from slave.driver import Command, Driver, _dump, _load, _to_instance, _typelist
-from slave.types import Integer, String
+from slave.types import Float, Integer, Stream, String
 from slave.transport import SimulatedTransport
 
 
@@ -32,6 +33,18 @@ class MockProtocol(object):
         self.data = data
 
 
+class MockBatchProtocol(MockProtocol):
+    def __init__(self, responses=None):
+        super(MockBatchProtocol, self).__init__()
+        self.responses = responses
+        self.units = None
+
+    def batch(self, transport, units):
+        self.transport = transport
+        self.units = units
+        return self.responses
+
+
 class MockTransport(object):
     pass
 
@@ -152,6 +165,20 @@ class TestCommand(object):
         assert protocol.data == ()
         assert response == [1, 2]
 
+    def test_query_with_single_value_stream(self):
+        protocol = MockProtocol(response=['1.5'])
+        cmd = Command(query=('HEADER', Stream(Float)))
+        response = cmd.query(MockTransport(), protocol)
+        assert response == 1.5
+        assert type(response) is float
+
+    def test_query_with_single_value_array_stream(self):
+        protocol = MockProtocol(response=['1.5'])
+        cmd = Command(query=('HEADER', Stream(Float, array=True)))
+        response = cmd.query(MockTransport(), protocol)
+        assert isinstance(response, np.ndarray)
+        assert response.tolist() == [1.5]
+
     def test_query_with_write_only_cmd(self):
         protocol = MockProtocol()
         transport = MockTransport()
@@ -256,3 +283,100 @@ class TestDriver(object):
         driver._write(('WRITE', [Integer, String]), 12, 'DATA')
         assert protocol.header == 'WRITE'
         assert protocol.data == ('12', 'DATA')
+
+
+class TestCache(object):
+    def test_cached_query(self):
+        transport, protocol = MockTransport(), MockProtocol(response=['RESPONSE'])
+        driver = MockDriver(transport, protocol)
+        driver.enable_cache(float('inf'), 'cmd')
+        assert driver.cmd == 'RESPONSE'
+        protocol.response = ['CHANGED']
+        assert driver.cmd == 'RESPONSE'
+        assert driver.cache_stats() == {'hits': 1, 'misses': 1, 'size': 1}
+
+    def test_cached_stream_response_is_copied(self):
+        transport, protocol = MockTransport(), MockProtocol(response=['1', '2'])
+        driver = MockDriver(transport, protocol)
+        driver.stream_cmd = Command('QUERY', 'WRITE', Stream(Integer))
+        driver.enable_cache(float('inf'), 'stream_cmd')
+        driver.stream_cmd.append(3)
+        response = driver.stream_cmd
+        assert response == [1, 2]
+        response[0] = 0
+        assert driver.stream_cmd == [1, 2]
+
+    def test_expired_response(self):
+        transport, protocol = MockTransport(), MockProtocol(response=['RESPONSE'])
+        driver = MockDriver(transport, protocol)
+        driver.enable_cache(0, 'cmd')
+        assert driver.cmd == 'RESPONSE'
+        protocol.response = ['CHANGED']
+        assert driver.cmd == 'CHANGED'
+        assert driver.cache_stats()['misses'] == 2
+
+    def test_write_invalidates_cache(self):
+        transport, protocol = MockTransport(), MockProtocol(response=['RESPONSE'])
+        driver = MockDriver(transport, protocol)
+        driver.enable_cache(float('inf'), 'cmd')
+        assert driver.cmd == 'RESPONSE'
+        driver.cmd = 'CHANGED'
+        protocol.response = ['CHANGED']
+        assert driver.cmd == 'CHANGED'
+
+    def test_invalidate(self):
+        transport, protocol = MockTransport(), MockProtocol(response=['RESPONSE'])
+        driver = MockDriver(transport, protocol)
+        driver.enable_cache(float('inf'), 'cmd')
+        assert driver.cmd == 'RESPONSE'
+        driver.invalidate()
+        assert driver.cache_stats()['size'] == 0
+
+    def test_enable_cache_with_non_command_attribute(self):
+        driver = MockDriver(MockTransport(), MockProtocol())
+        with pytest.raises(TypeError):
+            driver.enable_cache(1, 'no_cmd')
+
+
+class TestBatch(object):
+    def test_batch(self):
+        transport = MockTransport()
+        protocol = MockBatchProtocol(responses=[['RESPONSE'], ['1', 'A']])
+        driver = MockDriver(transport, protocol)
+        with driver.batch() as batch:
+            first = batch.query('cmd')
+            batch.write('cmd', 'MESSAGE')
+            second = batch.query('multiple_types_cmd')
+            assert not first.done()
+        assert protocol.units == [
+            (True, 'QUERY', ()),
+            (False, 'WRITE', ['MESSAGE']),
+            (True, 'QUERY', ()),
+        ]
+        assert first.result() == 'RESPONSE'
+        assert second.result() == [1, 'A']
+        assert batch.results == ['RESPONSE', [1, 'A']]
+
+    def test_batch_is_not_executed_on_error(self):
+        transport, protocol = MockTransport(), MockBatchProtocol()
+        driver = MockDriver(transport, protocol)
+        with pytest.raises(ValueError):
+            with driver.batch() as batch:
+                future = batch.query('cmd')
+                raise ValueError()
+        assert protocol.units is None
+        with pytest.raises(RuntimeError):
+            future.result()
+
+    def test_batch_with_non_command_attribute(self):
+        transport, protocol = MockTransport(), MockBatchProtocol()
+        driver = MockDriver(transport, protocol)
+        with pytest.raises(TypeError):
+            driver.batch().query('no_cmd')
+
+    def test_batch_with_simulation(self):
+        driver = MockDriver(SimulatedTransport(), MockBatchProtocol())
+        with driver.batch() as batch:
+            batch.write('cmd', 'MESSAGE')
+            response = batch.query('cmd')
+        assert response.result() == 'MESSAGE'
@@ -0,0 +1,77 @@
+#  -*- coding: utf-8 -*-
+#
+# Slave, (c) 2015, see AUTHORS.  Licensed under the GNU GPL.
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+from future.builtins import *
+import collections
+
+import pytest
+
+from slave.iec60488 import IEC60488
+from slave.test.util import MockTransport
+from slave.transport import Timeout
+
+
+class MockGpib(MockTransport):
+    def __init__(self, responses, status_bytes):
+        super(MockGpib, self).__init__(responses)
+        self.status_bytes = collections.deque(status_bytes)
+
+    def wait_for_srq(self, timeout=None):
+        # A status byte of `None` simulates an expired transport timeout.
+        if not self.status_bytes or self.status_bytes[0] is None:
+            if self.status_bytes:
+                self.status_bytes.popleft()
+            raise Timeout()
+        return self.status_bytes.popleft()
+
+
+class TestAwaitEvent(object):
+    def test_polling(self):
+        transport = MockTransport([b'4\n', b'16\n', b'0\n', b'0\n', b'1\n'])
+        device = IEC60488(transport)
+        assert device.await_event(poll_interval=0)
+        assert transport.messages == [
+            b'*ESE?\n', b'*SRE?\n', b'*ESR?\n', b'*ESE 1\n', b'*SRE 32\n',
+            b'*OPC\n', b'*ESR?\n', b'*ESR?\n', b'*ESE 4\n', b'*SRE 16\n'
+        ]
+
+    def test_polling_timeout(self):
+        transport = MockTransport([b'0\n'] * 5)
+        device = IEC60488(transport)
+        assert not device.await_event('execution error', timeout=0, poll_interval=0)
+        assert transport.messages[2:5] == [b'*ESR?\n', b'*ESE 16\n', b'*SRE 32\n']
+
+    def test_service_request(self):
+        # The first service request is caused by another status bit.
+        transport = MockGpib([b'0\n', b'0\n', b'0\n', b'1\n'], [16, 32])
+        device = IEC60488(transport)
+        assert device.await_event()
+        assert transport.messages[-4:] == [b'*OPC\n', b'*ESR?\n', b'*ESE 0\n', b'*SRE 0\n']
+
+    def test_service_request_timeout(self):
+        transport = MockGpib([b'0\n'] * 3, [])
+        device = IEC60488(transport)
+        assert not device.await_event(timeout=1)
+
+    def test_service_request_without_timeout(self):
+        # The transport timeout expires twice before the service request.
+        transport = MockGpib([b'0\n'] * 3 + [b'1\n'], [None, None, 32])
+        device = IEC60488(transport)
+        assert device.await_event()
+        assert not transport.status_bytes
+
+    def test_enable_registers_are_restored_on_error(self):
+        def fail(timeout=None):
+            raise KeyboardInterrupt()
+        transport = MockGpib([b'8\n', b'2\n', b'0\n'], [])
+        transport.wait_for_srq = fail
+        device = IEC60488(transport)
+        with pytest.raises(KeyboardInterrupt):
+            device.await_event()
+        assert transport.messages[-2:] == [b'*ESE 8\n', b'*SRE 2\n']
+
+    def test_unknown_event(self):
+        with pytest.raises(ValueError):
+            IEC60488(MockTransport([])).await_event('unknown')
@@ -6,7 +6,8 @@ from __future__ import (absolute_import, division,
 from future.builtins import *
 import collections
 
-from slave.keithley import K2182, K6221, K2000
+from slave.keithley import K2182, K6221, K2000, K2400
+from slave.test.util import MockTransport
 from slave.transport import SimulatedTransport
 
 
@@ -22,3 +23,36 @@ def test_K6221():
 def test_K2000():
     # Test if instantiation fails
     K2000(SimulatedTransport())
+
+
+def test_K2400_run_sweep():
+    esr = collections.deque([b'0\n', b'0\n', b'1\n'])
+    responses = {
+        b':TRIG:COUN?\n': b'2\n',
+        b':TRAC1:DATA?\n': b'1,10,2,20\n',
+        b'*ESE?\n': b'0\n',
+        b'*SRE?\n': b'0\n',
+    }
+
+    def respond(message):
+        if message == b'*ESR?\n':
+            return esr.popleft()
+        return responses.get(message)
+
+    transport = MockTransport(respond=respond)
+    smu = K2400(transport)
+    data = smu.setup.run_sweep(('voltage', 'current'), poll_interval=0)
+    assert list(data['voltage']) == [1., 2.]
+    assert list(data['current']) == [10., 20.]
+    assert transport.messages[-12:] == [
+        b':INIT\n', b'*ESE?\n', b'*SRE?\n', b'*ESR?\n', b'*ESE 1\n',
+        b'*SRE 32\n', b'*OPC\n', b'*ESR?\n', b'*ESR?\n', b'*ESE 0\n',
+        b'*SRE 0\n', b':TRAC1:DATA?\n',
+    ]
+
+
+def test_K2400_format_dtype():
+    transport = MockTransport([b'SRE\n', b'NORM\n', b'REAL,64\n', b'SWAP\n'])
+    smu = K2400(transport)
+    assert smu.format.dtype() == '>f4'
+    assert smu.format.dtype() == '<f8'
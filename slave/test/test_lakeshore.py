@@ -5,7 +5,10 @@ from __future__ import (absolute_import, division,
                         print_function, unicode_literals)
 from future.builtins import *
 
+import numpy as np
+
 from slave.lakeshore import LS340, LS370
+from slave.test.util import MockTransport
 from slave.transport import SimulatedTransport
 
 
@@ -17,3 +20,31 @@ def test_ls340():
 def test_ls370():
     # Test if instantiation fails
     LS370(SimulatedTransport())
+
+
+def test_ls340_curve_bulk_read():
+    transport = MockTransport([b'1.0,300.0;2.0,200.0\n', b'3.0,100.0\n'])
+    curve = LS340(transport).user_curve[0]
+    curve.batch_size = 2
+    assert curve.read(0, 3).tolist() == [[1., 300.], [2., 200.], [3., 100.]]
+    assert transport.messages == [b'CRVPT? 21,1;CRVPT? 21,2\n', b'CRVPT? 21,3\n']
+
+
+def test_ls370_curve_writes_changed_points():
+    transport = MockTransport([b'1.0,300.0;2.0,200.0\n'])
+    curve = LS370(transport).user_curve[0]
+    curve.read(0, 2)
+    curve.write(np.array([[1., 300.], [2.5, 200.]]))
+    assert transport.messages == [
+        b'CRVPT? 1,1;CRVPT? 1,2\n',
+        b'CRVPT 1,2,2.5,200.0\n',
+    ]
+
+
+def test_ls340_curve_keeps_written_points():
+    transport = MockTransport([])
+    curve = LS340(transport).user_curve[0]
+    curve[0:2] = [(1., 300.), (0.1234567, 470.0001)]
+    # The points are stored with six significant digits.
+    curve[0:2] = [(1., 300.), (0.12345671, 470.)]
+    assert transport.messages == [b'CRVPT 21,1,1.0,300.0;CRVPT 21,2,0.123457,470.0\n']
@@ -5,9 +5,12 @@ from __future__ import (absolute_import, division,
                         print_function, unicode_literals)
 from future.builtins import *
 import os
+import threading
+import time
 import pytest
 from slave.misc import (index, ForwardSequence, range_to_numeric, AutoRange,
-                        Measurement, LockInMeasurement, wrap_exception)
+                        Measurement, LockInMeasurement, Scheduler, Sweep,
+                        bind_transport, transport_key, wrap_exception)
 
 
 class TestIndex(object):
@@ -87,6 +90,170 @@ class TestAutoRange(object):
         with pytest.raises(ValueError):
             AutoRange([1e-6, 1e-3, 1], names=['1 mV', '1 V'])
 
+    def test_running_mean(self):
+        auto = AutoRange([1., 2., 3., 4.], buffer_len=2)
+        values = [0.5, 1.5, 2.5, 3.5, 0.5, 0.5]
+        estimates = [auto.range(x) for x in values]
+        assert estimates == [1., 2., 3., 4., 3., 1.]
+
+    def test_hysteresis(self):
+        auto = AutoRange([1e-3, 1.], buffer_len=1, hysteresis=0.2)
+        assert auto.range(1.5e-3) == 1.
+        # Within the hysteresis, the range is kept.
+        assert auto.range(0.9e-3) == 1.
+        assert auto.range(0.7e-3) == 1e-3
+        # Larger ranges are chosen immediately.
+        assert auto.range(1e-3) == 1.
+
+    def test_changing_the_hysteresis(self):
+        auto = AutoRange([1e-3, 1.], buffer_len=1)
+        assert auto.range(1.5e-3) == 1.
+        auto.hysteresis = 0.2
+        assert auto.range(0.9e-3) == 1.
+        with pytest.raises(ValueError):
+            auto.hysteresis = 1.
+
+    def test_unbounded_buffer(self):
+        auto = AutoRange([1., 2., 3., 4.], buffer_len=None)
+        estimates = [auto.range(x) for x in [0.5, 2.5, 3.5, 0.5]]
+        assert estimates == [1., 2., 3., 2.]
+        # The mean of all six values is about 1.6.
+        assert auto.range_array([1.5, 1.]) == 2.
+
+    def test_range_array(self):
+        auto = AutoRange([1e-6, 1e-3, 1.], buffer_len=3)
+        assert auto.range_array([1., 1., -0.5e-6, 0.9e-6, 0.8e-6]) == 1e-6
+        assert auto.range(3e-6) == 1e-3
+
+    def test_range_all(self):
+        autoranges = [AutoRange([1e-6, 1e-3, 1.]) for _ in range(2)]
+        samples = [[0.5e-6, 0.6e-6], [0.5e-3, -0.6e-3]]
+        assert AutoRange.range_all(autoranges, samples) == [1e-6, 1e-3]
+        with pytest.raises(ValueError):
+            AutoRange.range_all(autoranges, samples[:1])
+
+
+class TestScheduler(object):
+    def test_results_are_ordered(self):
+        scheduler = Scheduler()
+        assert scheduler([lambda: 1, lambda: 2, lambda: 3]) == [1, 2, 3]
+
+    def test_groups_run_concurrently(self):
+        # Each group waits for the other one, which succeeds only if both
+        # are evaluated at the same time.
+        first, second = threading.Event(), threading.Event()
+        def meet(own, other):
+            own.set()
+            return other.wait(5), threading.current_thread()
+        results = Scheduler()([
+            lambda: meet(first, second),
+            lambda: meet(second, first),
+        ])
+        assert [met for met, _ in results] == [True, True]
+        assert len(set(thread for _, thread in results)) == 2
+
+    def test_workers_are_reused(self):
+        scheduler = Scheduler()
+        calls = [threading.current_thread, lambda: threading.current_thread()]
+        _, first = scheduler(calls)
+        _, second = scheduler(calls)
+        assert first is second
+        scheduler.close()
+        assert not first.is_alive()
+
+    def test_callables_sharing_a_transport_are_grouped(self):
+        transport = object()
+        calls = [
+            bind_transport(lambda: threading.current_thread(), transport),
+            lambda: None,
+            bind_transport(lambda: threading.current_thread(), transport),
+        ]
+        first, _, second = Scheduler()(calls)
+        assert first is second
+
+    def test_exception_is_reraised(self):
+        def fail():
+            raise ValueError()
+        with pytest.raises(ValueError):
+            Scheduler()([lambda: 1, fail])
+
+
+class FakeClock(object):
+    """A clock advanced by sleeping."""
+    def __init__(self):
+        self.now = 0.
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class TestSweep(object):
+    def test_done_is_polled_independently(self):
+        clock = FakeClock()
+        polls = []
+        def done():
+            polls.append(clock())
+            return len(polls) == 3
+        # Each measurement takes 5 ms.
+        sweep = Sweep(lambda: clock.sleep(0.005), done, poll_interval=0.02,
+                      clock=clock, sleep=clock.sleep).run()
+        assert polls == pytest.approx([0., 0.02, 0.04])
+        # Measurements run at max throughput in between the polls.
+        assert sweep.count == 8
+        assert sweep.elapsed == pytest.approx(0.04)
+        assert sweep.sample_rate == sweep.count / sweep.elapsed
+
+    def test_target_rate(self):
+        clock = FakeClock()
+        times = []
+        sweep = Sweep(lambda: times.append(clock()), lambda: clock() > 0.085,
+                      rate=50, poll_interval=0.01, clock=clock, sleep=clock.sleep).run()
+        assert times == pytest.approx([0., 0.02, 0.04, 0.06, 0.08])
+        assert sweep.count == 5
+
+    def test_delay_after_each_measurement(self):
+        clock = FakeClock()
+        times = []
+        def measure():
+            times.append(clock())
+            clock.sleep(0.01)
+        Sweep(measure, lambda: clock() > 0.135, poll_interval=0.01, delay=0.05,
+              clock=clock, sleep=clock.sleep).run()
+        assert times == pytest.approx([0., 0.06, 0.12])
+
+    def test_rate_and_delay_are_exclusive(self):
+        with pytest.raises(ValueError):
+            Sweep(lambda: None, lambda: True, rate=1, delay=1)
+
+    def test_no_measurement_if_done(self):
+        sweep = Sweep(lambda: None, lambda: True).run()
+        assert sweep.count == 0
+
+    def test_measure_not_callable(self):
+        with pytest.raises(TypeError):
+            Sweep('measure', lambda: True)
+
+
+def test_transport_key():
+    fn = lambda: None
+    assert transport_key(fn) is fn
+    assert transport_key(bind_transport(fn, 'TRANSPORT')) == 'TRANSPORT'
+
+
+def test_transport_key_of_referenced_driver():
+    class Driver(object):
+        def __init__(self, transport):
+            self._transport = transport
+    ppms, lia = Driver('PPMS'), Driver('LIA')
+    assert transport_key(lambda: ppms.temperature) == 'PPMS'
+    assert transport_key(lambda lia=lia: lia.x) == 'LIA'
+    # The transport is ambiguous.
+    fn = lambda: (ppms.field, lia.x)
+    assert transport_key(fn) is fn
+
 
 class TestMeasurement(object):
     def test_calling(self, tmpdir):
@@ -104,6 +271,22 @@ class TestMeasurement(object):
             measure()
         assert path.read() == 'A,B\n1,2\n'
 
+    def test_calling_with_scheduler(self, tmpdir):
+        path = tmpdir.join('data.csv')
+        params = [lambda: 1, lambda: 2]
+        with Measurement(str(path), params, scheduler=Scheduler()) as measure:
+            measure()
+        assert path.read() == '1,2\n'
+
+    def test_scheduler_is_closed(self, tmpdir):
+        path = tmpdir.join('data.csv')
+        scheduler = Scheduler()
+        params = [lambda: threading.current_thread(), lambda: threading.current_thread()]
+        with Measurement(str(path), params, scheduler=scheduler) as measure:
+            measure()
+            workers = list(scheduler._workers)
+        assert workers and not any(w.is_alive() for w in workers)
+
     def test_if_filehandle_is_closed_on_error(self, tmpdir):
         path = tmpdir.join('data.csv')
         params = [lambda: 1, lambda: 2]
@@ -160,6 +343,15 @@ class TestLockInMeasurement(object):
         assert path.read() == 'X1,Y1,ENV\n1.3,1.4,env\n'
         assert lockins[0].sensitivity == 1.
 
+    def test_with_scheduler(self, tmpdir):
+        path = tmpdir.join('data.csv')
+        SENSITIVITY = [1e-6, 1e-3, 1.]
+        lockins = [MockLockIn(1.3, 1.4, SENSITIVITY), MockLockIn(2.3, 2.4, SENSITIVITY)]
+        env_params = [lambda: 'env']
+        with LockInMeasurement(str(path), lockins, env_params, autorange=False, scheduler=Scheduler()) as measure:
+            measure()
+        assert path.read() == '1.3,1.4,2.3,2.4,env\n'
+
 
 def test_wrap_exception():
     @wrap_exception(exc=ValueError, new_exc=TypeError)
@@ -0,0 +1,50 @@
+#  -*- coding: utf-8 -*-
+#
+# Slave, (c) 2015, see AUTHORS.  Licensed under the GNU GPL.
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+from future.builtins import *
+
+from slave.oxford import ITC503
+from slave.test.util import MockTransport
+from slave.transport import SimulatedTransport
+
+
+def test_itc503():
+    # Test if instantiation fails
+    ITC503(SimulatedTransport())
+
+
+def test_itc503_table_skips_redundant_pointer_writes():
+    transport = MockTransport([
+        b'x\r', b'y\r', b'r1.0\r', b'y\r', b'r2.0\r', b'y\r', b'r3.0\r'
+    ])
+    table = ITC503(transport).sweep_table
+    assert table[0] == [1., 2., 3.]
+    assert transport.messages == [
+        b'x1\r', b'y1\r', b'r\r', b'y2\r', b'r\r', b'y3\r', b'r\r'
+    ]
+
+
+def test_itc503_table_writes_changed_cells():
+    transport = MockTransport([b'x\r', b'y\r', b's\r', b'y\r', b's\r', b'y\r', b's\r'])
+    table = ITC503(transport).sweep_table
+    table[0] = [1., 2., 3.]
+    transport.responses.extend([b'y\r', b's\r'])
+    table[0] = [1., 2.5, 3.]
+    assert transport.messages[6:] == [b's3.0\r', b'y2\r', b's2.5\r']
+
+
+def test_itc503_tables_share_the_pointers():
+    transport = MockTransport([
+        b'x\r', b'y\r', b'r1.0\r', b'x\r', b'y\r', b'q2.0\r',
+        b'x\r', b'y\r', b'r1.0\r',
+    ])
+    itc = ITC503(transport)
+    assert itc.sweep_table[0, 0] == 1.
+    assert itc.pid_table[5, 2] == 2.
+    assert itc.sweep_table[0, 0] == 1.
+    assert transport.messages == [
+        b'x1\r', b'y1\r', b'r\r', b'x6\r', b'y3\r', b'q\r',
+        b'x1\r', b'y1\r', b'r\r',
+    ]
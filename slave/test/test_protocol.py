@@ -4,25 +4,13 @@
 from __future__ import (absolute_import, division,
                         print_function, unicode_literals)
 from future.builtins import *
-import collections
+import struct
 
+import numpy as np
 import pytest
 
 from slave.protocol import IEC60488, OxfordIsobus, Protocol, SignalRecovery
-from slave.transport import Transport
-
-
-class MockTransport(Transport):
-    def __init__(self, responses=[]):
-        self.responses = collections.deque(responses)
-        self.messages = collections.deque()
-        super(MockTransport, self).__init__()
-
-    def __write__(self, data):
-        self.messages.append(data)
-
-    def __read__(self, num_bytes):
-        return self.responses.popleft()
+from slave.test.util import MockTransport
 
 
 class TestIEC60488Protocol(object):
@@ -38,6 +26,12 @@ class TestIEC60488Protocol(object):
         protocol = IEC60488(msg_prefix='PREFIX:')
         assert protocol.create_message('HEADER', 'D1', 'D2', 'D3') == b'PREFIX:HEADER D1,D2,D3\n'
 
+    def test_create_message_after_changing_framing(self):
+        protocol = IEC60488(msg_prefix='PREFIX:')
+        assert protocol.create_message('HEADER', 'DATA') == b'PREFIX:HEADER DATA\n'
+        protocol.msg_term = '\r\n'
+        assert protocol.create_message('HEADER', 'DATA') == b'PREFIX:HEADER DATA\r\n'
+
     def test_write_without_data(self):
         protocol = IEC60488()
         transport = MockTransport()
@@ -74,6 +68,85 @@ class TestIEC60488Protocol(object):
         assert protocol.query(transport, 'HEADER') == ['DATA','DATA']
         assert transport.messages[0] == b'HEADER\n'
 
+    def test_create_program_message(self):
+        protocol = IEC60488(msg_prefix='PREFIX:')
+        message = protocol.create_program_message([('H1', ()), ('H2', ('D1', 'D2'))])
+        assert message == b'PREFIX:H1;PREFIX:H2 D1,D2\n'
+
+    def test_parse_response_units_with_wrong_count(self):
+        protocol = IEC60488()
+        with pytest.raises(Protocol.ParsingError):
+            protocol.parse_response_units(b'DATA;DATA', 3)
+
+
+class TestIEC60488ProtocolQueryArray(object):
+    def test_definite_length_block(self):
+        block = struct.pack('<3d', 1., 2., 3.)
+        # The block contains the response terminator.
+        block += struct.pack('<d', np.frombuffer(b'\n' * 8, '<f8')[0])
+        response = '#2{0}'.format(len(block)).encode('ascii') + block + b'\n'
+        transport = MockTransport(responses=[response[:10], response[10:]])
+        data = IEC60488().query_array(transport, '<f8', 'HEADER')
+        assert data.dtype == np.dtype('<f8')
+        assert list(data[:3]) == [1., 2., 3.]
+        assert len(data) == 4
+        assert not transport._buffer
+
+    def test_indefinite_length_block(self):
+        # The block contains the response terminator.
+        block = struct.pack('>2f', 1., np.frombuffer(b'\n' * 4, '>f4')[0])
+        transport = MockTransport(respond=lambda message: b'#0' + block + b'\n')
+        with pytest.raises(IEC60488.ParsingError):
+            IEC60488().query_array(transport, '>f4', 'HEADER')
+        assert not transport._buffer
+
+    def test_ascii_response(self):
+        transport = MockTransport(responses=[b'1.0,2.5E+00\n'])
+        data = IEC60488().query_array(transport, '>f8', 'HEADER')
+        assert list(data) == [1., 2.5]
+
+    def test_empty_ascii_response(self):
+        transport = MockTransport(responses=[b'\n'])
+        data = IEC60488().query_array(transport, '>f8', 'HEADER')
+        assert data.dtype == np.dtype('>f8')
+        assert len(data) == 0
+
+    def test_empty_ascii_response_with_multibyte_terminator(self):
+        transport = MockTransport(responses=[b'\r', b'\n'])
+        data = IEC60488(resp_term='\r\n').query_array(transport, '>f8', 'HEADER')
+        assert len(data) == 0
+        assert not transport._buffer
+
+
+class TestIEC60488ProtocolBatch(object):
+    def test_batch(self):
+        protocol = IEC60488()
+        transport = MockTransport(responses=[b'D1,D2;D3\n'])
+        units = [(True, 'Q1?', ()), (False, 'W', ('1',)), (True, 'Q2?', ())]
+        assert protocol.batch(transport, units) == [['D1', 'D2'], ['D3']]
+        assert list(transport.messages) == [b'Q1?;W 1;Q2?\n']
+
+    def test_batch_without_queries(self):
+        protocol = IEC60488()
+        transport = MockTransport()
+        assert protocol.batch(transport, [(False, 'W1', ()), (False, 'W2', ())]) == []
+        assert list(transport.messages) == [b'W1;W2\n']
+
+    def test_batch_of_queries_is_retried(self):
+        protocol = IEC60488()
+        transport = MockTransport(responses=[b'D1\n', b'D1;D2\n'])
+        units = [(True, 'Q1?', ()), (True, 'Q2?', ())]
+        assert protocol.batch(transport, units) == [['D1'], ['D2']]
+        assert list(transport.messages) == [b'Q1?;Q2?\n'] * 2
+
+    def test_batch_with_writes_is_not_retried(self):
+        protocol = IEC60488()
+        transport = MockTransport(responses=[b'D1\n'])
+        units = [(True, 'Q1?', ()), (False, 'W', ('1',)), (True, 'Q2?', ())]
+        with pytest.raises(IEC60488.ParsingError):
+            protocol.batch(transport, units)
+        assert list(transport.messages) == [b'Q1?;W 1;Q2?\n']
+
 
 class CallbackBuffer(object):
     def __call__(self, data):
@@ -113,6 +186,13 @@ class TestOxfordIsobus(object):
         protocol = OxfordIsobus(address=7)
         assert protocol.create_message('R') == b'@7R\r'
 
+    def test_create_message_after_changing_address(self):
+        protocol = OxfordIsobus(address=7)
+        assert protocol.create_message('R', '1') == b'@7R1\r'
+        protocol.address = 8
+        protocol.echo = False
+        assert protocol.create_message('R', '1') == b'$@8R1\r'
+
     def test_create_message_with_data_and_without_address(self):
         protocol = OxfordIsobus()
         assert protocol.create_message('R', '1337') == b'R1337\r'
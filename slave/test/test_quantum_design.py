@@ -5,12 +5,32 @@
 from __future__ import (absolute_import, division,
                         print_function, unicode_literals)
 from future.builtins import *
-import collections
+import datetime
 
 from slave.quantum_design import PPMS
+from slave.test.util import MockTransport
 from slave.transport import SimulatedTransport
 
 
 def test_ppms():
     # Test if instantiation fails
     PPMS(SimulatedTransport(), max_field=10e4)
+
+
+def test_ppms_snapshot():
+    transport = MockTransport([b'7,1400000000.0,17,300.0,10000.0;'])
+    ppms = PPMS(transport, max_field=10e4)
+    snapshot = ppms.snapshot(['field', 'status', 'temperature'])
+    assert transport.messages == [b'GETDAT? 7;']
+    assert snapshot['temperature'] == 300.
+    assert snapshot['field'] == 10000.
+    assert snapshot['status']['temperature'] == 'normal stability at target temperature'
+    assert snapshot['timestamp'] == datetime.datetime.fromtimestamp(1400000000)
+
+
+def test_ppms_measurables_share_snapshot():
+    transport = MockTransport([b'6,1400000000.0,300.0,10000.0;'])
+    ppms = PPMS(transport, max_field=10e4)
+    temperature, field = ppms.measurables(['temperature', 'field'])
+    assert (temperature(), field()) == (300., 10000.)
+    assert transport.messages == [b'GETDAT? 6;']
@@ -4,9 +4,13 @@
 from __future__ import (absolute_import, division,
                         print_function, unicode_literals)
 from future.builtins import *
-import collections
+import struct
+
+import numpy as np
+import pytest
 
 from slave.signal_recovery import SR5113, SR7225, SR7230
+from slave.test.util import MockTransport
 from slave.transport import SimulatedTransport
 
 
@@ -23,3 +27,97 @@ def test_sr7225():
 def test_sr7230():
     # Test if instantiation fails
     SR7230(SimulatedTransport())
+
+
+def test_sr7230_standard_buffer_read():
+    transport = MockTransport([
+        b'17\0\0\0',  # CBD: x and sensitivity
+        b'2\0\0\0',  # LEN
+        struct.pack('>2h', 5000, -10000) + b'\0\0\0',
+        struct.pack('>2h', 3, 18) + b'\0\0\0',
+    ])
+    data = SR7230(transport).standard_buffer.read(['x'])
+    assert data.dtype.names == ('x',)
+    assert np.allclose(data['x'], [5e-9, -1e-3])
+    assert transport.messages == [b'CBD\0', b'LEN\0', b'DCB 0\0', b'DCB 4\0']
+
+
+def test_sr7230_standard_buffer_frequency_item():
+    transport = MockTransport([
+        b'98304\0\0\0',  # CBD: frequency
+        b'2\0\0\0',  # LEN
+        struct.pack('>2H', 1000, 0) + b'\0\0\0',  # lower 16 bits
+        struct.pack('>2h', 0, 1) + b'\0\0\0',  # upper 16 bits
+    ])
+    buffer = SR7230(transport).standard_buffer
+    # The frequency is stored in mHz.
+    assert list(buffer['frequency']) == [1., 65.536]
+    assert transport.messages == [b'CBD\0', b'LEN\0', b'DCB 15\0', b'DCB 16\0']
+
+
+def test_sr7230_standard_buffer_stream():
+    transport = MockTransport([
+        b'9\0\0\0',  # CBD: x and theta
+        b'3\0\0\0',  # LEN
+        b'1,1,0,1\0\0\0',  # M
+        struct.pack('>h', 9000) + b'\0\0\0',
+        b'1,1,0,2\0\0\0',  # M
+        struct.pack('>h', -4500) + b'\0\0\0',
+        b'0,1,0,2\0\0\0',  # M
+    ])
+    chunks = list(SR7230(transport).standard_buffer.stream(['theta'], interval=0))
+    assert [list(c['theta']) for c in chunks] == [[90.], [-45.]]
+    # Only the new points are transfered.
+    assert transport.messages[3] == b'DCB 3 0 1\0'
+    assert transport.messages[5] == b'DCB 3 1 1\0'
+
+
+def test_sr7230_standard_buffer_stream_continuously():
+    transport = MockTransport([
+        b'8\0\0\0',  # CBD: theta
+        b'2\0\0\0',  # LEN
+        b'2,0,0,1\0\0\0',  # M
+        struct.pack('>h', 100) + b'\0\0\0',
+        b'2,0,0,2\0\0\0',  # M
+        struct.pack('>h', 200) + b'\0\0\0',
+        b'2,0,0,3\0\0\0',  # M, the buffer wrapped around.
+        struct.pack('>h', 300) + b'\0\0\0',
+        b'0,0,0,3\0\0\0',  # M
+    ])
+    chunks = list(SR7230(transport).standard_buffer.stream(interval=0))
+    assert [list(c['theta']) for c in chunks] == [[1.], [2.], [3.]]
+    assert transport.messages[7] == b'DCB 3 0 1\0'
+
+
+def test_sr7230_fast_buffer_stream():
+    transport = MockTransport([
+        b'3\0\0\0',  # LEN
+        b'2,0,0,2\0\0\0',  # M
+        struct.pack('>2h', 1, 2) + b'\0\0\0',
+        b'2,0,0,2\0\0\0',  # M
+        b'2,0,0,4\0\0\0',  # M, the buffer wrapped around.
+        struct.pack('>h', 3) + b'\0\0\0',
+        struct.pack('>h', 4) + b'\0\0\0',
+        b'0,0,0,4\0\0\0',  # M
+    ])
+    chunks = list(SR7230(transport).fast_buffer.stream(['x'], interval=0))
+    assert [list(c['x']) for c in chunks] == [[1, 2], [3, 4]]
+    assert transport.messages[2] == b'DCB 0 0 2\0'
+    assert transport.messages[5:7] == [b'DCB 0 2 1\0', b'DCB 0 0 1\0']
+
+
+def test_sr7230_fast_buffer_stream_overrun():
+    transport = MockTransport([b'3\0\0\0', b'2,0,0,4\0\0\0'])
+    with pytest.raises(RuntimeError):
+        list(SR7230(transport).fast_buffer.stream(['x']))
+
+
+def test_sr7230_fast_buffer_stream_overrun_during_transfer():
+    transport = MockTransport([
+        b'3\0\0\0',  # LEN
+        b'2,0,0,2\0\0\0',  # M
+        struct.pack('>2h', 1, 2) + b'\0\0\0',
+        b'2,0,0,4\0\0\0',  # M, the first point was overwritten.
+    ])
+    with pytest.raises(RuntimeError):
+        list(SR7230(transport).fast_buffer.stream(['x']))
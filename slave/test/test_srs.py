@@ -4,9 +4,10 @@
 from __future__ import (absolute_import, division,
                         print_function, unicode_literals)
 from future.builtins import *
-import collections
+import struct
 
 from slave.srs import SR830, SR850
+from slave.test.util import MockTransport
 from slave.transport import SimulatedTransport
 
 
@@ -18,3 +19,48 @@ def test_sr830():
 def test_sr850():
     # Test if instantiation fails
     SR850(SimulatedTransport())
+
+
+def test_sr830_trace_ieee():
+    data = struct.pack('<3f', 1., 2., 3.)
+    transport = MockTransport([data[:4], data[4:8], data[8:]])
+    lockin = SR830(transport)
+    chunks = list(lockin.iter_trace(1, start=10, length=3, chunk_size=2))
+    assert [list(c) for c in chunks] == [[1., 2.], [3.]]
+    assert transport.messages == [b'TRCB? 1,10,2\n', b'TRCB? 1,12,1\n']
+
+
+def test_sr830_trace_non_ieee():
+    # 3 * 2**(125 - 124) and -1 * 2**(120 - 124)
+    transport = MockTransport([struct.pack('<4h', 3, 125, -1, 120)])
+    lockin = SR830(transport)
+    assert list(lockin.trace(2, length=2, format='non-ieee')) == [6., -0.0625]
+    assert transport.messages == [b'TRCL? 2,0,2\n']
+
+
+def test_sr850_trace_slicing():
+    data = struct.pack('<3f', 1., 2., 3.)
+    transport = MockTransport([data[:8], data[8:]])
+    trace = SR850(transport).traces[0]
+    trace.chunk_size = 2
+    assert list(trace[10:13]) == [1., 2., 3.]
+    assert transport.messages == [b'TRCB? 1,10,2\n', b'TRCB? 1,12,1\n']
+
+
+def test_sr850_trace_negative_index():
+    transport = MockTransport([b'5\n', struct.pack('<2h', 1, 126)])
+    trace = SR850(transport).traces[1]
+    trace.format = 'non-ieee'
+    assert trace[-1] == 4.
+    assert transport.messages == [b'SPTS? 2\n', b'TRCL? 2,4,1\n']
+
+
+def test_sr850_trace_negative_step():
+    data = struct.pack('<4f', 1., 2., 3., 4.)
+    transport = MockTransport([b'4\n', data, b'4\n', data[:12]])
+    trace = SR850(transport).traces[0]
+    assert list(trace[::-1]) == [4., 3., 2., 1.]
+    assert list(trace[2::-2]) == [3., 1.]
+    assert transport.messages == [
+        b'SPTS? 1\n', b'TRCB? 1,0,4\n', b'SPTS? 1\n', b'TRCB? 1,0,3\n'
+    ]
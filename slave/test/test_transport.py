@@ -5,10 +5,17 @@ from __future__ import (absolute_import, division,
                         print_function, unicode_literals)
 
 from future.builtins import *
+import io
+import socket
+import threading
+import time
+
 import pytest
 from mock import MagicMock
 
-from slave.transport import Transport
+from slave.protocol import IEC60488
+from slave.transport import (BufferOverflow, BusScheduler, Socket, SocketPool,
+                             Timeout, Transport, WireTrace)
 
 
 @pytest.fixture
@@ -40,3 +47,224 @@ class TestTransport(object):
         assert transport.read_until(b'P') == b'RES'
         transport.__read__.assert_called_with(transport._max_bytes)
         assert transport._buffer == b'ONSE'
+
+    def test_read_exactly_with_multiple_reads(self, transport):
+        transport.__read__.side_effect = [b'RES', b'PON', b'SE']
+        assert transport.read_exactly(7) == b'RESPONS'
+        assert transport._buffer == b'E'
+
+    def test_read_until_with_delimiter_spanning_chunks(self, transport):
+        transport.__read__.side_effect = [b'RES\r', b'\nTAIL']
+        assert transport.read_until(b'\r\n') == b'RES'
+        assert transport._buffer == b'TAIL'
+
+    def test_read_until_with_many_small_chunks(self, transport):
+        # Simulates a serial transport, returning a single byte per read.
+        transport.__read__.side_effect = [b'X'] * 5000 + [b'\n']
+        assert transport.read_until(b'\n') == b'X' * 5000
+        assert not transport._buffer
+
+    def test_read_until_with_exceeded_deadline(self, transport):
+        def slow_read(num_bytes):
+            time.sleep(0.02)
+            return b'PARTIAL'
+        transport.__read__.side_effect = slow_read
+        with pytest.raises(Timeout) as excinfo:
+            transport.read_until(b'\n', timeout=0.01)
+        assert excinfo.value.data == b'PARTIAL'
+        assert not transport._buffer
+
+    def test_read_exactly_with_read_timeout(self, transport):
+        transport.__read__.side_effect = [b'PART', Timeout()]
+        with pytest.raises(Timeout) as excinfo:
+            transport.read_exactly(10)
+        assert excinfo.value.data == b'PART'
+        assert not transport._buffer
+
+    def test_read_until_with_max_size(self, transport):
+        with pytest.raises(BufferOverflow) as excinfo:
+            transport.read_until(b'\n', max_size=10)
+        assert excinfo.value.data == b'RESPONSE' * 2
+        assert not transport._buffer
+
+    def test_read_exactly_with_max_size(self):
+        transport = Transport(max_size=10)
+        with pytest.raises(BufferOverflow):
+            transport.read_exactly(11)
+
+
+class TestBusScheduler(object):
+    def test_waiting_transports_are_served_by_priority(self):
+        bus = BusScheduler()
+        locks = [bus.lock('holder'), bus.lock('low'), bus.lock('high', priority=1)]
+        order = []
+
+        def use(lock):
+            with Transport(lock=lock):
+                order.append(lock.name)
+
+        locks[0].acquire()
+        threads = [threading.Thread(target=use, args=(lock,)) for lock in locks[1:]]
+        for thread in threads:
+            thread.start()
+            # Wait until the thread is queued.
+            while len(bus._queue) < threads.index(thread) + 1:
+                time.sleep(0.001)
+        locks[0].release()
+        for thread in threads:
+            thread.join()
+        assert order == ['high', 'low']
+        metrics = bus.metrics()
+        assert [metrics[name]['acquisitions'] for name in ('holder', 'low', 'high')] == [1, 1, 1]
+        assert metrics['low']['wait_time'] >= metrics['high']['wait_time'] > 0
+
+    def test_non_blocking_acquire(self):
+        bus = BusScheduler()
+        first, second = bus.lock('first'), bus.lock('second')
+        assert first.acquire(blocking=False)
+        assert not second.acquire(blocking=False)
+        first.release()
+        with pytest.raises(RuntimeError):
+            first.release()
+
+    def test_overruns(self):
+        bus = BusScheduler(max_hold_time=0.)
+        lock = bus.lock('device')
+        with lock:
+            time.sleep(0.001)
+        metrics = bus.metrics()['device']
+        assert metrics['overruns'] == 1
+        assert 0 < metrics['occupancy'] <= 1
+        bus.reset_metrics()
+        assert bus.metrics()['device']['overruns'] == 0
+
+    def test_max_hold_time_times_out_the_holder(self):
+        bus = BusScheduler(max_hold_time=0.01)
+        transport = Transport(lock=bus.lock('slow'))
+
+        def slow_read(num_bytes):
+            time.sleep(0.02)
+            return b'PARTIAL'
+
+        transport.__read__ = slow_read
+        with pytest.raises(Timeout) as excinfo:
+            with transport:
+                transport.read_until(b'\n')
+        assert excinfo.value.data == b'PARTIAL'
+        assert bus.metrics()['slow']['overruns'] == 1
+        # The bus is released.
+        assert transport.lock.acquire(blocking=False)
+
+    def test_interrupted_wait_is_dequeued(self):
+        bus = BusScheduler()
+        holder, waiter = bus.lock('holder'), bus.lock('waiter')
+        holder.acquire()
+
+        def interrupt(timeout=None):
+            raise KeyboardInterrupt()
+
+        bus._condition.wait = interrupt
+        with pytest.raises(KeyboardInterrupt):
+            waiter.acquire()
+        del bus._condition.wait
+        assert not bus._queue
+        holder.release()
+        assert waiter.acquire(blocking=False)
+
+    def test_duplicate_names(self):
+        bus = BusScheduler()
+        bus.lock('device')
+        with pytest.raises(ValueError):
+            bus.lock('device')
+
+
+@pytest.fixture
+def server():
+    """A server closing the first connection after receiving a message and
+    answering on the following connections.
+    """
+    listener = socket.socket()
+    listener.bind(('127.0.0.1', 0))
+    listener.listen(5)
+
+    def serve():
+        for i in range(2):
+            try:
+                connection, _ = listener.accept()
+            except socket.error:
+                # The listener was closed by the teardown.
+                return
+            data = connection.recv(1024)
+            if i:
+                connection.sendall(b'RESPONSE:' + data)
+            connection.close()
+
+    thread = threading.Thread(target=serve)
+    thread.daemon = True
+    thread.start()
+    yield listener.getsockname()
+    listener.close()
+
+
+class TestSocket(object):
+    def test_query_reconnects_if_connection_is_lost(self, server):
+        transport = Socket(server, nodelay=True, backoff=0)
+        assert IEC60488().query(transport, 'QRY?') == ['RESPONSE:QRY?']
+
+    def test_closed_connection(self, server):
+        transport = Socket(server)
+        with transport:
+            transport.write(b'QRY?\n')
+            with pytest.raises(Socket.ConnectionLost):
+                transport.read_until(b'\n')
+        transport.close()
+        assert transport._socket is None
+
+    def test_lock_is_released_if_host_is_unreachable(self):
+        # Connections to a closed port are refused.
+        closed = socket.socket()
+        closed.bind(('127.0.0.1', 0))
+        address = closed.getsockname()
+        closed.close()
+        transport = Socket(address, alwaysopen=False)
+        with pytest.raises(Socket.Error):
+            with transport:
+                pass
+        assert transport.lock.acquire(False)
+
+    def test_pool_shares_sockets(self, server):
+        pool = SocketPool()
+        transport = pool.get(list(server))
+        assert pool.get(server) is transport
+        assert transport._socket.getsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY)
+        pool.close()
+        assert transport._socket is None
+
+
+class TestWireTrace(object):
+    def test_transfers_are_recorded(self, transport):
+        transport.__write__ = MagicMock()
+        transport.trace = WireTrace()
+        transport.write(b'QRY?\n')
+        transport.read_bytes(4)
+        records = transport.trace.records()
+        assert [r[1:] for r in records] == [('write', b'QRY?\n'), ('read', b'RESPONSE')]
+        assert records[0][0] <= records[1][0]
+
+    def test_ring_buffer_keeps_last_records(self):
+        trace = WireTrace(size=3)
+        for i in range(5):
+            trace.record('write', bytes([i]))
+        assert [r[2] for r in trace.records()] == [b'\x02', b'\x03', b'\x04']
+        trace.clear()
+        assert trace.records() == []
+
+    def test_dump_on_exception(self):
+        trace = WireTrace()
+        trace.record('read', b'DATA')
+        file = io.StringIO()
+        with pytest.raises(ValueError):
+            with trace.dump_on_exception(file):
+                raise ValueError()
+        assert file.getvalue().endswith(" read  b'DATA'\n")
+        assert trace.dump() == file.getvalue()
@@ -7,7 +7,10 @@ from future.builtins import *
 import itertools
 import unittest
 
-from slave.types import Boolean, Integer, Float, Mapping, Register, Set
+import numpy as np
+
+from slave.types import (Boolean, Integer, Float, Mapping, Register, Set,
+                         Stream, String)
 
 
 class TypeCheck(object):
@@ -91,5 +94,38 @@ class TestRegister(unittest.TestCase, TypeCheck):
             3: 'fourth'
         })
 
+
+class TestStream(unittest.TestCase):
+    def test_load_all_with_single_numeric_type(self):
+        data = Stream(Float, array=True).load_all(['1.5', '+2.0E+01'])
+        self.assertIsInstance(data, np.ndarray)
+        self.assertEqual(data.tolist(), [1.5, 20.])
+
+    def test_load_all_with_multiple_numeric_types(self):
+        data = Stream(Float, Integer, Boolean, names=('x', 'n', 'b'), array=True).load_all(
+            ['1.5', '2', '1', '3.5', '4', '0']
+        )
+        self.assertEqual(data['x'].tolist(), [1.5, 3.5])
+        self.assertEqual(data['n'].tolist(), [2, 4])
+        self.assertEqual(data['b'].tolist(), [True, False])
+
+    def test_load_all_with_incomplete_record(self):
+        with self.assertRaises(ValueError):
+            Stream(Float, Integer, array=True).load_all(['1.5', '2', '3.5'])
+
+    def test_load_all_returns_list_by_default(self):
+        data = Stream(Float, Integer).load_all(['1.5', '2'])
+        self.assertEqual(data, [1.5, 2])
+        self.assertIs(type(data[0]), float)
+
+    def test_load_all_with_non_numeric_type(self):
+        data = Stream(Float, String, array=True).load_all(['1.5', 'A', '2.5', 'B'])
+        self.assertEqual(data, [1.5, 'A', 2.5, 'B'])
+
+    def test_load_all_with_restricted_numeric_type(self):
+        data = Stream(Float(min=0, max=10), array=True).load_all(['1.5'])
+        self.assertEqual(data.tolist(), [1.5])
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,148 @@
+#  -*- coding: utf-8 -*-
+#
+# Slave, (c) 2015, see AUTHORS.  Licensed under the GNU GPL.
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+from future.builtins import *
+import os
+
+import numpy as np
+import pytest
+
+from slave.misc import Measurement
+from slave.writer import CsvWriter, NpyWriter, NpzWriter, BinaryWriter, load
+
+
+class TestCsvWriter(object):
+    def test_rows_are_written_in_blocks(self, tmpdir):
+        path = tmpdir.join('data.csv')
+        writer = CsvWriter(str(path), ['A', 'B'], block_size=2)
+        writer.writerow([1, 'a'])
+        writer.writerow([2, 'b'])
+        assert path.read() == 'A,B\n1,a\n2,b\n'
+        writer.writerow([3, 'c'])
+        writer.close()
+        assert path.read() == 'A,B\n1,a\n2,b\n3,c\n'
+
+    def test_values_are_quoted(self, tmpdir):
+        path = tmpdir.join('data.csv')
+        with CsvWriter(str(path), ['A', 'B']) as writer:
+            writer.writerow([1, 'a,b'])
+            writer.writerow([2, 'say "hi"\nbye'])
+        assert path.read() == 'A,B\n1,"a,b"\n2,"say ""hi""\nbye"\n'
+
+    def test_integer_column_accepts_floats(self, tmpdir):
+        path = tmpdir.join('data.csv')
+        with CsvWriter(str(path), ['A']) as writer:
+            for value in (0, 0.75, 1.5):
+                writer.writerow([value])
+        assert path.read() == 'A\n0\n0.75\n1.5\n'
+
+    def test_threaded(self, tmpdir):
+        path = tmpdir.join('data.csv')
+        with CsvWriter(str(path), block_size=3, threaded=True, fsync='block') as writer:
+            for i in range(10):
+                writer.writerow([i, 0.5 * i])
+        lines = path.read().splitlines()
+        assert lines == ['{0},{1}'.format(i, 0.5 * i) for i in range(10)]
+
+    def test_invalid_fsync_policy(self, tmpdir):
+        with pytest.raises(ValueError):
+            CsvWriter(str(tmpdir.join('data.csv')), fsync='always')
+
+
+class TestNpyWriter(object):
+    def test_roundtrip(self, tmpdir):
+        path = str(tmpdir.join('data.npy'))
+        with NpyWriter(path, ['x', 'n'], block_size=4) as writer:
+            for i in range(10):
+                writer.writerow([i / 2., i])
+            writer.flush()
+            assert len(np.load(path)) == 10
+            writer.writerow([5., 10])
+        data = np.load(path)
+        assert data.dtype.names == ('x', 'n')
+        assert list(data['x']) == [i / 2. for i in range(11)]
+        assert list(data['n']) == list(range(11))
+
+    def test_integer_column_accepts_floats(self, tmpdir):
+        path = str(tmpdir.join('data.npy'))
+        with NpyWriter(path, ['a']) as writer:
+            for value in (0, 0.75, 1.5):
+                writer.writerow([value])
+        data = np.load(path)
+        assert data.dtype['a'] == np.float64
+        assert list(data['a']) == [0., 0.75, 1.5]
+
+    def test_non_numeric_column(self, tmpdir):
+        writer = NpyWriter(str(tmpdir.join('data.npy')))
+        with pytest.raises(TypeError):
+            writer.writerow(['a', 1.])
+
+    def test_errors_of_background_thread_are_reraised(self, tmpdir):
+        writer = NpyWriter(str(tmpdir.join('data.npy')), threaded=True)
+        writer.writerow(['a', 1.])
+        with pytest.raises(TypeError):
+            writer.flush()
+        writer.close()
+
+
+def test_npz_writer(tmpdir):
+    path = str(tmpdir.join('data.npz'))
+    with NpzWriter(path, ['x', 'y'], dtype=[float, float], block_size=3) as writer:
+        for i in range(5):
+            writer.writerow([i, -i])
+    data = np.load(path)
+    assert list(data['x']) == [0., 1., 2., 3., 4.]
+    assert list(data['y']) == [0., -1., -2., -3., -4.]
+    assert not tmpdir.join('data.npz.tmp.npy').exists()
+
+
+def test_binary_writer(tmpdir):
+    path = str(tmpdir.join('data.bin'))
+    writer = BinaryWriter(path, ['x', 'ok'], block_size=2)
+    for i in range(5):
+        writer.writerow([float(i), i % 2 == 0])
+    writer.flush()
+    assert len(load(path)) == 5
+    writer.close()
+    data = load(path)
+    assert list(data['x']) == [0., 1., 2., 3., 4.]
+    assert list(data['ok']) == [True, False, True, False, True]
+    # The preallocated space is truncated.
+    assert os.path.getsize(path) == 128 + 5 * data.dtype.itemsize
+
+
+def test_binary_writer_is_readable_while_written(tmpdir):
+    path = str(tmpdir.join('data.bin'))
+    writer = BinaryWriter(path, ['x', 'n'], block_size=4, grow_size=64)
+    for i in range(10):
+        writer.writerow([i * 0.5, i])
+    # The incomplete last block is not visible.
+    data = load(path, mmap_mode='r')
+    assert isinstance(data, np.memmap)
+    assert list(data['n']) == list(range(8))
+    # The file is grown repeatedly.
+    for i in range(10, 98):
+        writer.writerow([i * 0.5, i])
+    assert list(load(path)['n']) == list(range(96))
+    del data
+    writer.close()
+    assert list(load(path, mmap_mode='r')['x']) == [i * 0.5 for i in range(98)]
+
+
+def test_load_invalid_file(tmpdir):
+    path = tmpdir.join('data.bin')
+    path.write('1,2\n')
+    with pytest.raises(ValueError):
+        load(str(path))
+
+
+def test_measurement_with_writer(tmpdir):
+    path = str(tmpdir.join('data.npy'))
+    with Measurement(path, [lambda: 1., lambda: 2.], ['A', 'B'], writer=NpyWriter) as measure:
+        measure()
+        measure()
+    data = np.load(path)
+    assert list(data['A']) == [1., 1.]
+    assert list(data['B']) == [2., 2.]
@@ -0,0 +1,37 @@
+#  -*- coding: utf-8 -*-
+#
+# Slave, (c) 2015, see AUTHORS.  Licensed under the GNU GPL.
+"""Helpers shared by the test modules."""
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+from future.builtins import *
+import collections
+
+from slave.transport import Transport
+
+
+class MockTransport(Transport):
+    """A transport recording the written messages and replaying responses.
+
+    :param responses: A sequence of responses, each one returned by a single
+        read.
+    :param respond: An optional callable, called with each written message.
+        If it returns a response other than `None`, it is appended to the
+        responses.
+
+    """
+    def __init__(self, responses=(), respond=None):
+        super(MockTransport, self).__init__()
+        self.responses = collections.deque(responses)
+        self.messages = []
+        self.respond = respond
+
+    def __write__(self, data):
+        self.messages.append(data)
+        if self.respond is not None:
+            response = self.respond(data)
+            if response is not None:
+                self.responses.append(response)
+
+    def __read__(self, num_bytes):
+        return self.responses.popleft()
@@ -25,8 +25,14 @@ from __future__ import (absolute_import, division,
                         print_function, unicode_literals)
 from future.builtins import *
 from future.utils import raise_with_traceback
+import collections
+import heapq
+import itertools
+import logging
 import socket
+import sys
 import threading
+import time
 import ctypes as ct
 import ctypes.util
 import pkg_resources
@@ -36,14 +42,209 @@ import contextlib
 from slave.misc import wrap_exception
 
 
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
 class TransportError(IOError):
-    """Baseclass for all transport errors."""
+    """Baseclass for all transport errors.
+
+    :ivar data: The partial data received before the error occured or `None`.
+
+    """
+    def __init__(self, *args, **kw):
+        self.data = kw.pop('data', None)
+        super(TransportError, self).__init__(*args)
 
 
 class Timeout(TransportError):
     """Baseclass for all transport timeouts."""
 
 
+class BufferOverflow(TransportError):
+    """Raised when a response exceeds the maximum response size."""
+
+
+class ConnectionLost(TransportError):
+    """Raised when the connection was closed or reset.
+
+    Transports raising it must implement a `reconnect()` method. The
+    protocols reconnect and retry the failed message, see
+    :meth:`.Socket.reconnect`.
+
+    """
+
+
+class _Buffer(object):
+    """A chunked receive buffer.
+
+    Received data is stored as a list of chunks instead of a single contiguous
+    bytearray. Consuming data therefore never shifts the remaining bytes and
+    extraction uses memoryview slices, so each byte is copied exactly once.
+
+    The delimiter search used by :meth:`Transport.read_until` is incremental.
+    Chunks which were already scanned are skipped on the next call to
+    :meth:`.find`.
+
+    """
+    def __init__(self):
+        self._chunks = collections.deque()
+        # Read offset into the first chunk.
+        self._offset = 0
+        self._size = 0
+        self._reset_scan()
+
+    def _reset_scan(self):
+        # The scan state consists of the searched delimiter, the index of the
+        # next chunk to scan, the position of this chunk relative to the
+        # readable data and the trailing bytes of the previous chunk, needed
+        # to find delimiters spanning a chunk boundary.
+        self._scan = (None, 0, -self._offset, b'')
+
+    def extend(self, data):
+        """Appends data to the buffer."""
+        if data:
+            self._chunks.append(bytes(data))
+            self._size += len(data)
+
+    def find(self, delimiter):
+        """Returns the position of the first delimiter or -1 if not found."""
+        size = len(delimiter)
+        scan_delimiter, index, position, carry = self._scan
+        if scan_delimiter != delimiter:
+            index, position, carry = 0, -self._offset, b''
+        while index < len(self._chunks):
+            chunk = self._chunks[index]
+            start = self._offset if index == 0 else 0
+            if carry:
+                # Search for delimiters spanning the chunk boundary.
+                found = (carry + chunk[:size - 1]).find(delimiter)
+                if found != -1:
+                    return position - len(carry) + found
+            found = chunk.find(delimiter, start)
+            if found != -1:
+                return position + found
+            if size > 1:
+                tail = chunk[max(start, len(chunk) + 1 - size):]
+                carry = (carry + tail)[1 - size:]
+            position += len(chunk)
+            index += 1
+        self._scan = (delimiter, index, position, carry)
+        return -1
+
+    def read(self, num_bytes):
+        """Removes and returns at most `num_bytes` from the buffer."""
+        num_bytes = min(num_bytes, self._size)
+        views, remaining = [], num_bytes
+        while remaining:
+            view = memoryview(self._chunks[0])[self._offset:]
+            if len(view) > remaining:
+                views.append(view[:remaining])
+                self._offset += remaining
+                break
+            views.append(view)
+            self._chunks.popleft()
+            self._offset = 0
+            remaining -= len(view)
+        self._size -= num_bytes
+        self._reset_scan()
+        return bytearray().join(views)
+
+    def peek(self):
+        """Returns a copy of the buffer content without consuming it."""
+        data = bytearray().join(self._chunks)
+        return data[self._offset:]
+
+    def __len__(self):
+        return self._size
+
+    def __eq__(self, other):
+        return self.peek() == other
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return '<_Buffer({0!r})>'.format(bytes(self.peek()))
+
+
+class WireTrace(object):
+    """Records the raw messages of a transport in a ring buffer.
+
+    Recording stores a reference to the transferred bytes together with a
+    timestamp and the direction. Nothing is formatted until the trace is
+    dumped, e.g.::
+
+        transport.trace = WireTrace(size=256)
+        with transport.trace.dump_on_exception():
+            lockin.x
+        print(transport.trace.dump())
+
+    Only the last `size` transfers are kept. The buffer is preallocated and
+    each record is a single list item assignment, so no lock is needed.
+
+    :param size: The number of transfers kept.
+
+    """
+    def __init__(self, size=1024):
+        self.size = size
+        self.clear()
+
+    def record(self, direction, data):
+        """Records a transfer.
+
+        :param direction: Either 'write' or 'read'.
+        :param data: The transferred bytes.
+
+        """
+        # The counter is incremented atomically.
+        index = next(self._counter)
+        self._records[index % self.size] = (index, time.time(), direction, data)
+
+    def records(self):
+        """Returns the recorded *(<timestamp>, <direction>, <data>)* tuples,
+        oldest first.
+        """
+        records = sorted(r for r in list(self._records) if r is not None)
+        return [r[1:] for r in records]
+
+    def clear(self):
+        """Discards all records."""
+        self._records = [None] * self.size
+        self._counter = itertools.count()
+
+    def dump(self, file=None):
+        """Formats the records, one per line.
+
+        :param file: An optional file object the records are written to.
+            Otherwise, they are returned as string.
+
+        """
+        lines = ''.join(
+            '{0:.6f} {1:<5} {2!r}\n'.format(timestamp, direction, bytes(data))
+            for timestamp, direction, data in self.records()
+        )
+        if file is None:
+            return lines
+        file.write(lines)
+
+    @contextlib.contextmanager
+    def dump_on_exception(self, file=None):
+        """Returns a context manager, dumping the records if an exception is
+        raised.
+
+        :param file: The file object the records are written to. Default:
+            `sys.stderr`.
+
+        """
+        try:
+            yield self
+        except Exception:
+            self.dump(sys.stderr if file is None else file)
+            raise
+
+
 class Transport(object):
     """A utility class to write and read data.
 
@@ -53,54 +254,130 @@ class Transport(object):
 
     Subclasses must implement `__read__` and `__write__`.
 
+    :param max_bytes: The maximum number of bytes requested by a single
+        `__read__` call.
+    :param lock: An optional lock object. If `None`, a `threading.Lock` is
+        used.
+    :param timeout: The default time limit in seconds of a read operation. It
+        is used if the read method is called without a timeout. `None`
+        disables the limit.
+    :param max_size: The default maximum response size in bytes. `None`
+        disables the limit.
+
+    The time limit is checked in between consecutive `__read__` calls. It
+    limits the total duration of a read operation, while timeouts of the
+    underlying connection limit the duration of a single `__read__` call.
+
+    If a read operation fails, the partial response is removed from the
+    buffer and attached to the raised :class:`Timeout` or
+    :class:`BufferOverflow` as the `data` attribute.
+
+    :ivar trace: An optional :class:`~.WireTrace`, recording the written and
+        read bytes. `None` disables the tracing.
+
     """
-    def __init__(self, max_bytes=1024, lock=None):
-        self._buffer = bytearray()
+    def __init__(self, max_bytes=1024, lock=None, timeout=None, max_size=None):
+        self._buffer = _Buffer()
         self._max_bytes = max_bytes
+        self._timeout = timeout
+        self._max_size = max_size
         self.lock = lock or threading.Lock()
+        self.trace = None
 
-    def read_bytes(self, num_bytes):
-        """Reads at most `num_bytes`."""
-        buffer_size = len(self._buffer)
-        if buffer_size > num_bytes:
-            # The buffer is larger than the requested amount of bytes.
-            data, self._buffer = self._buffer[:num_bytes], self._buffer[num_bytes:]
-        elif 0 < buffer_size <= num_bytes:
-            # This might return less bytes than requested.
-            data, self._buffer = self._buffer, bytearray()
-        else:
-            # Buffer is empty. Try to read `num_bytes` and call `read_bytes()`
-            # again. This ensures that at most `num_bytes` are returned.
-            self._buffer += self.__read__(num_bytes)
-            return self.read_bytes(num_bytes)
-        return data
+    def read_bytes(self, num_bytes, timeout=None):
+        """Reads at most `num_bytes`.
 
-    def read_exactly(self, num_bytes):
-        """Reads exactly `num_bytes`"""
-        buffer_size = len(self._buffer)
-        if buffer_size > num_bytes:
-            # The buffer is larger than the requested amount of bytes.
-            data, self._buffer = self._buffer[:num_bytes], self._buffer[num_bytes:]
-        elif buffer_size == num_bytes:
-            # Buffer size matches requested number of bytes.
-            data, self._buffer = self._buffer, bytearray()
-        else:
-            # Buffer is too small. Try to read `num_bytes` and call `read_bytes()`
-            # again. This ensures that `num_bytes` are returned.
-            self._buffer += self.__read__(num_bytes)
-            return self.read_exactly(num_bytes)
+        :param num_bytes: The maximum number of bytes to read.
+        :param timeout: The time limit in seconds. If `None`, the default
+            timeout is used.
+
+        """
+        deadline = self._deadline(timeout)
+        while not self._buffer:
+            self._fill(num_bytes, deadline)
+        return self._buffer.read(num_bytes)
+
+    def read_exactly(self, num_bytes, timeout=None):
+        """Reads exactly `num_bytes`.
+
+        :param num_bytes: The number of bytes to read.
+        :param timeout: The time limit in seconds. If `None`, the default
+            timeout is used.
+
+        """
+        if self._max_size is not None and num_bytes > self._max_size:
+            raise BufferOverflow('Requested {0} bytes, maximum response size '
+                                 'is {1}.'.format(num_bytes, self._max_size))
+        deadline = self._deadline(timeout)
+        while len(self._buffer) < num_bytes:
+            self._fill(num_bytes - len(self._buffer), deadline)
+        return self._buffer.read(num_bytes)
+
+    def read_until(self, delimiter, timeout=None, max_size=None):
+        """Reads until the delimiter is found.
+
+        :param delimiter: The delimiter bytes. They are consumed but not
+            returned.
+        :param timeout: The time limit in seconds. If `None`, the default
+            timeout is used.
+        :param max_size: The maximum response size in bytes. If `None`, the
+            default maximum response size is used.
+
+        """
+        deadline = self._deadline(timeout)
+        max_size = self._max_size if max_size is None else max_size
+        index = self._buffer.find(delimiter)
+        while index == -1:
+            if max_size is not None and len(self._buffer) > max_size:
+                raise BufferOverflow(
+                    'Response exceeds {0} bytes.'.format(max_size),
+                    data=self._buffer.read(len(self._buffer))
+                )
+            self._fill(self._max_bytes, deadline)
+            index = self._buffer.find(delimiter)
+        data = self._buffer.read(index)
+        self._buffer.read(len(delimiter))
         return data
 
-    def read_until(self, delimiter):
-        """Reads until the delimiter is found."""
-        if delimiter in self._buffer:
-            data, delimiter, self._buffer = self._buffer.partition(delimiter)
-            return data
-        else:
-            self._buffer += self.__read__(self._max_bytes)
-            return self.read_until(delimiter)
+    def _deadline(self, timeout):
+        """Converts the timeout to an absolute deadline.
+
+        A lock of a :class:`~.BusScheduler` limits it to the maximum hold
+        time of the bus.
+
+        """
+        timeout = self._timeout if timeout is None else timeout
+        deadline = None if timeout is None else time.time() + timeout
+        hold_deadline = getattr(self.lock, 'deadline', None)
+        if hold_deadline is not None and (deadline is None or hold_deadline < deadline):
+            deadline = hold_deadline
+        return deadline
+
+    def _fill(self, num_bytes, deadline):
+        """Reads at most `num_bytes` into the buffer.
+
+        :raises Timeout: If the deadline is exceeded.
+
+        """
+        if deadline is not None and time.time() > deadline:
+            raise Timeout('Read deadline exceeded.',
+                          data=self._buffer.read(len(self._buffer)))
+        try:
+            data = self.__read__(num_bytes)
+        except Timeout as e:
+            e.data = self._buffer.read(len(self._buffer))
+            raise
+        if self.trace is not None:
+            self.trace.record('read', data)
+        self._buffer.extend(data)
+
+    def discard(self):
+        """Discards and returns the buffered data."""
+        return self._buffer.read(len(self._buffer))
 
     def write(self, data):
+        if self.trace is not None:
+            self.trace.record('write', data)
         self.__write__(data)
 
     def __enter__(self):
@@ -116,6 +393,155 @@ class Transport(object):
         raise NotImplementedError()
 
 
+class BusScheduler(object):
+    """Arbitrates the access of several transports to a shared bus.
+
+    Each transport on the bus, e.g. all :class:`~.LinuxGpib` transports of a
+    board, uses a lock created by :meth:`.lock` instead of its own lock, e.g.::
+
+        bus = BusScheduler(max_hold_time=0.5)
+        lockin = SR830(LinuxGpib(8, lock=bus.lock('lockin', priority=1)))
+        ppms = PPMS(LinuxGpib(15, lock=bus.lock('ppms')))
+
+    Only one transport holds the bus at a time. The bus is acquired for each
+    message, waiting transports are therefore served in between the messages
+    of the holder, by priority, higher values first, and in order of arrival
+    within a priority.
+
+    The `max_hold_time` is enforced by the read methods of the holding
+    transport. They raise a :class:`Timeout` once it is exceeded, which
+    releases the bus. The limit is checked in between consecutive `__read__`
+    calls, a single call is never interrupted. Each exceeded hold time is
+    counted as an overrun and logged as warning.
+
+    :param max_hold_time: The maximum time in seconds a transport may hold the
+        bus or `None`.
+
+    """
+    def __init__(self, max_hold_time=None):
+        self.max_hold_time = max_hold_time
+        self._condition = threading.Condition(threading.Lock())
+        self._queue = []
+        self._counter = itertools.count()
+        self._owner = None
+        self._metrics = {}
+        self._start = time.time()
+
+    def lock(self, name, priority=0):
+        """Creates a lock for a transport on the bus.
+
+        :param name: The device name used in the metrics.
+        :param priority: The priority of the device. Higher priorities are
+            served first.
+
+        """
+        with self._condition:
+            if name in self._metrics:
+                raise ValueError('Name {0!r} is already in use.'.format(name))
+            self._metrics[name] = dict.fromkeys(
+                ['acquisitions', 'overruns', 'hold_time', 'max_hold_time',
+                 'wait_time', 'max_wait_time'], 0
+            )
+        return _BusLock(self, name, priority)
+
+    def metrics(self):
+        """Returns the bus usage of each device.
+
+        A dict is returned, mapping the device names to a dict with the number
+        of 'acquisitions' and 'overruns', the total and maximum 'hold_time'
+        and 'wait_time' in seconds and the 'occupancy', the fraction of time
+        the device held the bus since the scheduler was created or the
+        metrics were reset.
+
+        """
+        with self._condition:
+            elapsed = time.time() - self._start
+            return dict(
+                (name, dict(m, occupancy=m['hold_time'] / elapsed if elapsed else 0.))
+                for name, m in self._metrics.items()
+            )
+
+    def reset_metrics(self):
+        """Resets the metrics of all devices."""
+        with self._condition:
+            for metrics in self._metrics.values():
+                for key in metrics:
+                    metrics[key] = 0
+            self._start = time.time()
+
+    def _acquire(self, lock, blocking):
+        with self._condition:
+            start = time.time()
+            if self._owner is not None or self._queue:
+                if not blocking:
+                    return False
+                entry = (-lock.priority, next(self._counter), lock)
+                heapq.heappush(self._queue, entry)
+                try:
+                    while self._owner is not None or self._queue[0] is not entry:
+                        self._condition.wait()
+                except BaseException:
+                    # Remove the entry, e.g. on a KeyboardInterrupt, otherwise
+                    # it would block the waiters behind it forever.
+                    self._queue.remove(entry)
+                    heapq.heapify(self._queue)
+                    self._condition.notify_all()
+                    raise
+                heapq.heappop(self._queue)
+            self._owner = lock
+            lock._acquired = now = time.time()
+            if self.max_hold_time is not None:
+                lock.deadline = now + self.max_hold_time
+            metrics = self._metrics[lock.name]
+            metrics['acquisitions'] += 1
+            metrics['wait_time'] += now - start
+            metrics['max_wait_time'] = max(metrics['max_wait_time'], now - start)
+            return True
+
+    def _release(self, lock):
+        with self._condition:
+            if self._owner is not lock:
+                raise RuntimeError('Bus is not held by {0!r}.'.format(lock.name))
+            hold = time.time() - lock._acquired
+            metrics = self._metrics[lock.name]
+            metrics['hold_time'] += hold
+            metrics['max_hold_time'] = max(metrics['max_hold_time'], hold)
+            overrun = self.max_hold_time is not None and hold > self.max_hold_time
+            if overrun:
+                metrics['overruns'] += 1
+            self._owner = None
+            lock.deadline = None
+            self._condition.notify_all()
+        if overrun:
+            logger.warning('%s held the bus for %.3f s.', lock.name, hold)
+
+
+class _BusLock(object):
+    """A lock of a device on a bus, see :meth:`.BusScheduler.lock`.
+
+    :ivar deadline: The time the bus must be released by or `None`.
+
+    """
+    def __init__(self, scheduler, name, priority):
+        self.scheduler = scheduler
+        self.name = name
+        self.priority = priority
+        self.deadline = None
+        self._acquired = None
+
+    def acquire(self, blocking=True):
+        return self.scheduler._acquire(self, blocking)
+
+    def release(self):
+        self.scheduler._release(self)
+
+    def __enter__(self):
+        self.acquire()
+
+    def __exit__(self, type, value, traceback):
+        self.release()
+
+
 class SimulatedTransport(object):
     """The SimulatedTransport.
 
@@ -155,6 +581,18 @@ class Socket(Transport):
                 response = transport.read_until(b'\\n')
                 # connection is kept open.
 
+    :param nodelay: If `True`, the nagle algorithm is disabled (`TCP_NODELAY`).
+        Small messages are sent immediately instead of being delayed.
+    :param keepalive: If `True`, TCP keepalive probes are enabled
+        (`SO_KEEPALIVE`), to detect dropped idle connections.
+    :param reconnect_attempts: The number of connection attempts made by
+        :meth:`.reconnect`.
+    :param backoff: The delay in seconds before the second connection attempt.
+        It is doubled for each further attempt.
+
+    If the connection is closed or reset, :class:`Socket.ConnectionLost` is
+    raised. The protocols reconnect and retry the message in this case.
+
     """
     class Error(TransportError):
         pass
@@ -162,48 +600,150 @@ class Socket(Transport):
     class Timeout(Timeout, Error):
         pass
 
-    def __init__(self, address, alwaysopen=True, *args, **kw):
+    class ConnectionLost(ConnectionLost, Error):
+        pass
+
+    def __init__(self, address, alwaysopen=True, nodelay=False, keepalive=False,
+                 reconnect_attempts=3, backoff=0.1, *args, **kw):
         super(Socket, self).__init__()
         self.address = address
         self.alwaysopen = alwaysopen
+        self.nodelay = nodelay
+        self.keepalive = keepalive
+        self.reconnect_attempts = reconnect_attempts
+        self.backoff = backoff
         self._socket = None
         if self.alwaysopen:
             self.open()
 
-    @wrap_exception(exc=socket.error, new_exc=Error)
-    @wrap_exception(exc=socket.timeout, new_exc=Timeout)
     def __write__(self, data):
-        self._socket.sendall(data)
+        try:
+            self._socket.sendall(data)
+        except socket.timeout as e:
+            raise_with_traceback(Socket.Timeout(e))
+        except socket.error as e:
+            raise_with_traceback(Socket.ConnectionLost(e))
 
-    @wrap_exception(exc=socket.error, new_exc=Error)
-    @wrap_exception(exc=socket.timeout, new_exc=Timeout)
     def __read__(self, num_bytes):
-        return self._socket.recv(num_bytes)
+        try:
+            data = self._socket.recv(num_bytes)
+        except socket.timeout as e:
+            raise_with_traceback(Socket.Timeout(e))
+        except socket.error as e:
+            raise_with_traceback(Socket.ConnectionLost(e))
+        if not data:
+            raise Socket.ConnectionLost('Connection closed by peer.')
+        return data
 
     @wrap_exception(exc=socket.error, new_exc=Error)
     @wrap_exception(exc=socket.timeout, new_exc=Timeout)
     def open(self):
         if self._socket:
             raise ValueError('Socket is already open.')
-        self._socket = socket.create_connection(self.address)
+        sock = socket.create_connection(self.address)
+        if self.nodelay:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        if self.keepalive:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        self._socket = sock
 
     @wrap_exception(exc=socket.error, new_exc=Error)
     @wrap_exception(exc=socket.timeout, new_exc=Timeout)
     def close(self):
         if not self._socket:
             raise ValueError("Can't close socket. Not opened yet.")
-        self._socket.close()
+        sock, self._socket = self._socket, None
+        sock.close()
+
+    def reconnect(self):
+        """Closes the connection and opens a new one.
+
+        Received data not read yet is discarded. Failed connection attempts
+        are repeated with an exponential backoff.
+
+        :raises Socket.Error: If the last connection attempt failed.
+
+        """
+        with self.lock:
+            if self._socket:
+                try:
+                    self.close()
+                except Socket.Error:
+                    self._socket = None
+            self._buffer = _Buffer()
+            delay = self.backoff
+            for attempt in range(self.reconnect_attempts):
+                try:
+                    self.open()
+                except Socket.Error:
+                    if attempt + 1 >= self.reconnect_attempts:
+                        raise
+                    time.sleep(delay)
+                    delay *= 2
+                else:
+                    return
 
     def __enter__(self):
         super(Socket, self).__enter__()
         if self._socket is None:
-            self.open()
+            try:
+                self.open()
+            except Exception:
+                self.lock.release()
+                raise
 
     def __exit__(self, type, value, tb):
-        if not self.alwaysopen:
-            self.close()
-            self._socket = None
-        super(Socket, self).__exit__(type, value, tb)
+        try:
+            if not self.alwaysopen and self._socket:
+                self.close()
+        finally:
+            super(Socket, self).__exit__(type, value, tb)
+
+
+class SocketPool(object):
+    """Shares socket transports between drivers.
+
+    The pool creates a single :class:`~.Socket` per address, which is kept
+    open. Drivers using the same address therefore share the connection,
+    while the transport lock serializes their messages, e.g.::
+
+        pool = SocketPool()
+        lockin = SR7230(pool.get(('192.168.178.1', 50000)))
+        # Uses the same connection.
+        transport = pool.get(('192.168.178.1', 50000))
+        assert transport is lockin._transport
+
+    :param kw: The keyword arguments used to create the sockets. By default,
+        `TCP_NODELAY` and keepalive probes are enabled.
+
+    """
+    def __init__(self, **kw):
+        kw.setdefault('nodelay', True)
+        kw.setdefault('keepalive', True)
+        kw['alwaysopen'] = True
+        self._kw = kw
+        self._sockets = {}
+        self._lock = threading.Lock()
+
+    def get(self, address):
+        """Returns the socket transport connected to address."""
+        address = tuple(address)
+        with self._lock:
+            try:
+                return self._sockets[address]
+            except KeyError:
+                transport = self._sockets[address] = Socket(address, **self._kw)
+                return transport
+
+    def close(self):
+        """Closes all sockets of the pool."""
+        with self._lock:
+            sockets, self._sockets = self._sockets, {}
+        for transport in sockets.values():
+            with transport.lock:
+                if transport._socket:
+                    transport.close()
+
 
 # TODO:
 # 1. Implement trigger functionality
@@ -376,6 +916,8 @@ class LinuxGpib(Transport):
         byte sent during write operations.
     :param str eos_char: End of string character.
     :param int eos_mode: End of string mode.
+    :param lock: An optional lock, e.g. to share the bus with other
+        transports, see :class:`.BusScheduler`.
 
     """
     #: Valid timeout parameters.
@@ -437,9 +979,9 @@ class LinuxGpib(Transport):
         """Raised when a linux-gpib timeout occurs."""
 
     def __init__(self, primary=0, secondary=None, board=0, timeout='10 s',
-                 send_eoi=True, eos_char=None, eos_mode=0):
+                 send_eoi=True, eos_char=None, eos_mode=0, lock=None):
         from slave.types import Register
-        super(LinuxGpib, self).__init__()
+        super(LinuxGpib, self).__init__(lock=lock)
 
         valid_address = list(range(0, 31))
         if primary not in valid_address:
@@ -450,7 +992,7 @@ class LinuxGpib(Transport):
         # Linux-gpib secondary addresses need an offset of 96 following NI
         # convention.
         secondary = 0 if secondary is None else secondary + 96
-        timeout = self.TIMEOUT.index(timeout)
+        timeout = self._ibtmo = self.TIMEOUT.index(timeout)
         send_eoi = bool(send_eoi)
 
         if not eos_mode in [0, LinuxGpib.REOS, LinuxGpib.XEOS, LinuxGpib.BIN]:
@@ -462,6 +1004,9 @@ class LinuxGpib(Transport):
             eos = ord(eos_char) + eos_mode
 
         self._lib = ct.CDLL(ct.util.find_library('gpib'))
+        # The thread specific count of the bytes transferred by the last
+        # call.
+        self._lib.ThreadIbcntl.restype = ct.c_long
         self._device = self._lib.ibdev(
             ct.c_int(board), ct.c_int(primary), ct.c_int(secondary),
             ct.c_int(timeout), ct.c_int(send_eoi), ct.c_int(eos)
@@ -487,7 +1032,8 @@ class LinuxGpib(Transport):
         buffer = ct.create_string_buffer(num_bytes)
         ibsta = self._lib.ibrd(self._device, ct.byref(buffer), ct.c_long(num_bytes))
         self._check_status(ibsta)
-        return buffer.value
+        # Binary data may contain NUL bytes, which terminate `buffer.value`.
+        return buffer.raw[:self._lib.ThreadIbcntl()]
 
     def clear(self):
         """Issues a device clear command."""
@@ -503,6 +1049,54 @@ class LinuxGpib(Transport):
         ibsta = self._lib.ibtrg(self._device)
         self._check_status(ibsta)
 
+    def serial_poll(self):
+        """Serial polls the device and returns the status byte.
+
+        Serial polling clears the service request of the device.
+
+        """
+        status_byte = ct.c_char()
+        ibsta = self._lib.ibrsp(self._device, ct.byref(status_byte))
+        self._check_status(ibsta)
+        return ord(status_byte.value)
+
+    def wait_for_srq(self, timeout=None):
+        """Blocks until the device requests service and returns its status
+        byte.
+
+        The wait is performed by the linux-gpib driver and does not send
+        any messages, other devices on the bus can be used meanwhile.
+
+        :param timeout: An optional timeout in seconds. It is rounded up to
+            the next valid timeout, see :attr:`.TIMEOUT`. If `None`, the
+            timeout of the transport is used.
+        :raises LinuxGpib.Timeout: If no service request occured in time.
+
+        """
+        index = self._ibtmo if timeout is None else self._timeout_index(timeout)
+        if index != self._ibtmo:
+            self._lib.ibtmo(self._device, ct.c_int(index))
+        try:
+            # Wait for the RQS or TIMO bit of the device status.
+            ibsta = self._lib.ibwait(self._device, ct.c_int(0x4800))
+        finally:
+            if index != self._ibtmo:
+                self._lib.ibtmo(self._device, ct.c_int(self._ibtmo))
+        self._check_status(ibsta)
+        return self.serial_poll()
+
+    @classmethod
+    def _timeout_index(cls, timeout):
+        """Returns the index of the smallest valid timeout not less than
+        `timeout` seconds."""
+        units = {'us': 1e-6, 'ms': 1e-3, 's': 1.}
+        for index, value in enumerate(cls.TIMEOUT[1:], 1):
+            number, unit = value.split()
+            if float(number) * units[unit] >= timeout:
+                return index
+        # The largest timeout is exceeded, disable it.
+        return 0
+
     @property
     def status(self):
         ibsta = self._lib.ThreadIbsta()
@@ -48,6 +48,8 @@ import string
 import sys
 import itertools
 
+import numpy as np
+
 
 
 
@@ -362,6 +364,11 @@ class Stream(object):
     """A type container for a variable number of types.
 
     :param args: A sequence of types.
+    :param names: An optional sequence of field names, used by
+        :meth:`.load_all` if the stream contains more than one type. Default
+        names are `'f0'`, `'f1'`, ...
+    :param array: If `True`, numeric streams are loaded into numpy arrays,
+        see :meth:`.load_all`. Default: `False`.
 
     The :class:`Stream` class is a type container for variable numbers of types.
     Let's say a command returns the content of an internal buffer which can
@@ -374,9 +381,59 @@ class Stream(object):
 
         Command('QRY?', 'WRT', Stream(Float, Integer))
 
+    If `array` is enabled, streams consisting only of :class:`Float`,
+    :class:`Integer` and :class:`Boolean` types are loaded into numpy arrays,
+    see :meth:`.load_all`.
+
     """
-    def __init__(self, *types):
+    #: Maps the vectorizable types to their numpy dtype. Subclasses are not
+    #: included, because they might customize the conversion.
+    DTYPES = {Float: np.float64, Integer: np.int64, Boolean: np.bool_}
+
+    def __init__(self, *types, **kw):
         self.types = [_to_instance(t) for t in types]
+        names = kw.pop('names', None)
+        self.array = kw.pop('array', False)
+        if kw:
+            raise TypeError('Unexpected keyword arguments: {0}'.format(kw))
+        if names is None:
+            names = ['f{0}'.format(i) for i in range(len(self.types))]
+        elif len(names) != len(self.types):
+            raise ValueError('Unequal length of names and types.')
+        self.names = list(names)
+
+    def load_all(self, values):
+        """Loads all values of the stream at once.
+
+        If `array` is enabled and the stream consists of numeric types only,
+        the values are converted in bulk. A single type stream returns a one
+        dimensional numpy array, a multi type stream a structured array with
+        one record per cycle of types. Otherwise each value is loaded by it's
+        type and a list is returned.
+
+        :raises ValueError: if a value can not be converted or a multi type
+            stream ends with an incomplete record.
+
+        """
+        dtypes = [self.DTYPES.get(type(t)) for t in self.types]
+        if not self.array or None in dtypes:
+            return [t.load(v) for t, v in zip(self, values)]
+        if len(dtypes) == 1:
+            return self._convert(values, dtypes[0])
+        values = list(values)
+        if len(values) % len(dtypes):
+            raise ValueError('Incomplete record.')
+        data = np.empty(len(values) // len(dtypes), dtype=list(zip(self.names, dtypes)))
+        for i, (name, dtype) in enumerate(zip(self.names, dtypes)):
+            data[name] = self._convert(values[i::len(dtypes)], dtype)
+        return data
+
+    @staticmethod
+    def _convert(values, dtype):
+        if dtype is np.bool_:
+            # Mimic Boolean, which converts the value to int first.
+            return np.array(values, dtype=np.int64).astype(np.bool_)
+        return np.array(values, dtype=dtype)
 
     def simulate(self):
         """Simulates a stream of types."""
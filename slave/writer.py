@@ -0,0 +1,432 @@
+#  -*- coding: utf-8 -*-
+#
+# Slave, (c) 2015, see AUTHORS.  Licensed under the GNU GPL.
+"""The :mod:`slave.writer` module implements buffered measurement writers.
+
+The rows are collected in preallocated numpy column buffers and written in
+blocks of `block_size` rows, which greatly reduces the formatting and system
+call overhead compared to writing each row separately. The writers implement
+the `writerow` method of :func:`csv.writer` objects and can be used with the
+:class:`~slave.misc.Measurement` and :class:`~slave.misc.LockInMeasurement`
+classes, e.g.::
+
+    from slave.misc import Measurement
+    from slave.writer import NpyWriter
+
+    with Measurement('data.npy', measurables, names, writer=NpyWriter) as measure:
+        ppms.scan_temperature(measure, 300, 1)
+
+The following writers are available:
+
+ * :class:`~.CsvWriter`, a comma separated text file.
+ * :class:`~.NpyWriter`, a numpy `.npy` file, which can be loaded with
+   :func:`numpy.load`.
+ * :class:`~.NpzWriter`, a numpy `.npz` archive with an array per column.
+ * :class:`~.BinaryWriter`, an append-only, memory mapped binary format. It
+   is loaded with :func:`load`, optionally as :class:`numpy.memmap`.
+
+Columns are typed by the values of the first row, unless a `dtype` is given.
+Numeric values are stored as 64 bit floats, because a column starting with
+an integer may continue with floats, and booleans as booleans. All other
+values are stored as python objects, which only the :class:`~.CsvWriter`
+supports. The :class:`~.CsvWriter` stores all detected columns as python
+objects, so the values are formatted as given.
+
+"""
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+from future.builtins import *
+import future.utils
+import ast
+import csv
+import io
+import mmap
+import os
+import queue
+import struct
+import threading
+
+import numpy as np
+
+
+class Writer(object):
+    """Abstract base class of the buffered writers.
+
+    Subclasses must implement the `__write__` method, receiving a block of
+    rows as numpy structured array. Optionally, they implement `__header__`,
+    called with the row dtype before the first block is written, and
+    `__finalize__`, called before the file is closed.
+
+    :param path: The file path.
+    :param names: An optional sequence of column names.
+    :param dtype: An optional sequence of column types, e.g. `[float, int]`.
+        By default, the types are detected from the first row.
+    :param block_size: The number of rows buffered before they are written.
+    :param fsync: The fsync policy. Either 'never', 'block', to sync each
+        written block to disk, or 'close', to sync when the file is closed.
+    :param threaded: If `True`, the blocks are written by a background
+        thread.
+
+    """
+    FSYNC = ('never', 'block', 'close')
+    #: The mode used to open the file.
+    MODE = 'wb'
+
+    def __init__(self, path, names=None, dtype=None, block_size=1024,
+                 fsync='never', threaded=False):
+        if fsync not in self.FSYNC:
+            raise ValueError('Invalid fsync policy: {0!r}'.format(fsync))
+        self.path = path
+        self.names = list(names) if names else None
+        self.block_size = block_size
+        self.fsync = fsync
+        self.dtype = None if dtype is None else self._create_dtype(dtype)
+        self._block = None
+        self._size = 0
+        self._error = None
+        self._file = open(path, self.MODE)
+        if threaded:
+            self._queue = queue.Queue(maxsize=2)
+            self._thread = threading.Thread(target=self._run)
+            self._thread.daemon = True
+            self._thread.start()
+        else:
+            self._queue = self._thread = None
+
+    def writerow(self, row):
+        """Appends a row."""
+        if self._block is None:
+            if self.dtype is None:
+                self.dtype = self._infer_dtype(row)
+            self._block = np.empty(self.block_size, dtype=self.dtype)
+            self._submit(self.__header__, self.dtype)
+        self._block[self._size] = tuple(row)
+        self._size += 1
+        if self._size == self.block_size:
+            self._flush_block()
+
+    def flush(self):
+        """Writes the buffered rows and flushes the file."""
+        self._flush_block()
+        self._submit(self._flush, False)
+        if self._queue is not None:
+            self._queue.join()
+        self._raise()
+
+    def close(self):
+        """Writes the buffered rows and closes the file."""
+        if self._file.closed:
+            return
+        try:
+            self._flush_block()
+            if self._thread is not None:
+                self._queue.put(None)
+                self._thread.join()
+            self._raise()
+            self.__finalize__()
+            self._flush(self.fsync != 'never')
+        finally:
+            self._file.close()
+
+    def __header__(self, dtype):
+        pass
+
+    def __write__(self, block):
+        raise NotImplementedError()
+
+    def __finalize__(self):
+        pass
+
+    def _infer_dtype(self, row):
+        """Detects the row dtype from the values of the first row."""
+        types = []
+        for value in row:
+            type_ = np.asarray(value).dtype
+            # Integers would silently truncate floats of later rows.
+            types.append(np.float64 if type_.kind in 'iu' else type_)
+        return self._create_dtype(types)
+
+    def _create_dtype(self, types):
+        names = self.names or ['f{0}'.format(i) for i in range(len(types))]
+        fields = []
+        for name, type_ in zip(names, types):
+            type_ = np.dtype(type_)
+            if type_.kind in 'biuf':
+                type_ = np.dtype(type_.kind + '8') if type_.kind != 'b' else type_
+            elif type_.kind != 'O':
+                type_ = np.dtype(object)
+            fields.append((str(name), type_))
+        return np.dtype(fields)
+
+    def _flush_block(self):
+        if not self._size:
+            return
+        block, self._size = self._block[:self._size].copy(), 0
+        self._submit(self._write_block, block)
+
+    def _write_block(self, block):
+        self.__write__(block)
+        self._flush(self.fsync == 'block')
+
+    def _flush(self, sync):
+        self._file.flush()
+        if sync:
+            os.fsync(self._file.fileno())
+
+    def _submit(self, fn, arg):
+        """Calls `fn(arg)` directly or in the background thread."""
+        self._raise()
+        if self._queue is None:
+            fn(arg)
+        else:
+            self._queue.put((fn, arg))
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                if self._error is None:
+                    fn, arg = item
+                    fn(arg)
+            except Exception as e:
+                # Reraised in the calling thread.
+                self._error = e
+            finally:
+                self._queue.task_done()
+
+    def _raise(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.close()
+
+
+class CsvWriter(Writer):
+    """Writes comma separated values.
+
+    The rows are formatted by a :func:`csv.writer`, like the rows of a
+    :class:`~slave.misc.Measurement`. Values containing commas, quotes or
+    newlines are therefore quoted. If column names are given, they are written
+    as header. See :class:`~.Writer` for the parameters.
+
+    :param encoding: The file encoding.
+
+    """
+    def __init__(self, path, names=None, encoding='utf-8', **kw):
+        self.encoding = encoding
+        super(CsvWriter, self).__init__(path, names, **kw)
+        if self.names:
+            self._file.write(self._format([self.names]))
+
+    def __write__(self, block):
+        self._file.write(self._format(block.tolist()))
+
+    def _infer_dtype(self, row):
+        return self._create_dtype([object] * len(row))
+
+    def _format(self, rows):
+        if future.utils.PY3:
+            buffer = io.StringIO(newline='')
+        else:
+            buffer = io.BytesIO()
+        csv.writer(buffer, lineterminator='\n').writerows(rows)
+        data = buffer.getvalue()
+        return data.encode(self.encoding) if future.utils.PY3 else data
+
+
+def _check_numeric(dtype):
+    for name in dtype.names:
+        if dtype[name].hasobject:
+            raise TypeError(
+                'Column {0!r} is not numeric, use a CsvWriter or '
+                'pass an explicit dtype.'.format(name)
+            )
+
+
+class NpyWriter(Writer):
+    """Writes a numpy `.npy` file.
+
+    The array shape in the header is updated, when the file is flushed or
+    closed. See :class:`~.Writer` for the parameters.
+
+    """
+    # The header length is fixed, to allow updates of the shape.
+    HEADER_LENGTH = 512
+
+    def __init__(self, *args, **kw):
+        super(NpyWriter, self).__init__(*args, **kw)
+        self._rows = 0
+
+    def __header__(self, dtype):
+        _check_numeric(dtype)
+        self._write_header()
+
+    def __write__(self, block):
+        self._file.write(block.tobytes())
+        self._rows += len(block)
+
+    def _flush(self, sync):
+        if self.dtype is not None:
+            self._write_header()
+        super(NpyWriter, self)._flush(sync)
+
+    def _write_header(self):
+        header = repr({
+            'descr': np.lib.format.dtype_to_descr(self.dtype),
+            'fortran_order': False,
+            'shape': (self._rows,),
+        })
+        # Magic string, version 1.0 and header length
+        prefix = b'\x93NUMPY\x01\x00'
+        length = self.HEADER_LENGTH - len(prefix) - 2
+        header = header.ljust(length - 1).encode('latin1') + b'\n'
+        if len(header) != length:
+            raise ValueError('Too many columns for the npy header.')
+        position = self._file.tell()
+        self._file.seek(0)
+        self._file.write(prefix + struct.pack('<H', length) + header)
+        if position:
+            self._file.seek(position)
+
+
+class NpzWriter(NpyWriter):
+    """Writes a numpy `.npz` archive with an array for each column.
+
+    The rows are appended to a temporary `.npy` file, which is converted when
+    the writer is closed. See :class:`~.Writer` for the parameters.
+
+    """
+    def __init__(self, path, *args, **kw):
+        self._npz_path = path
+        super(NpzWriter, self).__init__(path + '.tmp.npy', *args, **kw)
+
+    def close(self):
+        if self._file.closed:
+            return
+        super(NpzWriter, self).close()
+        if self.dtype is None:
+            np.savez(self._npz_path)
+        else:
+            with open(self.path, 'rb') as f:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            data = np.frombuffer(buffer, self.dtype, self._rows, self.HEADER_LENGTH)
+            columns = {}
+            for name in self.dtype.names:
+                columns[name] = data[name]
+            np.savez(self._npz_path, **columns)
+            # The arrays must be released before the memory map is closed.
+            del data, columns
+            buffer.close()
+        os.remove(self.path)
+
+
+class BinaryWriter(Writer):
+    """Writes an append-only binary file through a memory map.
+
+    The file consists of a header followed by fixed-width records. The header
+    starts with the magic string `SLAVEREC`, followed by the format version,
+    the header length (both little endian uint32) and the number of records
+    (little endian uint64). It continues with the ascii representation of a
+    dict, containing the record `descr` in the numpy format, and is padded
+    with spaces to a multiple of 64 bytes.
+
+    The file is grown in steps of at least `grow_size` bytes and the records
+    are copied into the memory map. The number of records in the header is
+    updated after each block, once its records are complete. If the writer
+    is interrupted, e.g. by a crash, the file remains readable and contains
+    all blocks written so far. Closing the writer truncates the unused space.
+
+    Use :func:`load` to read the file, even while it is written. See
+    :class:`~.Writer` for the remaining parameters.
+
+    :param grow_size: The minimal number of bytes the file is grown by.
+
+    """
+    MAGIC = b'SLAVEREC'
+    VERSION = 1
+    MODE = 'w+b'
+    # Offset of the number of records in the header.
+    _ROWS_OFFSET = 16
+
+    def __init__(self, path, names=None, grow_size=2**20, **kw):
+        super(BinaryWriter, self).__init__(path, names, **kw)
+        self.grow_size = grow_size
+        self._rows = 0
+        self._offset = 0
+        self._map = None
+
+    def __header__(self, dtype):
+        _check_numeric(dtype)
+        descr = repr({'descr': np.lib.format.dtype_to_descr(dtype)})
+        # Pad the header to a multiple of 64 bytes.
+        length = len(self.MAGIC) + 16 + len(descr) + 1
+        length += -length % 64
+        self._file.write(self.MAGIC)
+        self._file.write(struct.pack('<IIQ', self.VERSION, length, 0))
+        self._file.write(descr.ljust(length - len(self.MAGIC) - 16).encode('ascii'))
+        self._file.flush()
+        self._offset = length
+
+    def __write__(self, block):
+        start = self._offset + self._rows * self.dtype.itemsize
+        stop = start + block.nbytes
+        if self._map is None or stop > len(self._map):
+            self._grow(stop)
+        self._map[start:stop] = block.tobytes()
+        self._rows += len(block)
+        self._map[self._ROWS_OFFSET:self._ROWS_OFFSET + 8] = struct.pack('<Q', self._rows)
+
+    def __finalize__(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+            self._file.truncate(self._offset + self._rows * self.dtype.itemsize)
+
+    def _grow(self, size):
+        size = max(size, self._offset + self.grow_size,
+                   2 * len(self._map) if self._map else 0)
+        size += -size % mmap.ALLOCATIONGRANULARITY
+        if self._map is not None:
+            self._map.close()
+        self._file.truncate(size)
+        self._map = mmap.mmap(self._file.fileno(), size)
+
+    def _flush(self, sync):
+        if self._map is None:
+            super(BinaryWriter, self)._flush(sync)
+        elif sync:
+            self._map.flush()
+
+
+def load(path, mmap_mode=None):
+    """Loads a file written by the :class:`~.BinaryWriter`.
+
+    Only the records counted in the header are loaded. Files still written
+    are therefore loaded up to the last complete block.
+
+    :param path: The file path.
+    :param mmap_mode: If not `None`, the records are memory mapped instead of
+        read, see :class:`numpy.memmap` for the modes. The mapping does not
+        include records appended afterwards.
+    :returns: A numpy structured array with a field for each column.
+
+    """
+    with open(path, 'rb') as f:
+        magic = f.read(len(BinaryWriter.MAGIC))
+        if magic != BinaryWriter.MAGIC:
+            raise ValueError('Not a slave binary file.')
+        version, length, rows = struct.unpack('<IIQ', f.read(16))
+        if version != BinaryWriter.VERSION:
+            raise ValueError('Unsupported version {0}.'.format(version))
+        header = f.read(length - len(BinaryWriter.MAGIC) - 16).decode('ascii')
+        dtype = np.lib.format.descr_to_dtype(ast.literal_eval(header)['descr'])
+        if mmap_mode is None or not rows:
+            return np.fromfile(f, dtype=dtype, count=rows)
+    return np.memmap(path, dtype=dtype, mode=mmap_mode, offset=length, shape=(rows,))